@@ -0,0 +1,395 @@
+"""JSON API (/api/v1) for mobile clients.
+
+Same models and business rules as the pages, as compact JSON. Lists use keyset
+cursors; `?fields=` selects fields; images are URLs and only sent when asked for.
+"""
+from datetime import datetime
+from functools import wraps
+
+from flask import Blueprint, abort, current_app, jsonify, request, url_for
+from flask_login import current_user, login_user, logout_user
+from sqlalchemy.orm import joinedload
+from werkzeug.exceptions import HTTPException
+
+from assignment import normalize
+from auth import authenticate, current_salon, current_worker
+from availability import format_clock, parse_day
+from bookings import (SlotTaken, SlotUnavailable, claim_booking, create_booking, finish_booking, pending_for,
+                      service_availability, worker_bookings_page)
+from extensions import http_cache
+from fragments import current_versions
+from media import media_url
+from models import (EARNING_BOOKING_STATUSES, Booking, Review, Salon, SalonRating, Service, SkillTag, Worker, can_review,
+                    db, find_workers, parse_stars, review_page, save_review)
+from passwords import HashingBusy
+from query_budget import budgeted
+from salons import nearby_salons, salon_summaries, salons_by_ids
+from search import search_salon_ids
+from serialization import InvalidRequest, Resource, attr, decode_cursor, encode_cursor, page_limit
+from storage import replica_reads
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+def api_image(value, size):
+    url = media_url(value, size)
+    return request.host_url.rstrip('/') + url if url.startswith('/') else url or None
+
+def _nested(resource, key):
+    return lambda obj, context: resource.dump_all(context[key].get(obj.id, []), resource.default)
+
+SERVICE = Resource('service', {
+    'id': attr('id'), 'name': attr('name'), 'price': attr('price'), 'duration': attr('duration'),
+    'category': attr('category'), 'salon_id': attr('salon_id'),
+    'image_url': lambda s, context: api_image(s.image_url, 'card'),
+}, default=('id', 'name', 'price', 'duration', 'category'))
+
+WORKER = Resource('worker', {
+    'id': attr('id'), 'name': attr('name'), 'role': attr('role'), 'experience': attr('experience'),
+    'skills': lambda w, context: w.skill_names,
+    'is_online': attr('is_online'), 'salon_id': attr('salon_id'),
+    'image_url': lambda w, context: api_image(w.image_url, 'thumb'),
+}, default=('id', 'name', 'role', 'experience', 'skills'))
+
+SALON = Resource('salon', {
+    'id': attr('id'), 'name': attr('name'), 'location': attr('location'), 'rating': attr('rating'),
+    'is_open': attr('is_open'), 'phone': attr('phone'), 'experience': attr('experience'),
+    'opening_time': attr('opening_time'), 'closing_time': attr('closing_time'), 'map_url': attr('map_url'),
+    'min_price': lambda s, context: context['summaries'].get(s.id, {}).get('min_price'),
+    'categories': lambda s, context: [c for c in context['summaries'].get(s.id, {}).get('cats', '').split(',') if c],
+    'image_url': lambda s, context: api_image(s.image_url, 'card'),
+    'logo_url': lambda s, context: api_image(s.logo_url, 'thumb'),
+    'latitude': attr('latitude'), 'longitude': attr('longitude'),
+    'distance_km': lambda s, context: round(context['distances'][s.id], 2) if 'distances' in context else None,
+    'review_count': lambda s, context: context['ratings'][s.id].count if s.id in context['ratings'] else 0,
+    'rating_histogram': lambda s, context: {
+        str(stars): count for stars, count, _ in context['ratings'][s.id].histogram
+    } if s.id in context['ratings'] else None,
+    'services': _nested(SERVICE, 'services'),
+    'workers': _nested(WORKER, 'workers'),
+}, default=('id', 'name', 'location', 'rating', 'is_open', 'min_price', 'categories'))
+
+REVIEW = Resource('review', {
+    'id': attr('id'), 'rating': attr('rating'), 'comment': attr('comment'), 'date': attr('date'),
+    'salon_id': attr('salon_id'), 'user_id': attr('user_id'),
+    'author': lambda r, context: r.customer.name if r.customer else None,
+}, default=('id', 'rating', 'comment', 'date', 'author'))
+
+BOOKING = Resource('booking', {
+    'id': attr('id'), 'status': attr('status'), 'salon_id': attr('salon_id'), 'service_id': attr('service_id'),
+    'worker_id': attr('worker_id'), 'user_id': attr('user_id'), 'date': attr('date'), 'time': attr('time'),
+    'start': lambda b, context: b.start_at and b.start_at.isoformat(timespec='minutes'),
+    'end': lambda b, context: b.end_at and b.end_at.isoformat(timespec='minutes'),
+    'service': lambda b, context: {'id': b.service.id, 'name': b.service.name, 'price': b.service.price},
+    'salon': lambda b, context: {'id': b.salon.id, 'name': b.salon.name, 'location': b.salon.location},
+}, default=('id', 'status', 'salon_id', 'service_id', 'worker_id', 'start', 'end'))
+
+def api_error(status, message):
+    return jsonify(error={'status': status, 'message': message}), status
+
+@bp.errorhandler(HTTPException)
+def api_http_error(e):
+    return api_error(e.code, e.description)
+
+@bp.errorhandler(InvalidRequest)
+def api_invalid_request(e):
+    return api_error(400, str(e))
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return api_error(401, "Sign in first: POST /api/v1/session")
+        return view(*args, **kwargs)
+    return wrapper
+
+def api_page(items, next_cursor):
+    return jsonify(data=items, next_cursor=next_cursor)
+
+def api_body():
+    return request.get_json(silent=True) or request.form
+
+def salon_context(salon_ids, names):
+    """Bulk-load what the requested salon fields need for a whole page: one query per kind."""
+    context = {'summaries': salon_summaries(salon_ids) if {'min_price', 'categories'} & set(names) else {}}
+    context['ratings'] = {}
+    if {'review_count', 'rating_histogram'} & set(names) and salon_ids:
+        context['ratings'] = {r.salon_id: r for r in SalonRating.query.filter(SalonRating.salon_id.in_(salon_ids))}
+    for key, model in (('services', Service), ('workers', Worker)):
+        context[key] = {}
+        if key in names and salon_ids:
+            for row in model.query.filter(model.salon_id.in_(salon_ids)).order_by(model.id):
+                context[key].setdefault(row.salon_id, []).append(row)
+    return context
+
+@bp.route("/salons")
+@budgeted(6)
+@replica_reads
+def api_salons():
+    names = SALON.select(request.args.get('fields'))
+    salon_ids, next_cursor = search_salon_ids(
+        db.session.connection(),
+        q=request.args.get('q', ''),
+        city=request.args.get('city'),
+        category=request.args.get('cat'),
+        cursor=request.args.get('cursor'),
+        limit=page_limit(request.args.get('limit'), current_app.config['SEARCH_PAGE_SIZE'])
+    )
+    salons = salons_by_ids(salon_ids)
+    return api_page(SALON.dump_all(salons, names, salon_context(salon_ids, names)), next_cursor)
+
+def _float_arg(name, low, high):
+    value = request.args.get(name, type=float)
+    if value is None or not low <= value <= high:
+        raise InvalidRequest(f"{name} must be a number between {low} and {high}")
+    return value
+
+@bp.route("/salons/nearby")
+@budgeted(11)  # up to 6 widening cell searches (1 to 25 km), the salons, and 4 for the widest field list
+@replica_reads
+def api_nearby_salons():
+    """Salons nearest to ?lat=&lng=, optionally within radius_km, open only, by category or minimum rating."""
+    lat, lng = _float_arg('lat', -90, 90), _float_arg('lng', -180, 180)
+    radius_km = _float_arg('radius_km', 0.1, current_app.config['NEARBY_MAX_RADIUS_KM']) if 'radius_km' in request.args else None
+    min_rating = _float_arg('min_rating', 0, 5) if 'min_rating' in request.args else None
+    names = SALON.select(request.args.get('fields')) if 'fields' in request.args else SALON.default + ('distance_km',)
+    found = nearby_salons(lat, lng, radius_km, limit=page_limit(request.args.get('limit')),
+                          open_only=request.args.get('open') in ('1', 'true'),
+                          category=request.args.get('cat'), min_rating=min_rating)
+    salon_ids = [salon_id for _, salon_id in found]
+    context = salon_context(salon_ids, names)
+    context['distances'] = {salon_id: d for d, salon_id in found}
+    return jsonify(data=SALON.dump_all(salons_by_ids(salon_ids), names, context))
+
+@bp.route("/salons/<int:salon_id>")
+@replica_reads
+def api_salon(salon_id):
+    names = SALON.select(request.args.get('fields'))
+    # Everything a salon document shows is covered by its fragment version
+    version = current_versions(db.session.connection(), [salon_id])[salon_id]
+    etag = http_cache.etag('api-salon', salon_id, version, ','.join(names))
+    cached = http_cache.not_modified(etag, public=True)
+    if cached is not None:
+        return cached
+    salon = Salon.query.get_or_404(salon_id)
+    return http_cache.tag(jsonify(data=SALON.dump(salon, names, salon_context([salon.id], names))), etag, public=True)
+
+def _salon_children(model, resource, salon_id):
+    names = resource.select(request.args.get('fields'))
+    after = decode_cursor(request.args.get('cursor'), int)
+    limit = page_limit(request.args.get('limit'), 50)
+    query = model.query.filter(model.salon_id == salon_id)
+    if after:
+        query = query.filter(model.id > after[0])
+    rows = query.order_by(model.id).limit(limit + 1).all()
+    if not rows and not after and db.session.get(Salon, salon_id) is None:
+        abort(404)
+    next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return api_page(resource.dump_all(rows[:limit], names), next_cursor)
+
+@bp.route("/salons/<int:salon_id>/services")
+@replica_reads
+def api_salon_services(salon_id):
+    return _salon_children(Service, SERVICE, salon_id)
+
+@bp.route("/salons/<int:salon_id>/workers")
+@replica_reads
+def api_salon_workers(salon_id):
+    return _salon_children(Worker, WORKER, salon_id)
+
+@bp.route("/workers")
+@budgeted(3)
+@replica_reads
+def api_workers():
+    """Workers with every ?skill= (repeatable), optionally in ?city= and ?online=1|0, in id order."""
+    skills = request.args.getlist('skill')
+    if not any(s.strip() for s in skills):
+        raise InvalidRequest("at least one skill is required")
+    online = request.args.get('online')
+    if online not in (None, '', '0', '1', 'true', 'false'):
+        raise InvalidRequest("online must be 1 or 0")
+    names = WORKER.select(request.args.get('fields'))
+    after = decode_cursor(request.args.get('cursor'), int)
+    limit = page_limit(request.args.get('limit'), current_app.config['WORKER_PAGE_SIZE'])
+    ids = find_workers(skills, request.args.get('city'), online in ('1', 'true') if online else None,
+                       after[0] if after else None, limit + 1)
+    workers = {w.id: w for w in Worker.query.filter(Worker.id.in_(ids[:limit]))} if ids else {}
+    next_cursor = encode_cursor(ids[limit - 1]) if len(ids) > limit else None
+    return api_page(WORKER.dump_all([workers[i] for i in ids[:limit]], names), next_cursor)
+
+@bp.route("/skills")
+@replica_reads
+def api_skills():
+    """Skill tags in alphabetical order, for autocomplete: ?q= matches the start of the name."""
+    prefix = normalize(request.args.get('q'))
+    query = SkillTag.query
+    if prefix:
+        query = query.filter(SkillTag.slug >= prefix, SkillTag.slug < prefix + '\uffff')
+    tags = query.order_by(SkillTag.slug).limit(page_limit(request.args.get('limit'), 20))
+    return jsonify(data=[{'slug': tag.slug, 'name': tag.name} for tag in tags])
+
+@bp.route("/salons/<int:salon_id>/reviews")
+@replica_reads
+def api_salon_reviews(salon_id):
+    names = REVIEW.select(request.args.get('fields'))
+    before = decode_cursor(request.args.get('cursor'), int)
+    reviews, next_id = review_page(salon_id, before[0] if before else None, page_limit(request.args.get('limit')))
+    if not reviews and not before and db.session.get(Salon, salon_id) is None:
+        abort(404)
+    return api_page(REVIEW.dump_all(reviews, names), encode_cursor(next_id) if next_id else None)
+
+@bp.route("/salons/<int:salon_id>/reviews", methods=["POST"])
+@api_login_required
+def api_post_review(salon_id):
+    Salon.query.get_or_404(salon_id)
+    body = api_body()
+    stars = parse_stars(body.get('rating'))
+    if stars is None:
+        raise InvalidRequest("rating must be a whole number of stars from 1 to 5")
+    if not can_review(current_user, salon_id):
+        return api_error(403, "Only customers with a completed booking here can review this salon")
+    review = save_review(current_user, salon_id, stars, body.get('comment'))
+    return jsonify(data=REVIEW.dump(review, REVIEW.default)), 201
+
+@bp.route("/reviews/<int:review_id>", methods=["DELETE"])
+@api_login_required
+def api_delete_review(review_id):
+    review = Review.query.get_or_404(review_id)
+    if review.user_id != current_user.id:
+        return api_error(403, "You can only remove your own reviews")
+    db.session.delete(review)
+    db.session.commit()
+    return '', 204
+
+@bp.route("/services/<int:service_id>")
+@replica_reads
+def api_service(service_id):
+    service = Service.query.get_or_404(service_id)
+    return jsonify(data=SERVICE.dump(service, SERVICE.select(request.args.get('fields'))))
+
+@bp.route("/services/<int:service_id>/availability")
+def api_availability(service_id):
+    service = Service.query.get_or_404(service_id)
+    day = parse_day(request.args.get('date', ''))
+    if request.args.get('date') and day is None:
+        raise InvalidRequest("date must look like YYYY-MM-DD")
+    return jsonify(data=service_availability(service, day or datetime.now().date()))
+
+@bp.route("/session", methods=["POST"])
+def api_login():
+    body = api_body()
+    try:
+        user = authenticate(body.get('identifier'), body.get('password'))
+    except HashingBusy:
+        response, status = api_error(503, "Too many sign-ins right now; retry shortly")
+        response.headers['Retry-After'] = '2'
+        return response, status
+    if not user:
+        return api_error(401, "Invalid credentials")
+    login_user(user)
+    return jsonify(data={'id': user.id, 'name': user.name, 'role': user.role})
+
+@bp.route("/session", methods=["DELETE"])
+def api_logout():
+    logout_user()
+    return '', 204
+
+@bp.route("/me/bookings")
+@api_login_required
+def api_my_bookings():
+    """The signed-in customer's bookings, newest first."""
+    names = BOOKING.select(request.args.get('fields'))
+    before = decode_cursor(request.args.get('cursor'), int)
+    limit = page_limit(request.args.get('limit'))
+    query = Booking.query.filter(Booking.user_id == current_user.id)
+    if request.args.get('status'):
+        query = query.filter(Booking.status == request.args['status'])
+    if before:
+        query = query.filter(Booking.id < before[0])
+    if 'service' in names or 'salon' in names:
+        query = query.options(joinedload(Booking.service), joinedload(Booking.salon))
+    rows = query.order_by(Booking.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return api_page(BOOKING.dump_all(rows[:limit], names), next_cursor)
+
+@bp.route("/bookings", methods=["POST"])
+@api_login_required
+def api_create_booking():
+    body = api_body()
+    service = db.session.get(Service, body.get('service_id') or 0)
+    if service is None:
+        raise InvalidRequest("service_id does not name a service")
+    try:
+        start_at = datetime.fromisoformat(str(body.get('start', '')))
+    except ValueError:
+        raise InvalidRequest("start must be an ISO date and time, e.g. 2026-10-19T11:00") from None
+    worker_id = body.get('worker_id')
+    if worker_id is not None:
+        worker = db.session.get(Worker, worker_id)
+        if worker is None or worker.salon_id != service.salon_id:
+            raise InvalidRequest("worker_id is not an expert at this salon")
+    try:
+        booking = create_booking(service, worker_id, start_at, f"{start_at:%a, %b %d}", format_clock(start_at))
+    except SlotTaken:
+        return api_error(409, "That expert is already booked for this slot")
+    except SlotUnavailable as e:
+        raise InvalidRequest(str(e)) from None
+    response = jsonify(data=BOOKING.dump(booking, BOOKING.default))
+    response.status_code = 201
+    response.headers['Location'] = url_for('api.api_booking', booking_id=booking.id)
+    return response
+
+@bp.route("/bookings/<int:booking_id>")
+@api_login_required
+def api_booking(booking_id):
+    booking = Booking.query.get_or_404(booking_id)
+    worker, salon = current_worker(), current_salon()
+    if not (booking.user_id == current_user.id or (worker and booking.worker_id == worker.id)
+            or (salon and booking.salon_id == salon.id)):
+        abort(404)
+    return jsonify(data=BOOKING.dump(booking, BOOKING.select(request.args.get('fields'))))
+
+def api_worker():
+    worker = current_worker() if current_user.role == 'worker' else None
+    if worker is None:
+        abort(403, "Worker access required")
+    return worker
+
+@bp.route("/worker/bookings")
+@api_login_required
+@replica_reads
+def api_worker_bookings():
+    """The claim queue (status=Pending, oldest first) or the worker's own bookings (newest first)."""
+    worker = api_worker()
+    names = BOOKING.select(request.args.get('fields'))
+    status = request.args.get('status', 'Pending')
+    after = decode_cursor(request.args.get('cursor'), int)
+    limit = page_limit(request.args.get('limit'), current_app.config['WORKER_PAGE_SIZE'])
+    if status == 'Pending':
+        query = pending_for(worker)
+        if after:
+            query = query.filter(Booking.id > after[0])
+        rows = query.options(joinedload(Booking.service), joinedload(Booking.salon)).order_by(
+            Booking.id).limit(limit + 1).all()
+        rows, next_id = rows[:limit], (rows[limit - 1].id if len(rows) > limit else None)
+    elif status in EARNING_BOOKING_STATUSES:
+        rows, next_id = worker_bookings_page(worker, status, before=after[0] if after else None, limit=limit)
+    else:
+        raise InvalidRequest("status must be Pending, Accepted or Completed")
+    return api_page(BOOKING.dump_all(rows, names), encode_cursor(next_id) if next_id else None)
+
+@bp.route("/bookings/<int:booking_id>/accept", methods=["POST"])
+@api_login_required
+def api_accept_booking(booking_id):
+    worker = api_worker()
+    if not claim_booking(booking_id, worker):
+        return api_error(409, "This booking is no longer available")
+    return jsonify(data=BOOKING.dump(db.session.get(Booking, booking_id), BOOKING.default))
+
+@bp.route("/bookings/<int:booking_id>/complete", methods=["POST"])
+@api_login_required
+def api_complete_booking(booking_id):
+    worker = api_worker()
+    booking = Booking.query.get_or_404(booking_id)
+    if not finish_booking(booking, worker):
+        return api_error(409, "Only the assigned expert can complete an accepted booking")
+    return jsonify(data=BOOKING.dump(booking, BOOKING.default))
@@ -0,0 +1,89 @@
+"""Content-hashed static file names.
+
+At startup every file under the static folder is hashed, and `url_for('static',
+filename='css/styles.css')` then builds `/static/css/styles.<hash>.css`. Because
+the name changes whenever the content does, fingerprinted URLs are served with a
+one-year immutable cache lifetime. Requests for the plain name still work but
+are always revalidated.
+
+In debug mode, a file whose mtime changed is rehashed the next time a URL for it
+is built, so edits show up without a restart.
+"""
+import hashlib
+import os
+
+from flask import send_from_directory
+
+HASH_LENGTH = 12
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted(filename, digest):
+    """css/styles.css -> css/styles.<digest>.css"""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest}{ext}"
+
+
+class AssetManifest:
+    def __init__(self, app=None):
+        self.folder = None
+        self.files = {}  # filename -> (fingerprinted name, mtime)
+        self.originals = {}  # fingerprinted name -> filename
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_MAX_AGE', 31536000)
+        self.app = app
+        self.folder = app.static_folder
+        self.build()
+        app.url_defaults(self._fingerprint_url)
+        app.view_functions['static'] = self.static_view
+        app.extensions['assets'] = self
+
+    def build(self):
+        self.files.clear()
+        self.originals.clear()
+        if not self.folder or not os.path.isdir(self.folder):
+            return
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                path = os.path.join(root, name)
+                self._add(os.path.relpath(path, self.folder).replace(os.sep, '/'), path)
+
+    def _add(self, filename, path):
+        name = fingerprinted(filename, file_hash(path))
+        self.files[filename] = (name, os.path.getmtime(path))
+        self.originals[name] = filename
+        return name
+
+    def url_name(self, filename):
+        entry = self.files.get(filename)
+        if entry is None:
+            return filename
+        if self.app.debug:
+            path = os.path.join(self.folder, filename)
+            if os.path.exists(path) and os.path.getmtime(path) != entry[1]:
+                self.originals.pop(entry[0], None)
+                return self._add(filename, path)
+        return entry[0]
+
+    def _fingerprint_url(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.url_name(values['filename'])
+
+    def static_view(self, filename):
+        original = self.originals.get(filename)
+        if original is None:
+            return send_from_directory(self.folder, filename, max_age=0)
+        response = send_from_directory(self.folder, original, max_age=self.app.config['ASSETS_MAX_AGE'])
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
@@ -0,0 +1,101 @@
+"""Matching pending bookings to online workers.
+
+`plan` is pure: given the unassigned bookings of one salon and the state of its
+online workers, it returns which worker should take each booking. A worker is
+eligible when their skills cover the service and they are free for the whole
+slot. Among eligible workers the one with the fewest open jobs wins; ties go to
+whoever has been free the longest (the earliest free slot), then the lowest id.
+Bookings are placed in start order and every placement updates the worker's
+load and calendar, so a burst handled as one batch spreads out the same way as
+bookings arriving one by one.
+"""
+from bisect import bisect_left, insort
+from datetime import datetime
+
+# Onboarding specialisations and common skill words that name a service category
+CATEGORY_ALIASES = {
+    'haircut': 'hair', 'hair styling': 'hair', 'stylist': 'hair',
+    'facial': 'beauty parlour', 'skin care': 'beauty parlour', 'makeup': 'beauty parlour',
+    'massage': 'spa', 'manicure': 'nails', 'pedicure': 'nails', 'nail art': 'nails',
+}
+
+
+def normalize(term):
+    return ' '.join((term or '').lower().split())
+
+
+def skill_terms(skills, role=None):
+    """Normalized terms a worker's comma separated skills (and role) cover, aliases included."""
+    terms = {normalize(s) for s in (skills or '').split(',')}
+    if role:
+        terms.add(normalize(role))
+    terms.discard('')
+    return terms | {CATEGORY_ALIASES[t] for t in terms if t in CATEGORY_ALIASES}
+
+
+def covers(terms, category, service_name):
+    """True if any term names the service, its category, or is a kind of the category ('hair color' -> hair)."""
+    category, service_name = normalize(category), normalize(service_name)
+    if not category and not service_name:
+        return True
+    for term in terms:
+        if term in (category, service_name) or (category and term.split(' ', 1)[0] == category):
+            return True
+    return False
+
+
+class Candidate:
+    """One online worker during a planning pass."""
+
+    __slots__ = ('worker_id', 'terms', 'load', 'busy')
+
+    def __init__(self, worker_id, terms, load=0, busy=()):
+        self.worker_id = worker_id
+        self.terms = terms
+        self.load = load  # open (accepted, not completed) bookings
+        self.busy = sorted(busy)  # [(start, end)] of active bookings; a worker's bookings never overlap
+
+    def _before(self, moment):
+        """The booking that starts last before `moment`, or None."""
+        i = bisect_left(self.busy, (moment,))
+        return self.busy[i - 1] if i else None
+
+    def is_free(self, start, end):
+        previous = self._before(end)
+        return previous is None or previous[1] <= start
+
+    def free_since(self, start):
+        """End of the worker's last booking before `start` (datetime.min when none)."""
+        previous = self._before(start)
+        return previous[1] if previous else datetime.min
+
+
+def plan(bookings, candidates, now=None):
+    """[(booking_id, worker_id)] for `bookings` = [(id, start, end, category, service_name)].
+
+    Bookings without a slot time only need a skilled worker. Bookings no
+    candidate can take are left out and stay in the manual claim queue.
+    """
+    now = now or datetime.now()
+    skilled = {}  # (category, service name) -> candidates covering it
+    placed = []
+    for booking_id, start, end, category, service_name in sorted(bookings, key=lambda b: (b[1] or now, b[0])):
+        if (category, service_name) not in skilled:
+            skilled[category, service_name] = [c for c in candidates if covers(c.terms, category, service_name)]
+        eligible = [c for c in skilled[category, service_name] if start is None or c.is_free(start, end)]
+        if not eligible:
+            continue
+        best = min(eligible, key=lambda c: (c.load, c.free_since(start or now), c.worker_id))
+        best.load += 1
+        if start is not None:
+            insort(best.busy, (start, end))
+        placed.append((booking_id, best.worker_id))
+    return placed
+
+
+def fairness(counts):
+    """Jain's index of per-worker assignment counts: 1.0 is perfectly even, 1/n is one worker doing it all."""
+    counts = list(counts)
+    if not counts or not any(counts):
+        return 1.0
+    return sum(counts) ** 2 / (len(counts) * sum(c * c for c in counts))
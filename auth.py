@@ -0,0 +1,347 @@
+"""Sign-in, sign-up and the logged-in user's identity.
+
+Flask-Login's user loader and the current_worker()/current_salon() helpers read
+identities through the identity cache; the session listeners here drop an entry
+once a commit changes that user, their worker profile or their salon. The cache
+is per process: under serve.py the dropped ids are also published on the
+'identity' channel, which SiblingRelay carries to the other workers (see
+follow_identity_changes). A relayed event can be lost, so IDENTITY_CACHE_TTL
+still bounds how long another worker may serve a stale identity.
+"""
+import json
+import math
+import threading
+
+from flask import Blueprint, abort, current_app, flash, g, has_app_context, redirect, render_template, request, session, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+from sqlalchemy import event, inspect
+
+from events import broker
+from extensions import hasher, identity_cache, login_manager, otp_store, rate_limiter, sms
+from identity import attach, snapshot
+from models import Salon, SignupCode, User, Worker, db
+from otp import RateLimited
+from passwords import UNUSABLE_PASSWORD, HashingBusy
+
+bp = Blueprint('auth', __name__)
+
+IDENTITY_CHANNEL = 'identity'
+
+def _identity(user_id):
+    """Snapshots of the user, their worker profile and owned salon; one request and cache lookup per user."""
+    memo = g.setdefault('_identity', {})
+    if user_id in memo:
+        return memo[user_id]
+    entry = identity_cache.get(user_id)
+    if entry is None:
+        generation = identity_cache.generation(user_id)
+        row = db.session.query(User, Worker, Salon).outerjoin(
+            Worker, Worker.user_id == User.id
+        ).outerjoin(Salon, Salon.owner_id == User.id).filter(User.id == user_id).first()
+        if row is not None:
+            user, worker, salon = row
+            entry = identity_cache.put(user_id, {
+                'user': snapshot(user), 'worker': snapshot(worker), 'salon': snapshot(salon),
+            }, generation)
+    memo[user_id] = entry
+    return entry
+
+@login_manager.user_loader
+def load_user(user_id):
+    entry = _identity(int(user_id))
+    return attach(db.session, entry['user']) if entry else None
+
+def current_worker():
+    """The logged-in user's Worker profile (or None) without querying on a cache hit."""
+    entry = _identity(current_user.id)
+    return attach(db.session, entry['worker']) if entry else None
+
+def current_salon():
+    """The salon the logged-in owner runs (or None) without querying on a cache hit."""
+    entry = _identity(current_user.id)
+    return attach(db.session, entry['salon']) if entry else None
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_identity_changes(session, flush_context):
+    """Note which users' cached identity a flush touched; dropped once the commit lands."""
+    stale = session.info.setdefault('identity_stale', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            stale.add(obj.id)
+        elif isinstance(obj, (Worker, Salon)):
+            column = 'user_id' if isinstance(obj, Worker) else 'owner_id'
+            history = inspect(obj).attrs[column].history
+            stale.update(v for v in (getattr(obj, column), *history.deleted) if v is not None)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_identities(session):
+    stale = session.info.pop('identity_stale', None)
+    if stale:
+        identity_cache.invalidate(*stale)
+        broker.publish(IDENTITY_CHANNEL, 'invalidate', sorted(stale))
+        if has_app_context():
+            g.pop('_identity', None)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_identity_changes(session, previous_transaction):
+    session.info.pop('identity_stale', None)
+
+def follow_identity_changes(app):
+    """Start a thread dropping the identities other processes' commits changed from `app`'s cache."""
+    with app.app_context():
+        cache = identity_cache._get_current_object()
+    changes = broker.subscribe(IDENTITY_CHANNEL)
+
+    def run():
+        while True:
+            message = changes.get()
+            if message is None:  # the broker closed
+                return
+            cache.invalidate(*json.loads(message.partition('data: ')[2]))
+
+    threading.Thread(target=run, name='identity-changes', daemon=True).start()
+
+def authenticate(identifier, password):
+    """The user with this email or phone if `password` matches, else None. Raises HashingBusy."""
+    user = User.query.filter_by(email=identifier).first()
+    if not user:
+        user = User.query.filter_by(phone=identifier).first()
+    if not user or not hasher.verify(user.password, password):
+        return None
+    if hasher.needs_rehash(user.password):
+        # Old hash parameters: re-hash now while we hold the plain password; retried next login if busy
+        try:
+            user.password = hasher.hash(password)
+            db.session.commit()
+        except HashingBusy:
+            pass
+    return user
+
+@bp.route("/login", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        try:
+            user = authenticate(request.form.get("identifier"), request.form.get("password"))
+        except HashingBusy:
+            flash("We're handling a lot of sign-ins right now. Please try again in a moment.")
+            return render_template("login.html"), 503, {'Retry-After': '2'}
+
+        if user:
+            login_user(user)
+            # Redirect to appropriate dashboard based on role
+            if user.role == 'worker':
+                return redirect(url_for("worker.worker_dashboard"))
+            elif user.role == 'salon_owner':
+                return redirect(url_for("owner.owner_dashboard"))
+            return redirect(url_for("customer.home"))
+        else:
+            flash("Invalid credentials, please try again.")
+            
+    return render_template("login.html")
+
+# ─── OTP PHONE LOGIN ───────────────────────────────────────────────
+
+@bp.route("/send-otp", methods=["POST"])
+def send_otp():
+    phone = request.form.get("phone", "").strip()
+    if len(phone) != 10 or not phone.isdigit():
+        flash("Enter a valid 10-digit phone number.")
+        return redirect(url_for('customer.home'))
+
+    # Fast path: existing user skips OTP and goes straight to their dashboard
+    existing = User.query.filter_by(phone=phone).first()
+    if existing:
+        login_user(existing)
+        if existing.role == 'worker':
+            return redirect(url_for("worker.worker_dashboard"))
+        if existing.role == 'salon_owner':
+            return redirect(url_for("owner.owner_dashboard"))
+        return redirect(url_for('customer.home'))
+
+    # New number: issue a server-side OTP and text it in the background
+    return issue_otp(phone)
+
+@bp.route("/send-otp/<phone>")
+def send_otp_get(phone):
+    """Resend OTP via GET (resend link)."""
+    if len(phone) != 10 or not phone.isdigit():
+        abort(404)
+    return issue_otp(phone, resend=True)
+
+def issue_otp(phone, resend=False):
+    """Rate-limit per client address and phone, store a fresh code and queue the SMS."""
+    try:
+        rate_limiter.hit(f"otp:ip:{request.remote_addr}", *current_app.config['OTP_IP_LIMIT'])
+        rate_limiter.hit(f"otp:phone:{phone}", *current_app.config['OTP_PHONE_LIMIT'])
+    except RateLimited as e:
+        wait = math.ceil(e.retry_after)
+        flash(f"Too many codes requested. Please wait {wait} seconds before asking for another.")
+        return render_template('otp.html', phone=phone, otp_code=None), 429, {'Retry-After': str(wait)}
+
+    otp = otp_store.issue(phone)
+    sms.send(phone, f"Your SalonGo login code is {otp}. It expires in {current_app.config['OTP_TTL'] // 60} minutes.")
+    session['phone'] = phone
+    if not resend:
+        flash("OTP sent via SMS. Tap your number to view the demo code.")
+    return render_template('otp.html', phone=phone, otp_code=otp if current_app.config['OTP_REVEAL_CODE'] else None)
+
+@bp.route("/verify-otp", methods=["POST"])
+def verify_otp():
+    phone       = request.form.get('phone', '').strip()
+    entered     = request.form.get('otp', '').strip()
+    saved_phone = session.get('phone', '')
+
+    if phone != saved_phone:
+        flash("Session mismatch. Please try again.")
+        return redirect(url_for('customer.home'))
+
+    if not otp_store.verify(phone, entered):
+        flash("Incorrect OTP. Please try again.")
+        return render_template('otp.html', phone=phone, otp_code=None)
+
+    # OTP correct — find or create user
+    user = User.query.filter_by(phone=phone).first()
+    is_new = False
+    if not user:
+        is_new = True
+        user = User(
+            name=f"User {phone[-4:]}",
+            email=f"{phone}@salongo.app",
+            phone=phone,
+            password=UNUSABLE_PASSWORD,
+            role='customer'
+        )
+        db.session.add(user)
+        db.session.commit()
+
+    session.pop('phone', None)
+    login_user(user)
+
+    # New users go to profile creation step
+    if is_new:
+        return redirect(url_for('auth.create_profile'))
+    
+    # Existing users go to their respective dashboard
+    if user.role == 'worker':
+        return redirect(url_for("worker.worker_dashboard"))
+    elif user.role == 'salon_owner':
+        return redirect(url_for("owner.owner_dashboard"))
+    return redirect(url_for('customer.home'))
+
+@bp.route("/create-profile", methods=["GET", "POST"])
+@login_required
+def create_profile():
+    if request.method == "POST":
+        name  = request.form.get("name", "").strip()
+        email = request.form.get("email", "").strip()
+        role = request.form.get("role", "customer")
+        gender = request.form.get("gender", "")
+
+        specialization = request.form.get("specialization", "")
+        business_types = request.form.get("business_types", "")
+
+        if not name or not email:
+            flash("Please fill in both fields.")
+            return render_template("create_profile.html")
+
+        # Check email not taken by another user
+        existing = User.query.filter_by(email=email).first()
+        if existing and existing.id != current_user.id:
+            flash("That email is already in use.")
+            return render_template("create_profile.html")
+
+        current_user.name  = name
+        current_user.email = email
+        current_user.role = role
+        current_user.gender = gender
+        db.session.commit()
+
+        if role == 'worker':
+            # Save basic info and redirect to specialized onboarding
+            current_user.name = name
+            current_user.email = email
+            current_user.role = 'worker'
+            db.session.commit()
+            
+            # Store specialization in session to use in onboarding
+            if specialization:
+                session['initial_specialization'] = specialization
+                
+            return redirect(url_for('worker.worker_onboarding'))
+            
+        elif role == 'salon_owner':
+            # Save selected business types for onboarding (if any)
+            session['business_types'] = business_types
+            return redirect(url_for('owner.owner_onboarding'))
+            
+        return redirect(url_for('customer.home'))
+
+    return render_template("create_profile.html")
+
+@bp.route("/signup", methods=["GET", "POST"])
+def signup():
+    if request.method == "POST":
+        name = request.form.get("name")
+        email = request.form.get("email")
+        phone = request.form.get("phone")
+        password = request.form.get("password")
+        signup_code = request.form.get("signup_code")
+        
+        user_exists = User.query.filter_by(email=email).first()
+        if user_exists:
+            flash("Email already registered.")
+            return redirect(url_for("auth.signup"))
+
+        try:
+            password_hash = hasher.hash(password)
+        except HashingBusy:
+            flash("We're handling a lot of sign-ups right now. Please try again in a moment.")
+            return render_template("signup.html"), 503, {'Retry-After': '2'}
+            
+        role = 'customer'
+        salon_id = None
+
+        if signup_code:
+            code = SignupCode.query.filter_by(code=signup_code, is_used=False).first()
+            if code:
+                role = 'worker'
+                salon_id = code.salon_id
+                code.is_used = True
+            else:
+                flash("Invalid or used signup code.")
+                return redirect(url_for("auth.signup"))
+
+        new_user = User(
+            name=name,
+            email=email,
+            phone=phone,
+            password=password_hash,
+            role=role
+        )
+        db.session.add(new_user)
+        db.session.commit()
+
+        if role == 'worker' and salon_id:
+            new_worker = Worker(
+                name=name,
+                role="New Stylist",
+                phone=phone,
+                image_url="https://i.pravatar.cc/150?u=" + name.replace(" ", ""),
+                salon_id=salon_id,
+                user_id=new_user.id
+            )
+            db.session.add(new_worker)
+            db.session.commit()
+        
+        login_user(new_user)
+        if role == 'worker':
+            return redirect(url_for("customer.home", screen="profile"))
+        return redirect(url_for("customer.home"))
+        
+    return render_template("signup.html")
+
+@bp.route("/logout")
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for("customer.home"))
@@ -0,0 +1,137 @@
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from time import strptime
+
+DEFAULT_OPENING = time(9, 0)
+DEFAULT_CLOSING = time(21, 0)
+SLOT_STEP = 30  # minutes between candidate start times
+
+_CLOCK_FORMATS = ['%H:%M', '%I:%M %p', '%I %p', '%H:%M:%S', '%I:%M%p']
+_DATE_FORMATS = ['%Y-%m-%d', '%a, %b %d', '%d/%m/%Y']
+
+
+def parse_clock(value, default=None):
+    """'09:00', '9:00 AM' or '21:00' -> time. Falls back to `default` when unparseable."""
+    value = (value or '').strip().upper()
+    for fmt in _CLOCK_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    return default
+
+
+def parse_day(value, today=None):
+    """Booking date strings ('Tomorrow', 'Mon, Oct 19', '2026-10-19') -> date, or None.
+
+    A year-less date takes the year, within one of `today`'s, in which it falls on
+    the weekday it names; no two of those three years agree, so at most one does.
+    None when none does, rather than a guess.
+    """
+    today = today or date.today()
+    value = (value or '').strip()
+    if value.lower() == 'today':
+        return today
+    if value.lower() == 'tomorrow':
+        return today + timedelta(days=1)
+    for fmt in _DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if '%Y' in fmt:
+            return parsed.date()
+        weekday = strptime(value, fmt).tm_wday  # datetime.strptime drops the %a it matched
+        for year in (today.year, today.year + 1, today.year - 1):
+            day = parsed.date().replace(year=year)
+            if day.weekday() == weekday:
+                return day
+        return None
+    return None
+
+
+def parse_start(date_value, time_value, today=None):
+    day = parse_day(date_value, today)
+    clock = parse_clock(time_value)
+    if day is None or clock is None:
+        return None
+    return datetime.combine(day, clock)
+
+
+def format_clock(moment):
+    return moment.strftime('%I:%M %p').lstrip('0')
+
+
+def day_window(day, opening_time=None, closing_time=None):
+    opens = datetime.combine(day, parse_clock(opening_time, DEFAULT_OPENING))
+    closes = datetime.combine(day, parse_clock(closing_time, DEFAULT_CLOSING))
+    if closes <= opens:
+        closes = datetime.combine(day, DEFAULT_CLOSING)
+    return opens, closes
+
+
+def candidate_starts(opens, closes, duration, step=SLOT_STEP):
+    starts = []
+    moment = opens
+    last = closes - timedelta(minutes=duration)
+    while moment <= last:
+        starts.append(moment)
+        moment += timedelta(minutes=step)
+    return starts
+
+
+def _free_starts(starts, duration, busy):
+    """Starts whose [start, start+duration) misses every (start, end) in `busy` (sorted by start).
+
+    Both lists are sorted, so a single forward sweep suffices.
+    """
+    length = timedelta(minutes=duration)
+    free = []
+    i = 0
+    for start in starts:
+        end = start + length
+        # Drop intervals that finished before this candidate; they cannot block later ones either
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        j = i
+        blocked = False
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][1] > start:
+                blocked = True
+                break
+            j += 1
+        if not blocked:
+            free.append(start)
+    return free
+
+
+def open_slots(opens, closes, duration, worker_ids, bookings, unassigned=(), step=SLOT_STEP):
+    """Open start times for one day.
+
+    `bookings` is an iterable of (worker_id, start, end) ordered by worker then start,
+    as returned by the (worker_id, start_at) index. `unassigned` holds (start, end)
+    for 'Any Expert' bookings that still need one free worker each.
+    Returns ({worker_id: [start, ...]}, [start, ...] for 'Any Expert').
+    """
+    starts = candidate_starts(opens, closes, duration, step)
+    busy = {worker_id: [] for worker_id in worker_ids}
+    for worker_id, start, end in bookings:
+        if worker_id in busy:
+            busy[worker_id].append((start, end))
+
+    per_worker = {worker_id: _free_starts(starts, duration, intervals) for worker_id, intervals in busy.items()}
+
+    free_count = [0] * len(starts)
+    for free in per_worker.values():
+        for start in free:
+            free_count[bisect_left(starts, start)] += 1
+
+    length = timedelta(minutes=duration)
+    pending = sorted(unassigned)
+    any_expert = []
+    for k, start in enumerate(starts):
+        end = start + length
+        claimed = sum(1 for s, e in pending if s < end and e > start)
+        if free_count[k] > claimed:
+            any_expert.append(start)
+    return per_worker, any_expert
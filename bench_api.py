@@ -0,0 +1,119 @@
+"""Bytes and latency of the /api/v1 endpoints against the HTML pages they replace.
+
+Each pair is requested by one client through the Flask test client, on a
+throwaway copy of a generate_data.py dataset (cached like bench_http.py). For
+every endpoint we report the body size without and with gzip, plus p50/p95
+latency.
+
+    python bench_api.py --scale small --requests 200
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_http import dataset, percentile
+
+PAIRS = [
+    ('salon list', 'customer', lambda ids: '/', lambda ids: '/api/v1/salons'),
+    ('salon page', 'customer', lambda ids: f"/salon/{ids['salon']}",
+     lambda ids: f"/api/v1/salons/{ids['salon']}?fields=id,name,location,rating,opening_time,closing_time,services,workers"),
+    ('booking slots', 'customer', lambda ids: f"/booking/new/{ids['service']}",
+     lambda ids: f"/api/v1/services/{ids['service']}/availability"),
+    ('my bookings', 'customer', lambda ids: '/', lambda ids: '/api/v1/me/bookings'),
+    ('claim queue', 'worker', lambda ids: '/worker/dashboard', lambda ids: '/api/v1/worker/bookings'),
+]
+
+
+def child(requests, seed):
+    from app import create_app
+    from models import db, Booking, Salon, Service, Worker
+
+    app = create_app()
+
+    rng = random.Random(seed)
+    with app.app_context():
+        salon_id, worker_user_id = db.session.query(Salon.id, Worker.user_id).join(
+            Worker, Worker.salon_id == Salon.id
+        ).join(Booking, Booking.salon_id == Salon.id).filter(Worker.user_id.isnot(None)).group_by(
+            Salon.id, Worker.id
+        ).order_by(db.func.count(Booking.id).desc()).first()
+        customer_id = db.session.query(Booking.user_id).group_by(Booking.user_id).order_by(
+            db.func.count().desc()
+        ).limit(1).scalar()
+        salon_ids = [r[0] for r in db.session.query(Salon.id).limit(200)]
+        service_ids = [r[0] for r in db.session.query(Service.id).filter(Service.salon_id.in_(salon_ids))]
+
+    serializer = app.session_interface.get_signing_serializer(app)
+    cookie_name = app.config.get('SESSION_COOKIE_NAME', 'session')
+    clients = {}
+    for role, uid in (('customer', customer_id), ('worker', worker_user_id)):
+        clients[role] = app.test_client()
+        clients[role].set_cookie(cookie_name, serializer.dumps({'_user_id': str(uid), '_fresh': True}))
+
+    def measure(client, make_path):
+        latencies, sizes, gzipped = [], [], []
+        client.get(make_path({'salon': salon_id, 'service': service_ids[0]}))  # warm caches
+        for _ in range(requests):
+            path = make_path({'salon': rng.choice(salon_ids), 'service': rng.choice(service_ids)})
+            started = time.perf_counter()
+            response = client.get(path)
+            body = response.get_data()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise SystemExit(f"{path}: HTTP {response.status_code}")
+            sizes.append(len(body))
+            gzipped.append(len(gzip.compress(body, 6)))
+        latencies.sort()
+        return {'bytes': sum(sizes) / len(sizes), 'gzip': sum(gzipped) / len(gzipped),
+                'p50_ms': percentile(latencies, 50) * 1000, 'p95_ms': percentile(latencies, 95) * 1000}
+
+    results = {}
+    for name, role, html_path, api_path in PAIRS:
+        results[name] = {'html': measure(clients[role], html_path), 'api': measure(clients[role], api_path)}
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /api/v1 with the equivalent HTML pages.")
+    parser.add_argument('--scale', default='tiny', help="generate_data.py scale")
+    parser.add_argument('--requests', type=int, default=100, help="requests per endpoint")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.requests, args.seed)
+
+    source = dataset(args.scale, args.seed)
+    work = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    shutil.copy(source, work)
+    proc = subprocess.run(
+        [sys.executable, __file__, '--child', '--requests', str(args.requests), '--seed', str(args.seed)],
+        env={**os.environ, 'DATABASE_URL': f"sqlite:///{work}", 'JOB_RUNNER_THREADS': '0'},
+        capture_output=True, text=True,
+    )
+    shutil.rmtree(os.path.dirname(work), ignore_errors=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode or not lines:
+        sys.exit(proc.stderr.strip()[-2000:])
+
+    print(f"{'endpoint':14} {'':5} {'bytes':>9} {'gzip':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, pair in json.loads(lines[-1]).items():
+        for kind in ('html', 'api'):
+            r = pair[kind]
+            print(f"{name if kind == 'html' else '':14} {kind:5} {r['bytes']:>9,.0f} {r['gzip']:>8,.0f} "
+                  f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+        html, api = pair['html'], pair['api']
+        print(f"{'':14} {'':5} {api['bytes'] / html['bytes']:>8.1%} {api['gzip'] / html['gzip']:>8.1%} "
+              f"{api['p50_ms'] / html['p50_ms']:>8.1%} {api['p95_ms'] / html['p95_ms']:>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
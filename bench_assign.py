@@ -0,0 +1,152 @@
+"""Simulated booking bursts against the automatic worker assignment scheduler.
+
+One salon with hundreds of workers (mixed skills, most of them online) receives
+"any expert" bookings as a Poisson stream. The scheduler runs once per batch
+window, as the job queue would run it, on a fresh copy of the database for every
+window size. Assignment passes really run; only the arrival clock is simulated.
+A booking's latency is the time from its arrival until the pass that placed it
+finished, including any wait for the window to close or for the previous pass.
+
+Fairness is Jain's index over per-worker assignment counts, taken within each
+group of workers with the same skills (1.0 means perfectly even).
+
+    python bench_assign.py --workers 300 --bookings 3000 --rate 150 --windows 0,0.5,2
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+db_file = os.path.join(tempfile.mkdtemp(), 'assign.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+os.environ.setdefault('JOB_RUNNER_THREADS', '0')
+
+from sqlalchemy import insert
+
+from app import create_app
+from bookings import assign_pending
+from models import db, Booking, Salon, Service, User, Worker
+from assignment import fairness
+from bench_http import percentile
+import migrations
+
+app = create_app()
+
+CATEGORIES = {'Hair': ['Classic Haircut', 'Hair Color', 'Beard Trim'], 'Spa': ['Swedish Massage', 'Head Massage'],
+              'Beauty Parlour': ['Facial', 'Threading'], 'Nails': ['Manicure', 'Pedicure']}
+CATEGORY_WEIGHTS = [0.55, 0.15, 0.2, 0.1]
+
+
+def build(workers, seed):
+    """Salon, services and workers; returns (salon_id, customer_id, [(service_id, duration)])."""
+    rng = random.Random(seed)
+    with app.app_context():
+        db.create_all()
+        migrations.upgrade(db.engine, log=None)
+        customer = User(name="Load Test", email="load@example.com", phone="9000000000", password="x")
+        salon = Salon(name="Assignment Test Salon", location="Pune, Baner", opening_time='09:00 AM',
+                      closing_time='09:00 PM')
+        db.session.add_all([customer, salon])
+        db.session.flush()
+        services = [Service(name=name, category=category, price=500, duration=rng.choice([30, 45, 60]),
+                            salon_id=salon.id) for category, names in CATEGORIES.items() for name in names]
+        db.session.add_all(services)
+        for i in range(workers):
+            skills = rng.choices(list(CATEGORIES), CATEGORY_WEIGHTS, k=rng.choice([1, 1, 2]))
+            db.session.add(Worker(name=f"Worker {i}", salon_id=salon.id, skills=', '.join(dict.fromkeys(skills)),
+                                  is_online=rng.random() < 0.8))
+        db.session.commit()
+        built = salon.id, customer.id, [(s.id, s.duration) for s in services]
+        db.session.remove()
+        db.engine.dispose()  # closing the last connection checkpoints the WAL into the file we copy
+    return built
+
+
+def simulate(salon_id, customer_id, services, bookings, rate, window, seed):
+    rng = random.Random(seed)
+    day = date.today() + timedelta(days=1)
+    slots = [datetime.combine(day, datetime.min.time()) + timedelta(hours=9, minutes=30 * i) for i in range(22)]
+    arrivals, clock = [], 0.0
+    for _ in range(bookings):
+        clock += rng.expovariate(rate)
+        arrivals.append(clock)
+
+    # Arrivals grouped into the pass that first sees them
+    batches = {}
+    for n, at in enumerate(arrivals):
+        closes = at if window <= 0 else (int(at // window) + 1) * window
+        batches.setdefault(closes, []).append(n)
+
+    latencies, pass_ms, assigned = [], [], 0
+    busy_until = 0.0
+    with app.app_context():
+        for closes, members in sorted(batches.items()):
+            rows = []
+            for n in members:
+                service_id, duration = rng.choice(services)
+                start = rng.choice(slots)
+                rows.append({'user_id': customer_id, 'salon_id': salon_id, 'service_id': service_id,
+                             'date': day.isoformat(), 'time': start.strftime('%I:%M %p'), 'status': 'Pending',
+                             'start_at': start, 'end_at': start + timedelta(minutes=duration)})
+            db.session.execute(insert(Booking), rows)
+            db.session.commit()
+            started = time.perf_counter()
+            assigned += assign_pending(salon_id, limit=len(rows) + 100)
+            elapsed = time.perf_counter() - started
+            db.session.remove()
+            pass_ms.append(elapsed * 1000)
+            busy_until = max(busy_until, closes) + elapsed
+            latencies.extend(busy_until - arrivals[n] for n in members)
+
+        per_worker = dict(db.session.query(Worker.id, Worker.skills).filter(Worker.is_online.is_(True)).all())
+        counts = dict(db.session.query(Booking.worker_id, db.func.count(Booking.id)).filter(
+            Booking.status == 'Accepted').group_by(Booking.worker_id).all())
+    groups = {}
+    for worker_id, skills in per_worker.items():
+        groups.setdefault(skills, []).append(counts.get(worker_id, 0))
+    scores = [fairness(c) for c in groups.values() if sum(c)]
+    loads = [counts.get(worker_id, 0) for worker_id in per_worker]
+    latencies.sort()
+    pass_ms.sort()
+    return {
+        'assigned': assigned, 'passes': len(pass_ms),
+        'p50_ms': percentile(latencies, 50) * 1000, 'p95_ms': percentile(latencies, 95) * 1000,
+        'pass_p50_ms': percentile(pass_ms, 50), 'pass_p95_ms': percentile(pass_ms, 95),
+        'per_second': assigned / (sum(pass_ms) / 1000) if pass_ms else 0,
+        'fairness': min(scores) if scores else 1.0, 'max_load': max(loads, default=0),
+        'min_load': min(loads, default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate assignment of booking bursts.")
+    parser.add_argument('--workers', type=int, default=300)
+    parser.add_argument('--bookings', type=int, default=3000)
+    parser.add_argument('--rate', type=float, default=150, help="bookings arriving per second")
+    parser.add_argument('--windows', default='0,0.5,2', help="comma separated batch windows in seconds")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    salon_id, customer_id, services = build(args.workers, args.seed)
+    template = db_file + '.template'
+    shutil.copy(db_file, template)
+    print(f"{args.workers} workers, {args.bookings} bookings at {args.rate:g}/s")
+    print(f"{'window s':>8} {'passes':>7} {'assigned':>9} {'p50 ms':>9} {'p95 ms':>9} {'pass p95':>9} "
+          f"{'assign/s':>9} {'fairness':>9} {'min-max':>8}")
+    for window in (float(w) for w in args.windows.split(',')):
+        with app.app_context():
+            db.engine.dispose()  # no pooled connection may outlive the copy
+        shutil.copy(template, db_file)
+        r = simulate(salon_id, customer_id, services, args.bookings, args.rate, window, args.seed)
+        print(f"{window:>8g} {r['passes']:>7} {r['assigned']:>9} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['pass_p95_ms']:>9.1f} {r['per_second']:>9.0f} {r['fairness']:>9.3f} "
+              f"{r['min_load']:>3}-{r['max_load']:<4}")
+    shutil.rmtree(os.path.dirname(db_file), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Concurrency stress test for the booking claim queue.
+
+Many threads, each acting as a different worker of one salon, race to accept the
+same pending bookings. Every booking must end up accepted exactly once.
+
+    python bench_claims.py [bookings] [threads]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+db_file = os.path.join(tempfile.mkdtemp(), 'claims.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+
+from app import create_app
+from bookings import claim_booking
+from models import db, Salon, Worker, Service, User, Booking
+import migrations
+
+app = create_app()
+
+NUM_BOOKINGS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+NUM_THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+with app.app_context():
+    db.create_all()
+    migrations.upgrade(db.engine, log=None)
+    customer = User(name="Load Test", email="load@example.com", phone="9000000000", password="x")
+    salon = Salon(name="Claim Test Salon", location="Pune, Kothrud")
+    db.session.add_all([customer, salon])
+    db.session.flush()
+    service = Service(name="Crew Cut", price=250, category="Hair", salon_id=salon.id)
+    workers = [Worker(name=f"Worker {i}", salon_id=salon.id) for i in range(NUM_THREADS)]
+    db.session.add(service)
+    db.session.add_all(workers)
+    db.session.flush()
+    db.session.add_all([
+        Booking(user_id=customer.id, salon_id=salon.id, service_id=service.id, date="Tomorrow", time="11:00 AM")
+        for _ in range(NUM_BOOKINGS)
+    ])
+    db.session.commit()
+    booking_ids = [b.id for b in Booking.query.all()]
+    # Detached copies: claimants only need id/salon_id and must not hold a connection while waiting
+    for worker in workers:
+        db.session.refresh(worker)
+    db.session.expunge_all()
+
+wins = {}
+errors = []
+lock = threading.Lock()
+barrier = threading.Barrier(NUM_THREADS)
+
+
+def claimant(worker):
+    order = booking_ids[:]
+    random.shuffle(order)
+    with app.app_context():
+        barrier.wait()
+        for booking_id in order:
+            try:
+                if claim_booking(booking_id, worker):
+                    with lock:
+                        wins.setdefault(booking_id, []).append(worker.id)
+            except Exception as e:
+                db.session.rollback()
+                with lock:
+                    errors.append(repr(e))
+
+
+threads = [threading.Thread(target=claimant, args=(w,)) for w in workers]
+started = time.perf_counter()
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+elapsed = time.perf_counter() - started
+
+with app.app_context():
+    rows = {b.id: b for b in Booking.query.all()}
+    mismatched = [i for i, w in wins.items() if rows[i].worker_id != w[0]]
+
+duplicates = [i for i, w in wins.items() if len(w) > 1]
+unclaimed = [i for i in booking_ids if i not in wins]
+attempts = NUM_BOOKINGS * NUM_THREADS
+print(f"{NUM_THREADS} threads x {NUM_BOOKINGS} bookings: {attempts} claim attempts in {elapsed:.2f}s "
+      f"({attempts / elapsed:.0f} claims/s)")
+print(f"duplicates={len(duplicates)} unclaimed={len(unclaimed)} mismatched={len(mismatched)} errors={len(errors)}")
+if errors:
+    print("first error:", errors[0])
+sys.exit(1 if duplicates or unclaimed or mismatched else 0)
@@ -0,0 +1,122 @@
+"""Latency of nearest-salon queries on a large salon table.
+
+A salons-only dataset is generated once with generate_data.py and cached under
+instance/bench. Queries are then timed from random points around the seeded
+cities, with each filter combination the mobile app sends. As a baseline, the
+same radius is also answered with a latitude/longitude bounding box that has no
+index behind it.
+
+    python bench_geo.py --salons 100000 --queries 500
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_http import CACHE, HERE, percentile
+
+CASES = [
+    ('nearest 20', {}),
+    ('open, 5 km', {'radius_km': 5, 'open_only': True}),
+    ('hair, 4.5+', {'category': 'Hair', 'min_rating': 4.5}),
+    ('nails, open', {'category': 'Nails', 'open_only': True}),
+    ('25 km, limit 100', {'radius_km': 25, 'limit': 100}),
+]
+
+
+def child(queries, seed):
+    from app import create_app
+    from models import db, Salon
+    from salons import nearby_salons
+    from geo import KM_PER_DEGREE
+    from generate_data import CITY_CENTRES
+
+    app = create_app()
+
+    rng = random.Random(seed)
+    centres = list(CITY_CENTRES.values())
+    points = [(lat + rng.uniform(-0.1, 0.1), lng + rng.uniform(-0.1, 0.1))
+              for lat, lng in (rng.choice(centres) for _ in range(queries))]
+
+    def timed(run):
+        latencies, found = [], 0
+        for lat, lng in points:
+            started = time.perf_counter()
+            found += len(run(lat, lng))
+            latencies.append(time.perf_counter() - started)
+            db.session.remove()
+        latencies.sort()
+        return {'p50_ms': percentile(latencies, 50) * 1000, 'p95_ms': percentile(latencies, 95) * 1000,
+                'found': found / len(points)}
+
+    def scan(lat, lng):
+        d = 5 / KM_PER_DEGREE
+        return db.session.query(Salon.id).filter(
+            Salon.latitude.between(lat - d, lat + d), Salon.longitude.between(lng - d, lng + d)
+        ).all()
+
+    results = {}
+    with app.app_context():
+        results['salons'] = db.session.query(db.func.count(Salon.id)).scalar()
+        nearby_salons(*points[0])  # warm the page cache
+        for name, options in CASES:
+            results[name] = timed(lambda lat, lng: nearby_salons(lat, lng, **options))
+        results['5 km box, no index'] = timed(scan)
+
+        client = app.test_client()
+        results['GET /api/v1/salons/nearby'] = timed(
+            lambda lat, lng: client.get(f"/api/v1/salons/nearby?lat={lat}&lng={lng}&open=1").get_json()['data']
+        )
+    print(json.dumps(results))
+
+
+def geo_dataset(salons, seed):
+    os.makedirs(CACHE, exist_ok=True)
+    path = os.path.join(CACHE, f"geo-{salons}-{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating {salons:,} salons (cached at {path})...", flush=True)
+        subprocess.run([sys.executable, os.path.join(HERE, 'generate_data.py'), '--salons', str(salons),
+                        '--users', str(salons), '--bookings', '0', '--seed', str(seed)],
+                       env={**os.environ, 'DATABASE_URL': f"sqlite:///{path}"}, check=True,
+                       stdout=subprocess.DEVNULL)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time nearest-salon queries.")
+    parser.add_argument('--salons', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=300, help="queries per case")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.queries, args.seed)
+
+    source = geo_dataset(args.salons, args.seed)
+    work = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    shutil.copy(source, work)
+    proc = subprocess.run(
+        [sys.executable, __file__, '--child', '--queries', str(args.queries), '--seed', str(args.seed)],
+        env={**os.environ, 'DATABASE_URL': f"sqlite:///{work}", 'JOB_RUNNER_THREADS': '0'},
+        capture_output=True, text=True,
+    )
+    shutil.rmtree(os.path.dirname(work), ignore_errors=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode or not lines:
+        sys.exit(proc.stderr.strip()[-2000:])
+
+    results = json.loads(lines[-1])
+    print(f"{results.pop('salons'):,} salons")
+    print(f"{'query':28} {'p50 ms':>8} {'p95 ms':>8} {'salons':>8}")
+    for name, r in results.items():
+        print(f"{name:28} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['found']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""End-to-end benchmark of the main user journeys over real Flask routes.
+
+Each journey is replayed by concurrent clients acting as a customer, an owner or
+a worker. Clients go through the Flask test client or real HTTP against a
+threaded local server (--mode). Datasets come from generate_data.py and are
+cached under instance/bench/. Every dataset runs in its own process on a
+throwaway copy, because confirm_booking and accept_booking write.
+
+    python bench_http.py --scales tiny,small --mode both --save baseline.json
+    python bench_http.py --scales small --compare baseline.json
+
+Reported per journey: requests/s, p50/p95/p99 latency (ms), SQL statements per
+request and non-2xx/3xx responses.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+
+import migrations
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE = os.path.join(HERE, 'instance', 'bench')
+
+JOURNEYS = ['home', 'salon_details', 'start_booking', 'confirm_booking', 'owner_dashboard', 'worker_dashboard',
+            'accept_booking']
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class TestClientSession:
+    def __init__(self, app, cookie):
+        self.client = app.test_client()
+        self.client.set_cookie(app.config.get('SESSION_COOKIE_NAME', 'session'), cookie)
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code, int(response.headers.get('X-Bench-Queries', 0))
+
+
+class HttpSession:
+    """Keep-alive HTTP/1.1 client carrying the signed session cookie."""
+
+    def __init__(self, port, cookie_name, cookie):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self.cookie = f"{cookie_name}={cookie}"
+
+    def request(self, method, path, data=None):
+        headers = {'Cookie': self.cookie}
+        body = None
+        if data is not None:
+            body = '&'.join(f"{k}={v}" for k, v in data.items())
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        return response.status, int(response.getheader('X-Bench-Queries', 0))
+
+
+def child(mode, requests_per_journey, concurrency, seed):
+    """Runs inside the benchmark process for one dataset; prints one JSON document."""
+    from flask import g
+    from werkzeug.serving import make_server
+
+    from app import create_app
+    from models import db, Booking, Salon, Service, User, Worker
+    from query_budget import count_queries
+
+    app = create_app()
+
+    app.config['JOB_RUNNER_THREADS'] = 0
+
+    @app.before_request
+    def _start_counting():
+        g._bench_counter = count_queries()
+        g._bench_statements = g._bench_counter.__enter__()
+
+    @app.after_request
+    def _report_count(response):
+        if '_bench_statements' in g:
+            response.headers['X-Bench-Queries'] = str(len(g._bench_statements))
+        return response
+
+    @app.teardown_request
+    def _stop_counting(exc):
+        counter = g.pop('_bench_counter', None)
+        if counter is not None:
+            counter.__exit__(None, None, None)
+
+    rng = random.Random(seed)
+    with app.app_context():
+        # Busiest salon with a worker login; its owner and a regular customer act on it
+        salon_id, worker_user_id, worker_id = db.session.query(Salon.id, Worker.user_id, Worker.id).join(
+            Worker, Worker.salon_id == Salon.id
+        ).join(Booking, Booking.salon_id == Salon.id).filter(
+            Worker.user_id.isnot(None), Booking.status == 'Pending'
+        ).group_by(Salon.id, Worker.id).order_by(db.func.count(Booking.id).desc()).first()
+        owner_id = db.session.query(Salon.owner_id).filter_by(id=salon_id).scalar()
+        customer_id = db.session.query(Booking.user_id).filter_by(salon_id=salon_id).group_by(
+            Booking.user_id
+        ).order_by(db.func.count().desc()).limit(1).scalar()
+        salon_ids = [r[0] for r in db.session.query(Salon.id).limit(500)]
+        service_ids = [r[0] for r in db.session.query(Service.id).filter(Service.salon_id.in_(salon_ids))]
+        pending = [r[0] for r in db.session.query(Booking.id).filter(
+            Booking.salon_id == salon_id, Booking.status == 'Pending',
+            db.or_(Booking.worker_id.is_(None), Booking.worker_id == worker_id)
+        ).order_by(Booking.id).limit(requests_per_journey)]
+        counts = {'salons': Salon.query.count(), 'users': User.query.count(), 'bookings': Booking.query.count()}
+
+    serializer = app.session_interface.get_signing_serializer(app)
+    cookies = {role: serializer.dumps({'_user_id': str(uid), '_fresh': True})
+               for role, uid in (('customer', customer_id), ('owner', owner_id), ('worker', worker_user_id))}
+    pending_lock = threading.Lock()
+
+    def next_pending():
+        with pending_lock:
+            return pending.pop(0) if pending else 0
+
+    journeys = {
+        'home': ('customer', lambda: ('GET', '/', None)),
+        'salon_details': ('customer', lambda: ('GET', f'/salon/{rng.choice(salon_ids)}', None)),
+        'start_booking': ('customer', lambda: ('GET', f'/booking/new/{rng.choice(service_ids)}', None)),
+        'confirm_booking': ('customer', lambda: ('POST', '/cart/confirm', {
+            'service_id': rng.choice(service_ids),
+            'start': f"2031-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(9, 19):02d}:00",
+        })),
+        'owner_dashboard': ('owner', lambda: ('GET', '/owner/dashboard', None)),
+        'worker_dashboard': ('worker', lambda: ('GET', '/worker/dashboard', None)),
+        'accept_booking': ('worker', lambda: ('GET', f'/worker/accept_booking/{next_pending()}', None)),
+    }
+
+    server = None
+    if mode == 'server':
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    cookie_name = app.config.get('SESSION_COOKIE_NAME', 'session')
+
+    def session_for(role):
+        if mode == 'server':
+            return HttpSession(server.server_port, cookie_name, cookies[role])
+        return TestClientSession(app, cookies[role])
+
+    results = {}
+    for name in JOURNEYS:
+        role, make_request = journeys[name]
+        latencies, queries, failures = [], [], []
+        lock = threading.Lock()
+        per_client = max(1, requests_per_journey // concurrency)
+
+        def client():
+            http = session_for(role)
+            if name != 'accept_booking':
+                http.request(*make_request())  # warm-up: identity cache, connection
+            mine, mine_q, mine_f = [], [], 0
+            for _ in range(per_client):
+                method, path, data = make_request()
+                started = time.perf_counter()
+                status, statements = http.request(method, path, data)
+                mine.append(time.perf_counter() - started)
+                mine_q.append(statements)
+                mine_f += status >= 400
+            with lock:
+                latencies.extend(mine)
+                queries.extend(mine_q)
+                failures.append(mine_f)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        results[name] = {
+            'role': role,
+            'requests': len(latencies),
+            'rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries': sum(queries) / max(len(queries), 1),
+            'errors': sum(failures),
+        }
+    if server:
+        server.shutdown()
+    print(json.dumps({'counts': counts, 'journeys': results}))
+
+
+def dataset(scale, seed):
+    os.makedirs(CACHE, exist_ok=True)
+    path = os.path.join(CACHE, f"{scale}-{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating {scale} dataset (cached at {path})...", flush=True)
+        subprocess.run([sys.executable, os.path.join(HERE, 'generate_data.py'), '--scale', scale, '--seed', str(seed)],
+                       env={**os.environ, 'DATABASE_URL': f"sqlite:///{path}"}, check=True,
+                       stdout=subprocess.DEVNULL)
+    # Datasets cached by an older checkout pick up newer columns and indexes
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine, log=None)
+    engine.dispose()
+    return path
+
+
+def print_table(label, run, baseline=None):
+    counts = run['counts']
+    print(f"\n{label}: {counts['salons']:,} salons, {counts['users']:,} users, {counts['bookings']:,} bookings")
+    print(f"  {'journey':17} {'as':9} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'sql/req':>8} {'errors':>6}"
+          + ("  vs baseline" if baseline else ""))
+    for name, r in run['journeys'].items():
+        line = (f"  {name:17} {r['role']:9} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                f"{r['p99_ms']:>8.1f} {r['queries']:>8.1f} {r['errors']:>6}")
+        base = (baseline or {}).get('journeys', {}).get(name)
+        if base:
+            line += (f"  req/s {(r['rps'] / base['rps'] - 1) * 100:+.0f}%"
+                     f", p95 {(r['p95_ms'] / base['p95_ms'] - 1) * 100:+.0f}%"
+                     f", sql {r['queries'] - base['queries']:+.1f}")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the main user journeys.")
+    parser.add_argument('--scales', default='tiny', help="comma separated generate_data.py scales")
+    parser.add_argument('--mode', choices=['testclient', 'server', 'both'], default='testclient')
+    parser.add_argument('--requests', type=int, default=200, help="requests per journey")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', help="write results as baseline JSON")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'DB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child[0], args.requests, args.concurrency, args.seed)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['runs']
+    modes = ['testclient', 'server'] if args.mode == 'both' else [args.mode]
+    runs = {}
+    for scale in args.scales.split(','):
+        source = dataset(scale, args.seed)
+        for mode in modes:
+            work = os.path.join(tempfile.mkdtemp(), 'bench.db')
+            shutil.copy(source, work)
+            proc = subprocess.run(
+                [sys.executable, __file__, '--child', mode, work, '--requests', str(args.requests),
+                 '--concurrency', str(args.concurrency), '--seed', str(args.seed)],
+                env={**os.environ, 'DATABASE_URL': f"sqlite:///{work}", 'JOB_RUNNER_THREADS': '0'},
+                capture_output=True, text=True,
+            )
+            shutil.rmtree(os.path.dirname(work), ignore_errors=True)
+            key = f"{scale}/{mode}"
+            lines = proc.stdout.strip().splitlines()
+            if proc.returncode or not lines:
+                print(f"\n{key}: failed\n{proc.stderr.strip()[-2000:]}")
+                continue
+            runs[key] = json.loads(lines[-1])
+            print_table(key, runs[key], baseline.get(key))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'requests': args.requests,
+                       'concurrency': args.concurrency, 'seed': args.seed, 'runs': runs}, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+
+if __name__ == '__main__':
+    main()
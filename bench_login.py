@@ -0,0 +1,78 @@
+"""Login throughput with password hashing inline vs. in process pools of different sizes.
+
+Every configuration runs the same burst of concurrent /login POSTs against a
+temporary database. Logins refused with 503 (hash queue full) are counted
+separately; they are the pool shedding load rather than failures.
+
+    python bench_login.py [threads] [logins_per_thread]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+db_file = os.path.join(tempfile.mkdtemp(), 'login.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+
+from app import create_app
+from models import db, User
+from passwords import PasswordHasher
+import migrations
+
+app = create_app()
+
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+PER_THREAD = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+PASSWORD = "correct horse battery"
+
+with app.app_context():
+    db.create_all()
+    migrations.upgrade(db.engine, log=None)
+    stored = PasswordHasher(method=app.config['PASSWORD_HASH_METHOD'], workers=0).hash(PASSWORD)
+    db.session.add_all([
+        User(name=f"Login {i}", email=f"login{i}@example.com", phone=f"80000{i:05d}", password=stored)
+        for i in range(THREADS)
+    ])
+    db.session.commit()
+
+
+def burst():
+    results = {'ok': 0, 'busy': 0, 'failed': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def customer(i):
+        client = app.test_client()
+        barrier.wait()
+        for _ in range(PER_THREAD):
+            response = client.post('/login', data={'identifier': f"login{i}@example.com", 'password': PASSWORD})
+            outcome = 'ok' if response.status_code == 302 else 'busy' if response.status_code == 503 else 'failed'
+            client.get('/logout')
+            with lock:
+                results[outcome] += 1
+
+    threads = [threading.Thread(target=customer, args=(i,)) for i in range(THREADS)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - started
+
+
+cores = os.cpu_count() or 1
+sizes = [0] + sorted({1, 2, 4, cores})
+print(f"{THREADS} concurrent clients x {PER_THREAD} logins, {cores} core(s), method {app.config['PASSWORD_HASH_METHOD']}")
+print(f"{'hashing':14} {'ok':>5} {'503':>5} {'failed':>6} {'logins/s':>9} {'seconds':>8}")
+for workers in sizes:
+    # Stands in for the hasher extensions.py would build from PASSWORD_HASH_WORKERS
+    hasher = app.extensions.setdefault('services', {})['hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'], workers=workers)
+    if workers:
+        hasher.verify(stored, PASSWORD)  # start the pool outside the timed burst
+    results, elapsed = burst()
+    hasher.shutdown()
+    label = "inline" if not workers else f"{workers} process(es)"
+    print(f"{label:14} {results['ok']:>5} {results['busy']:>5} {results['failed']:>6} "
+          f"{results['ok'] / elapsed:>9.1f} {elapsed:>8.2f}")
@@ -0,0 +1,171 @@
+"""Requests per second through the development server and through serve.py.
+
+Both servers run as separate processes on the same machine, each against its own
+copy of a generate_data.py dataset (cached like bench_http.py). The development
+server is started exactly as run.bat does, with `python app.py`: debug mode,
+reloader, port 5000. The production server is `python serve.py`. Job runners are
+off in both. Once /readyz answers, each distinct page is fetched once in turn
+("first ms": what the first visitors after a deploy wait). Then concurrent
+keep-alive clients replay a mix of read-only pages for a fixed time, as a
+signed-in customer. The clients share the CPUs with the server under test, so
+on a single CPU the extra workers have nothing to run on.
+
+    python bench_serve.py --scale tiny --duration 20 --concurrency 16 --workers 4
+"""
+import argparse
+import http.client
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_http import HERE, HttpSession, dataset, percentile
+
+DEV_PORT = 5000  # fixed by app.py
+
+
+def wait_ready(port, proc, timeout=120):
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/readyz')
+            if conn.getresponse().status == 200:
+                return time.monotonic() - started
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f"server on port {port} not ready after {timeout}s")
+
+
+def first_pass(port, cookie, paths):
+    """Milliseconds to fetch each distinct page once, in order, right after startup."""
+    session = HttpSession(port, 'session', cookie)
+    started = time.perf_counter()
+    for path in dict.fromkeys(paths):
+        session.request('GET', path)
+    return (time.perf_counter() - started) * 1000
+
+
+def load(port, cookie, paths, duration, concurrency, seed):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(n):
+        rng = random.Random(seed + n)
+        session = HttpSession(port, 'session', cookie)
+        mine, failed = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status, _ = session.request('GET', rng.choice(paths))
+            except (OSError, http.client.HTTPException):
+                status = 599
+                session = HttpSession(port, 'session', cookie)
+            mine.append(time.perf_counter() - started)
+            failed += status >= 400
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {'requests': len(latencies), 'rps': len(latencies) / elapsed, 'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000, 'p99_ms': percentile(latencies, 99) * 1000,
+            'errors': sum(errors)}
+
+
+def targets(path):
+    """A customer's signed session cookie and the page mix, from one dataset copy."""
+    os.environ['DATABASE_URL'] = f"sqlite:///{path}"
+    os.environ['JOB_RUNNER_THREADS'] = '0'
+    from app import create_app
+    from models import db, Booking, Salon, Service
+
+    app = create_app()
+
+    with app.app_context():
+        # A typical customer: the busiest ones have thousands of bookings on their home page
+        customers = db.session.query(Booking.user_id).group_by(Booking.user_id).order_by(db.func.count())
+        customer_id = customers.offset(customers.count() // 2).limit(1).scalar()
+        salon_ids = [r[0] for r in db.session.query(Salon.id).limit(200)]
+        service_ids = [r[0] for r in db.session.query(Service.id).filter(Service.salon_id.in_(salon_ids))]
+        db.session.remove()
+        db.engine.dispose()
+    cookie = app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(customer_id), '_fresh': True})
+    rng = random.Random(0)
+    paths = (['/'] * 4 + [f'/salon/{rng.choice(salon_ids)}' for _ in range(8)]
+             + [f'/booking/new/{rng.choice(service_ids)}' for _ in range(4)]
+             + ['/api/v1/salons', '/search?cat=Hair', '/api/v1/me/bookings'])
+    return cookie, paths
+
+
+def run(name, command, port, source, args, cookie, paths):
+    work = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    shutil.copy(source, work)
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{work}", 'JOB_RUNNER_THREADS': '0'}
+    proc = subprocess.Popen(command, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+    try:
+        boot = wait_ready(port, proc)
+        first = first_pass(port, cookie, paths)
+        load(port, cookie, paths, min(3, args.duration), args.concurrency, args.seed)  # warm-up, not counted
+        result = load(port, cookie, paths, args.duration, args.concurrency, args.seed)
+    finally:
+        os.killpg(proc.pid, signal.SIGTERM)  # the whole group: app.py's reloader runs the server in a child
+        try:
+            proc.wait(30)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+        shutil.rmtree(os.path.dirname(work), ignore_errors=True)
+    result['boot_s'], result['first_ms'] = boot, first
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the development server with serve.py.")
+    parser.add_argument('--scale', default='tiny', help="generate_data.py scale")
+    parser.add_argument('--duration', type=float, default=20, help="seconds of load per server")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="serve.py worker processes")
+    parser.add_argument('--threads', type=int, default=16, help="serve.py threads per worker")
+    parser.add_argument('--port', type=int, default=8765, help="serve.py port")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    source = dataset(args.scale, args.seed)
+    cookie, paths = targets(source)
+    servers = [
+        ('app.py (dev)', [sys.executable, 'app.py'], DEV_PORT),
+        (f'serve.py {args.workers}x{args.threads}',
+         [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(args.port), '--workers', str(args.workers),
+          '--threads', str(args.threads), '--jobs', '0'], args.port),
+    ]
+    print(f"{args.scale} dataset, {args.concurrency} clients for {args.duration:g}s each, {os.cpu_count()} CPU(s)")
+    print(f"{'server':20} {'boot s':>7} {'first ms':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    results = {}
+    for name, command, port in servers:
+        r = results[name] = run(name, command, port, source, args, cookie, paths)
+        print(f"{name:20} {r['boot_s']:>7.2f} {r['first_ms']:>9.0f} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['errors']:>7}", flush=True)
+    dev, prod = results.values()
+    print(f"serve.py: {prod['rps'] / dev['rps']:.2f}x the requests per second, "
+          f"p95 {prod['p95_ms'] / dev['p95_ms']:.2f}x, first pages {prod['first_ms'] / dev['first_ms']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Latency of worker lookups by skill, city and online status on a large worker table.
+
+A dataset with no bookings is generated once with generate_data.py and cached
+under instance/bench; at the default size it has about 100k workers. Each case
+is timed through find_workers() on the worker_skill index and, as a baseline,
+as the LIKE scan over Worker.skills and Salon.location it replaces. Most cases
+ask for the first page of 20; the "all" cases fetch every match.
+
+    python bench_skills.py --salons 14000 --queries 300
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_http import CACHE, HERE, percentile
+
+CASES = [
+    ('skill', {'skills': ['Hair']}),
+    ('skill, online', {'skills': ['Spa'], 'online': True}),
+    ('skill, city', {'skills': ['Balayage'], 'city': 'Pune'}),
+    ('skill, city, online', {'skills': ['Balayage'], 'city': 'Pune', 'online': True}),
+    ('2 skills, city, online', {'skills': ['Hair', 'Keratin'], 'city': 'Kolkata', 'online': True}),
+    ('rare skill, city, online', {'skills': ['Hot Stone'], 'city': 'Chennai', 'online': True}),
+    ('all: skill, city, online', {'skills': ['Balayage'], 'city': 'Pune', 'online': True, 'limit': None}),
+    ('all: 2 skills, city', {'skills': ['Hair', 'Keratin'], 'city': 'Kolkata', 'limit': None}),
+]
+
+
+def child(queries, seed):
+    from app import create_app
+    from models import db, find_workers, Salon, Worker, WorkerSkill
+    from generate_data import CITIES
+
+    app = create_app()
+
+    rng = random.Random(seed)
+    cities = list(CITIES)
+
+    def scan(skills, city=None, online=None, after=None, limit=20):
+        query = db.session.query(Worker.id).join(Salon, Salon.id == Worker.salon_id)
+        for skill in skills:
+            query = query.filter(Worker.skills.ilike(f'%{skill}%'))
+        if city:
+            query = query.filter(Salon.location.ilike(f'{city},%'))
+        if online is not None:
+            query = query.filter(Worker.is_online.is_(online))
+        if after:
+            query = query.filter(Worker.id > after)
+        return [w for (w,) in query.order_by(Worker.id).limit(limit)]
+
+    def timed(run, options):
+        latencies, found = [], 0
+        for _ in range(queries):
+            params = dict(options)
+            if 'city' in params:  # any of the seeded cities
+                params['city'] = rng.choice(cities)
+            started = time.perf_counter()
+            found += len(run(**params))
+            latencies.append(time.perf_counter() - started)
+            db.session.remove()
+        latencies.sort()
+        return {'p50_ms': percentile(latencies, 50) * 1000, 'p95_ms': percentile(latencies, 95) * 1000,
+                'found': found / queries}
+
+    results = {}
+    with app.app_context():
+        results['workers'] = db.session.query(db.func.count(Worker.id)).scalar()
+        results['rows'] = db.session.query(db.func.count()).select_from(WorkerSkill).scalar()
+        find_workers(['Hair'])  # warm the page cache
+        for name, options in CASES:
+            results[name] = timed(find_workers, options)
+            results[name + ' (LIKE scan)'] = timed(scan, options)
+
+        client = app.test_client()
+        results['GET /api/v1/workers'] = timed(
+            lambda skills, city, online: client.get(
+                f"/api/v1/workers?skill={skills[0]}&city={city}&online={int(online)}").get_json()['data'],
+            {'skills': ['Balayage'], 'city': 'Pune', 'online': True}
+        )
+    print(json.dumps(results))
+
+
+def skills_dataset(salons, seed):
+    os.makedirs(CACHE, exist_ok=True)
+    path = os.path.join(CACHE, f"skills-{salons}-{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating {salons:,} salons and their workers (cached at {path})...", flush=True)
+        subprocess.run([sys.executable, os.path.join(HERE, 'generate_data.py'), '--salons', str(salons),
+                        '--users', str(salons), '--bookings', '0', '--seed', str(seed)],
+                       env={**os.environ, 'DATABASE_URL': f"sqlite:///{path}"}, check=True,
+                       stdout=subprocess.DEVNULL)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time worker lookups by skill.")
+    parser.add_argument('--salons', type=int, default=14_000, help="about 7 workers each")
+    parser.add_argument('--queries', type=int, default=300, help="queries per case")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.queries, args.seed)
+
+    source = skills_dataset(args.salons, args.seed)
+    work = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    shutil.copy(source, work)
+    proc = subprocess.run(
+        [sys.executable, __file__, '--child', '--queries', str(args.queries), '--seed', str(args.seed)],
+        env={**os.environ, 'DATABASE_URL': f"sqlite:///{work}", 'JOB_RUNNER_THREADS': '0'},
+        capture_output=True, text=True,
+    )
+    shutil.rmtree(os.path.dirname(work), ignore_errors=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode or not lines:
+        sys.exit(proc.stderr.strip()[-2000:])
+
+    results = json.loads(lines[-1])
+    print(f"{results.pop('workers'):,} workers, {results.pop('rows'):,} skill rows")
+    print(f"{'query':38} {'p50 ms':>8} {'p95 ms':>8} {'workers':>8}")
+    for name, r in results.items():
+        print(f"{name:38} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['found']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
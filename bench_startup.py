@@ -0,0 +1,89 @@
+"""Start-up time of the server and the maintenance scripts.
+
+Each target runs as a fresh interpreter, --repeat times, against its own copy of
+a generate_data.py dataset (cached like bench_http.py). The wall-clock time
+covers everything up to exit: imports, building the app and the script's own
+work. One more run under `python -X importtime` gives the time spent importing
+and the packages that took longest, by their own modules' import time.
+
+reset_db.py is not a target, because it deletes instance/salon.db whatever
+DATABASE_URL says. create_user.py is not one either, because it only posts to
+a running server.
+
+    python bench_startup.py --repeat 5
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_http import HERE, dataset
+
+TARGETS = [
+    ('web app', ['-c', 'import serve']),  # everything the server master loads before warming
+    ('first page', ['-c', "import serve; assert serve.app.test_client().get('/salon/1').status_code == 200"]),
+    ('migrate --status', ['migrate.py', '--status']),
+    ('rebuild_ratings --check', ['rebuild_ratings.py', '--check']),
+    ('run_jobs --drain', ['run_jobs.py', '--drain']),
+    ('migrate_media', ['migrate_media.py']),
+    ('verify_db', ['verify_db.py']),
+]
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)$')
+
+
+def run(argv, env, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + argv
+    started = time.perf_counter()
+    proc = subprocess.run(command, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+    if proc.returncode not in (0, 1):  # rebuild_ratings --check exits 1 on drift
+        raise SystemExit(f"{' '.join(argv)} failed:\n{proc.stderr[-2000:]}")
+    return elapsed, proc.stderr
+
+
+def import_profile(stderr, top):
+    """(total import seconds, [(package, seconds)] of the packages that took longest to import)."""
+    packages = {}
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, name = int(match.group(1)), match.group(2).split('.')[0]
+            packages[name] = packages.get(name, 0) + own / 1e6
+    heaviest = sorted(packages.items(), key=lambda p: -p[1])
+    return sum(packages.values()), heaviest[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='tiny', help="generate_data.py scale")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per target")
+    parser.add_argument('--top', type=int, default=4, help="slowest packages to import shown per target")
+    args = parser.parse_args()
+
+    source = dataset(args.scale, args.seed)
+    work = tempfile.mkdtemp()
+    print(f"{args.scale} dataset, {args.repeat} run(s) per target, {os.cpu_count()} CPU(s)")
+    print(f"{'target':24} {'median s':>9} {'min s':>7} {'imports s':>10}  slowest packages to import")
+    try:
+        for name, argv in TARGETS:
+            path = os.path.join(work, 'startup.db')
+            shutil.copy(source, path)
+            env = {**os.environ, 'DATABASE_URL': f"sqlite:///{path}", 'JOB_RUNNER_THREADS': '0'}
+            run(argv, env)  # warm the OS file cache
+            times = [run(argv, env)[0] for _ in range(args.repeat)]
+            imports, heaviest = import_profile(run(argv, env, importtime=True)[1], args.top)
+            shown = ', '.join(f"{package} {seconds:.2f}" for package, seconds in heaviest)
+            print(f"{name:24} {statistics.median(times):>9.3f} {min(times):>7.3f} {imports:>10.3f}  {shown}", flush=True)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
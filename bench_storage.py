@@ -0,0 +1,127 @@
+"""Write throughput of concurrent confirm_booking under each storage configuration.
+
+Each configuration runs in its own process (the engine is built at import) against
+a fresh database. Set BENCH_POSTGRES_URL to an empty, disposable Postgres database
+to include it.
+
+    python bench_storage.py [threads] [bookings_per_thread]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+CONFIGS = [
+    ("sqlite rollback journal", {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL'}),
+    ("sqlite WAL, synchronous=FULL", {'SQLITE_SYNCHRONOUS': 'FULL'}),
+    ("sqlite WAL, synchronous=NORMAL", {}),
+]
+
+
+def run_one(threads, per_thread):
+    """Child process: drive confirm_booking from `threads` logged-in customers at once."""
+    from app import create_app
+    from models import db, Salon, Service, User, Booking
+    import migrations
+
+    app = create_app()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        migrations.upgrade(db.engine, log=None)
+        salon = Salon(name="Storage Bench Salon", location="Pune, Baner")
+        customers = [User(name=f"Customer {i}", email=f"bench{i}@example.com", phone=f"90000{i:05d}",
+                          password="x") for i in range(threads)]
+        db.session.add(salon)
+        db.session.add_all(customers)
+        db.session.flush()
+        service = Service(name="Beard Trim", price=150, duration=30, category="Hair", salon_id=salon.id)
+        db.session.add(service)
+        db.session.commit()
+        service_id = service.id
+        customer_ids = [c.id for c in customers]
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def customer(user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+        barrier.wait()
+        for i in range(per_thread):
+            started = time.perf_counter()
+            try:
+                response = client.post('/cart/confirm', data={
+                    'service_id': service_id, 'start': f'2030-01-{1 + i % 28:02d}T10:00',
+                })
+                ok = response.status_code == 302 and '/confirmation/' in response.location
+            except Exception as e:
+                ok, response = False, repr(e)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                if not ok:
+                    errors.append(str(getattr(response, 'status_code', response)))
+
+    workers = [threading.Thread(target=customer, args=(uid,)) for uid in customer_ids]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        stored = Booking.query.count()
+    latencies.sort()
+    print(json.dumps({
+        'bookings': stored,
+        'elapsed': elapsed,
+        'per_second': stored / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+    }))
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    configs = [(label, {**env, 'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"})
+               for label, env in CONFIGS]
+    if os.environ.get('BENCH_POSTGRES_URL'):
+        configs.append(("postgresql pooled", {'DATABASE_URL': os.environ['BENCH_POSTGRES_URL']}))
+    else:
+        print("BENCH_POSTGRES_URL not set; skipping PostgreSQL")
+
+    print(f"{threads} concurrent customers x {per_thread} bookings each")
+    print(f"{'configuration':34} {'stored':>7} {'book/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for label, env in configs:
+        child = subprocess.run(
+            [sys.executable, __file__, '--child', str(threads), str(per_thread)],
+            env={**os.environ, **env}, capture_output=True, text=True,
+        )
+        lines = child.stdout.strip().splitlines()
+        if child.returncode or not lines:
+            print(f"{label:34} failed: {(child.stderr.strip().splitlines() or ['?'])[-1]}")
+            continue
+        r = json.loads(lines[-1])
+        print(f"{label:34} {r['bookings']:>7} {r['per_second']:>8.0f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['errors']:>7}")
+        if r['first_error']:
+            print(f"{'':34} first error: {r['first_error']}")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        run_one(int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,67 @@
+"""Fan-out check for the worker SSE broker with many simulated subscribers.
+
+Each subscriber is a thread draining its own broker.stream() generator, the same
+generator /worker/stream returns. The publisher sends timestamped events and we
+report delivery and publish-to-receive latency. No database is involved.
+
+    python bench_stream.py [subscribers] [events]
+"""
+import json
+import statistics
+import sys
+import threading
+import time
+
+from events import Broker
+
+NUM_SUBSCRIBERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+NUM_EVENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+CHANNEL = "salon:1"
+
+broker = Broker(maxsize=NUM_EVENTS + 1)
+latencies = []
+received = [0] * NUM_SUBSCRIBERS
+lock = threading.Lock()
+ready = threading.Barrier(NUM_SUBSCRIBERS + 1)
+
+
+def subscriber(index):
+    stream = broker.stream(CHANNEL, heartbeat=1)
+    next(stream)  # retry hint; the queue is registered from here on
+    ready.wait()
+    mine = []
+    for chunk in stream:
+        if not chunk.startswith("event: booking"):
+            continue
+        payload = json.loads(chunk.split("data: ", 1)[1])
+        mine.append(time.perf_counter() - payload['sent'])
+        received[index] += 1
+        if payload['last']:
+            break
+    stream.close()
+    with lock:
+        latencies.extend(mine)
+
+
+threads = [threading.Thread(target=subscriber, args=(i,), daemon=True) for i in range(NUM_SUBSCRIBERS)]
+for t in threads:
+    t.start()
+ready.wait()
+print(f"{broker.listener_count(CHANNEL)} subscribers connected")
+
+started = time.perf_counter()
+for n in range(NUM_EVENTS):
+    broker.publish(CHANNEL, 'booking', {'id': n, 'sent': time.perf_counter(), 'last': n == NUM_EVENTS - 1})
+publish_time = time.perf_counter() - started
+for t in threads:
+    t.join(timeout=30)
+
+latencies.sort()
+pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+print(f"published {NUM_EVENTS} events to {NUM_SUBSCRIBERS} subscribers in {publish_time * 1000:.1f} ms "
+      f"({NUM_EVENTS * NUM_SUBSCRIBERS / publish_time:.0f} deliveries/s)")
+print(f"delivered {sum(received)}/{NUM_EVENTS * NUM_SUBSCRIBERS}; "
+      f"latency p50={pick(0.5):.2f} ms p95={pick(0.95):.2f} ms p99={pick(0.99):.2f} ms "
+      f"mean={statistics.mean(latencies) * 1000:.2f} ms")
+print(f"{broker.listener_count()} subscribers left after disconnect")
+sys.exit(0 if sum(received) == NUM_EVENTS * NUM_SUBSCRIBERS else 1)
@@ -0,0 +1,282 @@
+"""The booking workflow: availability, booking, claiming, automatic assignment and completion.
+
+Shared by the customer, worker and API routes. deliver_notification and
+run_assignment are job handlers; extensions registers them on the job queue.
+"""
+from datetime import date, datetime, timedelta
+
+from flask import current_app, render_template
+from flask_login import current_user
+from sqlalchemy import exists, func, insert, literal, or_, select, update
+from sqlalchemy.orm import joinedload
+
+from assignment import Candidate, plan as plan_assignments, skill_terms
+from availability import day_window, format_clock, open_slots
+from events import broker
+from extensions import job_queue, notifier
+from models import ACTIVE_BOOKING_STATUSES, EARNING_BOOKING_STATUSES, Booking, Service, Worker, bump_rollup, bump_rollups, db
+
+def _overlapping(worker_id, start, end):
+    """Filters for the worker's active bookings overlapping [start, end)."""
+    return (Booking.worker_id == worker_id,
+            Booking.start_at < end,
+            Booking.start_at >= start - timedelta(days=1),
+            Booking.end_at > start,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES))
+
+def service_availability(service, day):
+    """Open slot starts for `service` on `day`: any expert, and per worker id."""
+    salon = service.salon
+    duration = service.duration or 30
+    opens, closes = day_window(day, salon.opening_time, salon.closing_time)
+
+    worker_ids = [w_id for (w_id,) in db.session.query(Worker.id).filter_by(salon_id=salon.id).all()]
+    day_filter = (Booking.start_at >= opens - timedelta(days=1), Booking.start_at < closes,
+                  Booking.end_at > opens, Booking.status.in_(ACTIVE_BOOKING_STATUSES))
+    # Single ordered pass over the day's bookings, served by ix_booking_worker_start
+    bookings = db.session.query(Booking.worker_id, Booking.start_at, Booking.end_at).filter(
+        Booking.worker_id.in_(worker_ids), *day_filter
+    ).order_by(Booking.worker_id, Booking.start_at).all() if worker_ids else []
+    unassigned = db.session.query(Booking.start_at, Booking.end_at).filter(
+        Booking.salon_id == salon.id, Booking.worker_id.is_(None), *day_filter
+    ).all()
+
+    per_worker, any_expert = open_slots(opens, closes, duration, worker_ids, bookings, unassigned)
+    if day == date.today():
+        # create_booking refuses starts that have passed; do not offer them
+        now = datetime.now()
+        any_expert = [s for s in any_expert if s >= now]
+        per_worker = {w_id: [s for s in starts if s >= now] for w_id, starts in per_worker.items()}
+    slot = lambda start: {'start': start.isoformat(timespec='minutes'), 'label': format_clock(start)}
+    return {
+        'date': day.isoformat(),
+        'duration': duration,
+        'any': [slot(s) for s in any_expert],
+        'workers': {str(w_id): [slot(s) for s in starts] for w_id, starts in per_worker.items()},
+    }
+
+class SlotTaken(Exception):
+    pass
+
+class SlotUnavailable(Exception):
+    """The requested start is in the past or outside the salon's opening hours; str() says which."""
+
+def create_booking(service, worker_id, start_at, date, time):
+    """Book `service` for the current user, queue notifications and push it to worker dashboards.
+
+    Raises SlotUnavailable if `start_at` has passed or the service would not fit the
+    salon's hours that day, and SlotTaken if the chosen expert already holds an
+    overlapping booking. The overlap test is part of the INSERT, so two requests
+    racing for the same expert and slot cannot both get it.
+    """
+    end_at = start_at + timedelta(minutes=service.duration or 30) if start_at else None
+    if start_at:
+        if start_at < datetime.now():
+            raise SlotUnavailable("That time has already passed. Please pick another.")
+        opens, closes = day_window(start_at.date(), service.salon.opening_time, service.salon.closing_time)
+        if start_at < opens or end_at > closes:
+            raise SlotUnavailable(f"The salon is open {format_clock(opens)} to {format_clock(closes)}. "
+                                  f"Please pick a time within those hours.")
+
+    values = {'user_id': current_user.id, 'salon_id': service.salon_id, 'service_id': service.id,
+              'worker_id': worker_id, 'date': date, 'time': time, 'start_at': start_at, 'end_at': end_at,
+              'status': 'Pending'}
+    columns = Booking.__table__.c
+    row = select(*(literal(value, columns[name].type) for name, value in values.items()))
+    if worker_id and start_at:
+        # Postgres: holding the worker row serialises bookings for the same expert; SQLite's write lock already does
+        db.session.query(Worker.id).filter_by(id=worker_id).with_for_update().scalar()
+        row = row.where(~exists().where(*_overlapping(worker_id, start_at, end_at)))
+    booking_id = db.session.execute(
+        insert(Booking.__table__).from_select(list(values), row).returning(columns.id)).scalar()
+    if booking_id is None:
+        raise SlotTaken()
+
+    new_booking = db.session.get(Booking, booking_id)
+    bump_rollup(service.salon_id, worker_id, start_at, bookings=1)
+    db.session.flush()
+    when = f"{start_at:%a, %b %d} at {format_clock(start_at)}" if start_at else f"{date} at {time}"
+    notify(current_user.id, new_booking.id, 'created', "Booking received",
+           f"Your {service.name} on {when} is waiting for an expert to accept it.")
+    if worker_id:
+        notify(db.session.query(Worker.user_id).filter_by(id=worker_id).scalar(), new_booking.id, 'created',
+               "New booking", f"{current_user.name} booked you for {service.name} on {when}.")
+    elif current_app.config['AUTO_ASSIGN']:
+        schedule_assignment(service.salon_id)
+    db.session.commit()
+
+    # Push to worker dashboards listening on this salon; rendered once for every listener
+    broker.publish(f"salon:{service.salon_id}", 'booking', {
+        'id': new_booking.id,
+        'worker_id': new_booking.worker_id,
+        'html': render_template('_worker_pending_card.html', b=new_booking),
+    })
+    return new_booking
+
+def pending_for(worker):
+    """Pending bookings of the worker's salon that this worker may claim."""
+    return Booking.query.filter(
+        Booking.salon_id == worker.salon_id,
+        Booking.status == 'Pending',
+        or_(Booking.worker_id.is_(None), Booking.worker_id == worker.id)
+    )
+
+def next_pending_bookings(worker, limit=50):
+    """Oldest-first claim queue for the worker's salon, served by ix_booking_salon_status."""
+    return pending_for(worker).options(
+        joinedload(Booking.service), joinedload(Booking.customer), joinedload(Booking.salon)
+    ).order_by(Booking.id).limit(limit).all()
+
+def worker_bookings_page(worker, status, before=None, limit=20):
+    """One page of the worker's bookings in a status, newest first (keyset on id)."""
+    query = Booking.query.options(
+        joinedload(Booking.service), joinedload(Booking.customer), joinedload(Booking.salon)
+    ).filter(Booking.worker_id == worker.id, Booking.status == status)
+    if before:
+        query = query.filter(Booking.id < before)
+    rows = query.order_by(Booking.id.desc()).limit(limit + 1).all()
+    return rows[:limit], (rows[limit - 1].id if len(rows) > limit else None)
+
+def worker_counts(worker):
+    """Dashboard counters: two indexed aggregates instead of loading every booking."""
+    counts = {'pending': pending_for(worker).count(), 'active': 0, 'completed': 0, 'earned': 0}
+    rows = db.session.query(Booking.status, func.count(Booking.id), func.coalesce(func.sum(Service.price), 0)).join(
+        Service, Booking.service_id == Service.id
+    ).filter(Booking.worker_id == worker.id, Booking.status.in_(EARNING_BOOKING_STATUSES)).group_by(Booking.status).all()
+    for status, count, total in rows:
+        if status == 'Accepted':
+            counts['active'] = count
+        else:
+            counts['completed'] = count
+            counts['earned'] = total
+    return counts
+
+def deliver_notification(payload):
+    notifier.send(payload['user_id'], payload['title'], payload['body'], {'booking_id': payload['booking_id']})
+
+def notify(user_id, booking_id, event, title, body):
+    """Queue a notification in the current transaction; at most one per user, booking and event."""
+    if user_id:
+        job_queue.enqueue(db.session.connection(), 'notify', {
+            'user_id': user_id, 'booking_id': booking_id, 'title': title, 'body': body,
+        }, key=f"booking:{booking_id}:{event}:{user_id}")
+
+def take_booking(booking_id, worker):
+    """Mark a pending booking accepted by `worker` in the caller's transaction. True if it was still open to them.
+
+    A single conditional UPDATE, so of any number of concurrent claimants exactly one
+    sees rowcount 1. Bookings where the customer picked an expert can only be claimed by them.
+    """
+    result = db.session.execute(
+        update(Booking)
+        .where(Booking.id == booking_id,
+               Booking.salon_id == worker.salon_id,
+               Booking.status == 'Pending',
+               or_(Booking.worker_id.is_(None), Booking.worker_id == worker.id))
+        .values(status='Accepted', worker_id=worker.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def claim_booking(booking_id, worker):
+    """Atomically accept a pending booking for `worker`."""
+    claimed = take_booking(booking_id, worker)
+    if claimed:
+        price, service_name, customer_id, start_at = db.session.query(
+            Service.price, Service.name, Booking.user_id, Booking.start_at
+        ).join(Booking, Booking.service_id == Service.id).filter(Booking.id == booking_id).one()
+        bump_rollup(worker.salon_id, worker.id, start_at, revenue=price or 0)
+        notify(customer_id, booking_id, 'accepted', "Booking accepted",
+               f"{worker.name} will take care of your {service_name}.")
+    db.session.commit()
+    return claimed
+
+def schedule_assignment(salon_id):
+    """Queue an assignment pass for the salon in the current transaction.
+
+    Bookings arriving within one ASSIGN_BATCH_SECONDS window share a job, which runs
+    when the window closes, so a burst is planned as one batch.
+    """
+    window = current_app.config['ASSIGN_BATCH_SECONDS']
+    if window <= 0:
+        job_queue.enqueue(db.session.connection(), 'assign', {'salon_id': salon_id})
+        return
+    now = datetime.now().timestamp()
+    bucket = int(now // window)
+    job_queue.enqueue(db.session.connection(), 'assign', {'salon_id': salon_id},
+                      key=f"assign:{salon_id}:{window:g}:{bucket}", delay=(bucket + 1) * window - now)
+
+def run_assignment(payload):
+    assign_pending(payload['salon_id'])
+
+def assignment_candidates(salon_id, since):
+    """Online workers of the salon with their open load and active bookings from `since` on."""
+    workers = Worker.query.filter(Worker.salon_id == salon_id, Worker.is_online.is_(True)).all()
+    if not workers:
+        return {}
+    worker_ids = [w.id for w in workers]
+    load = dict(db.session.query(Booking.worker_id, func.count(Booking.id)).filter(
+        Booking.worker_id.in_(worker_ids), Booking.status == 'Accepted',
+        or_(Booking.start_at.is_(None), Booking.start_at >= since)
+    ).group_by(Booking.worker_id).all())
+    busy = {}
+    rows = db.session.query(Booking.worker_id, Booking.start_at, Booking.end_at).filter(
+        Booking.worker_id.in_(worker_ids), Booking.start_at >= since - timedelta(days=1),
+        Booking.end_at > since, Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+    ).order_by(Booking.worker_id, Booking.start_at)
+    for worker_id, start, end in rows:
+        busy.setdefault(worker_id, []).append((start, end))
+    return {w.id: (w, Candidate(w.id, skill_terms(w.skills, w.role), load.get(w.id, 0), busy.get(w.id, ())))
+            for w in workers}
+
+def assign_pending(salon_id, limit=500):
+    """Assign the salon's unclaimed "any expert" bookings to online, skilled, free workers in one transaction.
+
+    Returns the number assigned. Bookings nobody can take stay in the claim queue.
+    """
+    rows = db.session.query(
+        Booking.id, Booking.start_at, Booking.end_at, Service.category, Service.name, Service.price, Booking.user_id
+    ).join(Service, Booking.service_id == Service.id).filter(
+        Booking.salon_id == salon_id, Booking.status == 'Pending', Booking.worker_id.is_(None),
+        or_(Booking.start_at.is_(None), Booking.start_at >= datetime.now())
+    ).order_by(Booking.id.desc()).limit(limit).all()  # newest first: leftovers nobody could take never crowd out new ones
+    if not rows:
+        return 0
+    candidates = assignment_candidates(salon_id, datetime.combine(date.today(), datetime.min.time()))
+    bookings = {row[0]: row for row in rows}
+    revenue = []  # rollup deltas, one per assigned booking
+    for booking_id, worker_id in plan_assignments([row[:5] for row in rows], [c for _, c in candidates.values()]):
+        worker = candidates[worker_id][0]
+        if not take_booking(booking_id, worker):  # a worker may have claimed it by hand meanwhile
+            continue
+        _, start, _, _, service_name, price, customer_id = bookings[booking_id]
+        revenue.append((salon_id, worker.id, start, 0, price or 0, 0))
+        when = f" on {start:%a, %b %d} at {format_clock(start)}" if start else ""
+        notify(customer_id, booking_id, 'accepted', "Booking accepted",
+               f"{worker.name} will take care of your {service_name}.")
+        notify(worker.user_id, booking_id, 'assigned', "New booking assigned",
+               f"You are booked for {service_name}{when}.")
+    bump_rollups(revenue)
+    db.session.commit()
+    return len(revenue)
+
+def finish_booking(booking, worker):
+    """Mark `worker`'s accepted booking completed. False if it is not theirs or not accepted (pending or already done).
+
+    A conditional UPDATE like take_booking, so a double submit completes, and counts, the booking once.
+    """
+    if worker is None:
+        return False
+    result = db.session.execute(
+        update(Booking)
+        .where(Booking.id == booking.id, Booking.worker_id == worker.id, Booking.status == 'Accepted')
+        .values(status='Completed')
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    bump_rollup(booking.salon_id, worker.id, booking.start_at, completions=1)
+    notify(booking.user_id, booking.id, 'completed', "Thanks for visiting",
+           f"How was your {booking.service.name}? Leave a review for {booking.salon.name}.")
+    db.session.commit()
+    return True
@@ -0,0 +1,135 @@
+"""Drive every route with a query budget and fail if one runs over it.
+
+Routes marked @budgeted only enforce their budget when ENFORCE_QUERY_BUDGETS is
+on. This script turns it on and requests each of them with the arguments that
+change their queries: cursors, filters, field lists, and a guest or signed-in
+customer, worker and owner. It exits with status 1 if any request goes over
+budget or fails, and also if a budgeted route has no requests listed here.
+Every request only reads, so it runs against the configured database directly.
+tests/test_query_budgets.py runs the same requests on the test database.
+
+    python check_query_budgets.py        # DATABASE_URL, or instance/salon.db
+"""
+import sys
+from urllib.parse import urlencode
+
+from sqlalchemy import func
+
+from app import create_app
+from models import Booking, Salon, SkillTag, Worker, WorkerSkill, db
+from query_budget import QueryBudgetExceeded
+from skills import city_of
+
+
+def samples():
+    """Users to sign in as and values that make filters match something (call in an app context)."""
+    salon = Salon.query.filter(Salon.latitude.isnot(None), Salon.owner_id.isnot(None)).first() or Salon.query.first()
+    if salon is None:
+        sys.exit("The database has no salons; run python migrate.py --seed first.")
+    customer_id = db.session.query(Booking.user_id).group_by(Booking.user_id).order_by(
+        func.count().desc()).limit(1).scalar()
+    worker_user_id = db.session.query(Worker.user_id).filter(Worker.user_id.isnot(None)).limit(1).scalar()
+    skill = db.session.query(SkillTag.slug).join(WorkerSkill, WorkerSkill.tag_id == SkillTag.id).group_by(
+        SkillTag.id).order_by(func.count().desc()).limit(1).scalar()
+    return {
+        'users': {'guest': None, 'customer': customer_id, 'worker': worker_user_id, 'owner': salon.owner_id},
+        'word': (salon.name or 'salon').split()[0],
+        'city': city_of(salon.location) or '',
+        'lat': salon.latitude if salon.latitude is not None else 17.4,
+        'lng': salon.longitude if salon.longitude is not None else 78.4,
+        'skill': skill or 'haircut',
+    }
+
+
+def cases(s):
+    """{endpoint: [(user, path)]}; a None path is filled in from the cursor the previous request returned."""
+    nearby = {'lat': s['lat'], 'lng': s['lng']}
+    return {
+        'customer.home': [(user, '/') for user in s['users']],
+        'customer.search': [
+            ('customer', '/search'), ('customer', None),
+            ('guest', '/search?' + urlencode({'q': s['word']})),
+            ('customer', '/search?' + urlencode({'city': s['city'], 'cat': 'Hair', 'limit': 100})),
+        ],
+        'api.api_salons': [
+            ('guest', '/api/v1/salons'), ('guest', None),
+            ('guest', '/api/v1/salons?' + urlencode({'q': s['word'], 'city': s['city'], 'limit': 100})),
+            ('customer', '/api/v1/salons?' + urlencode({
+                'fields': 'id,name,min_price,categories,review_count,rating_histogram,services,workers'})),
+        ],
+        'api.api_nearby_salons': [
+            ('guest', '/api/v1/salons/nearby?' + urlencode(nearby)),
+            ('guest', '/api/v1/salons/nearby?' + urlencode({**nearby, 'radius_km': 5, 'open': 1, 'cat': 'Hair',
+                                                             'min_rating': 3, 'limit': 100})),
+            # About 20 km from the nearest salon, so the search widens all the way, with every nested field
+            ('customer', '/api/v1/salons/nearby?' + urlencode({
+                'lat': s['lat'] + 0.18, 'lng': s['lng'],
+                'fields': 'id,name,min_price,categories,review_count,rating_histogram,services,workers,distance_km'})),
+        ],
+        'api.api_workers': [
+            ('guest', '/api/v1/workers?' + urlencode({'skill': s['skill']})), ('guest', None),
+            ('guest', '/api/v1/workers?' + urlencode({'skill': s['skill'], 'city': s['city'], 'online': 1})),
+            ('owner', '/api/v1/workers?' + urlencode([('skill', s['skill']), ('skill', 'colour'),
+                                                      ('fields', 'id,name,skills,salon_id,is_online')])),
+        ],
+    }
+
+
+def sign_in(client, user_id):
+    with client.session_transaction() as sess:
+        sess.clear()
+        if user_id is not None:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+
+
+def check(app, s, log=print):
+    """Request every case; returns the problems found, none when all is well.
+
+    `app` must have ENFORCE_QUERY_BUDGETS and PROPAGATE_EXCEPTIONS (or TESTING) on.
+    """
+    budgets = {name: view.query_budget for name, view in app.view_functions.items()
+               if hasattr(view, 'query_budget')}
+    planned = cases(s)
+    failures = [f"{name}: budgeted but not exercised here" for name in sorted(set(budgets) - set(planned))]
+    client = app.test_client()
+    for endpoint, requests in planned.items():
+        previous, previous_path = None, None
+        for user, path in requests:
+            if path is None:
+                cursor = previous.get_json().get('next_cursor') if previous is not None else None
+                if not cursor:
+                    continue  # a single page of results; nothing further to fetch
+                path = f"{previous_path}{'&' if '?' in previous_path else '?'}{urlencode({'cursor': cursor})}"
+            previous_path = path
+            sign_in(client, s['users'][user])
+            try:
+                previous = client.get(path)
+            except QueryBudgetExceeded as e:
+                failures.append(f"{endpoint} as {user}: {str(e).splitlines()[0]} for {path}")
+                log(f"  [!!] {user:8} {path}")
+                previous = None
+                continue
+            ok = previous.status_code == 200
+            if not ok:
+                failures.append(f"{endpoint} as {user}: HTTP {previous.status_code} for {path}")
+            log(f"  [{'ok' if ok else '!!'}] {user:8} {path} (budget {budgets.get(endpoint)})")
+    return failures
+
+
+def main():
+    app = create_app({'ENFORCE_QUERY_BUDGETS': True, 'PROPAGATE_EXCEPTIONS': True, 'JOB_RUNNER_THREADS': 0})
+    with app.app_context():
+        s = samples()
+    failures = check(app, s)
+    if failures:
+        print(f"\n{len(failures)} problem(s):")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    budgeted = sum(hasattr(view, 'query_budget') for view in app.view_functions.values())
+    print(f"\nAll {budgeted} budgeted route(s) stayed within budget.")
+
+
+if __name__ == '__main__':
+    main()
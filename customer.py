@@ -0,0 +1,174 @@
+"""Customer pages: the home feed, search, salon pages, reviews and booking."""
+from datetime import datetime
+
+from flask import (Blueprint, abort, current_app, flash, jsonify, make_response, redirect, render_template, request, session,
+                   url_for)
+from flask_login import current_user, login_required
+from markupsafe import Markup
+from sqlalchemy.orm import joinedload
+
+from auth import current_worker
+from availability import parse_day, parse_start
+from bookings import SlotTaken, SlotUnavailable, create_booking, service_availability
+from extensions import fragment_cache, http_cache
+from fragments import current_versions
+from models import Booking, Salon, SalonRating, Service, Worker, can_review, db, parse_stars, review_page, save_review
+from query_budget import budgeted
+from salons import salon_fragments, salon_summaries, salons_by_ids
+from search import search_salon_ids
+from storage import replica_reads
+
+bp = Blueprint('customer', __name__)
+
+@bp.route("/")
+@budgeted(8)
+def home():
+    # Show onboarding welcome screen to guests
+    if not current_user.is_authenticated:
+        return render_template('welcome.html')
+
+    # Only the first page of salons is rendered; the rest comes from /search
+    salon_ids, next_cursor = search_salon_ids(db.session.connection(), limit=current_app.config['SEARCH_PAGE_SIZE'])
+    salon_cards, result_cards = salon_fragments(salon_ids, ('card', 'result'))
+    categories_raw = db.session.query(Service.category).distinct().all()
+    categories_raw = [c[0] for c in categories_raw if c[0]]
+
+    # Only show these categories on the user dashboard
+    allowed_categories = ['Hair', 'Spa', 'Beauty Parlour']
+    categories = [cat for cat in allowed_categories if cat in categories_raw]
+
+    # Get user's bookings or worker profile
+    user_bookings = []
+    worker = None
+    if current_user.is_authenticated:
+        user_bookings = Booking.query.options(
+            joinedload(Booking.service), joinedload(Booking.salon)
+        ).filter_by(user_id=current_user.id).all()
+        if current_user.role == 'worker':
+            worker = current_worker()
+
+    return render_template("index.html", salon_cards=salon_cards, result_cards=result_cards, next_cursor=next_cursor,
+                           categories=categories, user_bookings=user_bookings, worker=worker)
+
+@bp.route("/search")
+@budgeted(6)
+def search():
+    """Ranked, cursor-paginated salon search. Returns JSON with rendered cards for the home feed."""
+    limit = max(1, min(request.args.get('limit', current_app.config['SEARCH_PAGE_SIZE'], type=int), 100))
+    salon_ids, next_cursor = search_salon_ids(
+        db.session.connection(),
+        q=request.args.get('q', ''),
+        city=request.args.get('city'),
+        category=request.args.get('cat'),
+        cursor=request.args.get('cursor'),
+        limit=limit
+    )
+    salons = salons_by_ids(salon_ids)
+    summaries = salon_summaries(salon_ids)
+    return jsonify(
+        results=[{
+            'id': s.id,
+            'name': s.name,
+            'location': s.location,
+            'rating': s.rating,
+            'is_open': s.is_open,
+            'min_price': summaries.get(s.id, {}).get('min_price'),
+            'categories': [c for c in summaries.get(s.id, {}).get('cats', '').split(',') if c],
+        } for s in salons],
+        html=salon_fragments(salon_ids, ('card',), salons=salons, summaries=summaries)[0],
+        next_cursor=next_cursor
+    )
+
+@bp.route("/salon/<int:salon_id>")
+def salon_details(salon_id):
+    # The salon's fragment version covers everything on the page, so revalidation needs no rendering
+    versions = current_versions(db.session.connection(), [salon_id])
+    etag = http_cache.etag('salon', salon_id, versions[salon_id])
+    # Flash messages (after posting a review) make the page one user's, once: never a shared or cached copy
+    flashes = '_flashes' in session
+    cached = None if flashes else http_cache.not_modified(etag, public=True)
+    if cached is not None:
+        return cached
+    salon, totals = db.session.query(Salon, SalonRating).outerjoin(
+        SalonRating, SalonRating.salon_id == Salon.id
+    ).filter(Salon.id == salon_id).first() or abort(404)
+
+    def section(kind, template, load=dict):
+        html = fragment_cache.get_many(kind, versions, lambda ids: {
+            salon.id: render_template(template, salon=salon, **load())
+        })
+        return Markup(html[salon.id])
+
+    def reviews():
+        page, before = review_page(salon.id)
+        return {'totals': totals, 'reviews': page, 'before': before, 'salon_id': salon.id}
+
+    response = make_response(render_template(
+        "salon_details.html", salon=salon, review_count=totals.count if totals else 0,
+        services_html=section('services', '_salon_services.html'),
+        workers_html=section('workers', '_salon_workers.html'),
+        reviews_html=section('reviews', '_salon_reviews.html', reviews),
+    ))
+    return response if flashes else http_cache.tag(response, etag, public=True)
+
+@bp.route("/salon/<int:salon_id>/reviews")
+@replica_reads
+def salon_reviews(salon_id):
+    """The next page of a salon's reviews, as list items the salon page appends."""
+    page, before = review_page(salon_id, before=request.args.get('before', type=int))
+    return render_template("_review_items.html", salon_id=salon_id, reviews=page, before=before)
+
+@bp.route("/salon/<int:salon_id>/review", methods=["POST"])
+@login_required
+def post_review(salon_id):
+    Salon.query.get_or_404(salon_id)
+    stars = parse_stars(request.form.get('rating'))
+    if stars is None:
+        flash("Choose a rating from 1 to 5 stars.")
+    elif not can_review(current_user, salon_id):
+        flash("You can review a salon after a completed appointment there.")
+    else:
+        save_review(current_user, salon_id, stars, request.form.get('comment'))
+        flash("Thanks for your review!")
+    return redirect(url_for('customer.salon_details', salon_id=salon_id, _anchor='reviews'))
+
+@bp.route("/booking/new/<int:service_id>")
+@login_required
+def start_booking(service_id):
+    service = Service.query.get_or_404(service_id)
+    workers = Worker.query.filter_by(salon_id=service.salon_id).all()
+    return render_template("cart.html", service=service, workers=workers)
+
+@bp.route("/availability/<int:service_id>")
+def availability(service_id):
+    """Open slots per worker for a service on one day (?date=YYYY-MM-DD)."""
+    service = Service.query.get_or_404(service_id)
+    day = parse_day(request.args.get('date', '')) or datetime.now().date()
+    return jsonify(service_availability(service, day))
+
+@bp.route("/cart/confirm", methods=["POST"])
+@login_required
+def confirm_booking():
+    date = request.form.get("date", "Tomorrow")
+    time = request.form.get("time", "11:00 AM")
+    service = Service.query.get_or_404(request.form.get("service_id"))
+    try:
+        start_at = datetime.fromisoformat(request.form.get("start", ""))
+    except ValueError:
+        start_at = parse_start(date, time)
+
+    try:
+        new_booking = create_booking(service, request.form.get("worker_id", type=int), start_at, date, time)
+    except SlotTaken:
+        flash("That expert was just booked for this slot. Please pick another time.")
+        return redirect(url_for("customer.start_booking", service_id=service.id))
+    except SlotUnavailable as e:
+        flash(str(e))
+        return redirect(url_for("customer.start_booking", service_id=service.id))
+    return redirect(url_for("customer.confirmation", booking_id=new_booking.id))
+
+@bp.route("/confirmation/<int:booking_id>")
+@login_required
+def confirmation(booking_id):
+    booking = Booking.query.get_or_404(booking_id)
+    return render_template("confirmation.html", booking=booking)
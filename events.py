@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+from collections import defaultdict
+
+log = logging.getLogger(__name__)
+
+
+class TooManyStreams(Exception):
+    """This process already serves as many event streams as it allows."""
+
+
+class Broker:
+    """In-process pub/sub fan-out for server-sent events.
+
+    Each subscriber owns a bounded queue; publishing never blocks and never
+    touches the database, so listeners cost a queue each rather than a
+    connection. A slow subscriber that fills its queue simply misses events
+    (clients refetch on reconnect). Events reach only listeners in this process,
+    unless `relay` forwards them to the others (see SiblingRelay).
+    """
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self.relay = None  # callable(channel, message) sending published events to other processes
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._streams = 0
+
+    def subscribe(self, channel):
+        q = queue.Queue(maxsize=self.maxsize)
+        with self._lock:
+            self._channels[channel].add(q)
+        return q
+
+    def unsubscribe(self, channel, q):
+        with self._lock:
+            listeners = self._channels.get(channel)
+            if listeners is not None:
+                listeners.discard(q)
+                if not listeners:
+                    del self._channels[channel]
+
+    def publish(self, channel, event, data):
+        """Queue an event for every current listener; returns how many received it."""
+        message = format_sse(event, data)
+        if self.relay is not None:
+            self.relay(channel, message)
+        return self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        """Queue an already formatted event for this process's listeners."""
+        with self._lock:
+            listeners = list(self._channels.get(channel, ()))
+        delivered = 0
+        for q in listeners:
+            try:
+                q.put_nowait(message)
+                delivered += 1
+            except queue.Full:
+                pass
+        return delivered
+
+    def listener_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(listeners) for listeners in self._channels.values())
+
+    def stream(self, channel, heartbeat=15, limit=None):
+        """Generator of SSE text for one subscriber; sends a comment line when idle.
+
+        Raises TooManyStreams, before anything is sent, when `limit` streams are
+        already open in this process.
+        """
+        with self._lock:
+            if limit is not None and self._streams >= limit:
+                raise TooManyStreams(f"{self._streams} event streams are already open")
+            self._streams += 1
+        events = self._events(self.subscribe(channel), channel, heartbeat)
+        next(events)  # from here on, closing the generator (even unread) gives the stream back
+        return events
+
+    def _events(self, q, channel, heartbeat):
+        try:
+            yield
+            yield "retry: 3000\n\n"
+            while not self._closed.is_set():
+                try:
+                    message = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    message = ": keep-alive\n\n"
+                if message is not None:
+                    yield message
+        finally:
+            self.unsubscribe(channel, q)
+            with self._lock:
+                self._streams -= 1
+
+    def stream_count(self):
+        with self._lock:
+            return self._streams
+
+    def close(self):
+        """End every open stream, so a server shutting down is not held up by idle listeners."""
+        self._closed.set()
+        with self._lock:
+            listeners = [q for channel in self._channels.values() for q in channel]
+        for q in listeners:
+            try:
+                q.put_nowait(None)
+            except queue.Full:
+                pass  # the stream sees the flag after its next message
+
+
+class SiblingRelay:
+    """Forwards a broker's published events to the other processes of one server.
+
+    Every process binds a Unix datagram socket named after its pid in a shared
+    directory. Publishing sends the event to every other socket there, and a
+    daemon thread hands what arrives to the local listeners. Sends never block:
+    a process that is gone or not keeping up misses the event, just like a slow
+    subscriber.
+    """
+
+    def __init__(self, broker, directory):
+        self.broker = broker
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}.sock")
+        self._sock = None
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        threading.Thread(target=self._receive, name='event-relay', daemon=True).start()
+        self.broker.relay = self.send
+        return self
+
+    def send(self, channel, message):
+        payload = json.dumps([channel, message]).encode()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if path == self.path or not name.endswith('.sock'):
+                continue
+            try:
+                self._sock.sendto(payload, socket.MSG_DONTWAIT, path)
+            except OSError:
+                pass
+
+    def _receive(self):
+        while True:
+            try:
+                channel, message = json.loads(self._sock.recv(65536))
+            except OSError:
+                return  # closed
+            except ValueError:
+                log.warning("Dropped a malformed relayed event")
+                continue
+            self.broker.deliver(channel, message)
+
+    def close(self):
+        self.broker.relay = None
+        if self._sock is not None:
+            self._sock.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def format_sse(event, data):
+    payload = json.dumps(data, separators=(',', ':'))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+broker = Broker()
@@ -0,0 +1,125 @@
+"""Run EXPLAIN QUERY PLAN for the SQL each route issues and flag full table scans.
+
+Works on a throwaway copy of the database, so routes that write are safe to drive.
+
+    python explain_queries.py [path/to/salon.db] [--no-fail]
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+args = [a for a in sys.argv[1:] if not a.startswith('--')]
+source = args[0] if args else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'salon.db')
+work_copy = os.path.join(tempfile.mkdtemp(), 'explain.db')
+if os.path.exists(source):
+    shutil.copy(source, work_copy)
+os.environ['DATABASE_URL'] = f'sqlite:///{work_copy}'
+
+from app import create_app
+from models import db, User, Salon, Worker, Service, Booking
+from seed import seed_data
+import migrations
+
+app = create_app()
+
+captured = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+        captured.append((statement, parameters))
+
+
+def actors():
+    """A customer, an owner with a salon and a worker with a login, creating what is missing."""
+    owner = User.query.join(Salon, Salon.owner_id == User.id).first()
+    salon = Salon.query.filter_by(owner_id=owner.id).first()
+    worker = Worker.query.join(User, User.id == Worker.user_id).filter(
+        User.role == 'worker', Worker.salon_id == salon.id
+    ).first()
+    if not worker:
+        user = User(name="Explain Worker", email="explain.worker@example.com", phone="9000000001",
+                    password="x", role="worker")
+        db.session.add(user)
+        db.session.flush()
+        worker = Worker(name=user.name, salon_id=salon.id, user_id=user.id)
+        db.session.add(worker)
+    customer = User.query.filter_by(role='customer').first()
+    if not customer:
+        customer = User(name="Explain Customer", email="explain.customer@example.com", phone="9000000002",
+                        password="x", role="customer")
+        db.session.add(customer)
+    db.session.commit()
+    return customer.id, owner.id, worker.user_id, salon.id
+
+
+with app.app_context():
+    db.create_all()
+    migrations.upgrade(db.engine, log=None)
+    seed_data()
+    customer_id, owner_id, worker_user_id, salon_id = actors()
+    service_id = Service.query.filter_by(salon_id=salon_id).first().id
+    engine = db.engine
+
+client = app.test_client()
+
+
+def as_user(user_id):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+def booking_id():
+    with app.app_context():
+        return db.session.query(db.func.max(Booking.id)).scalar()
+
+
+journeys = [
+    ("home", customer_id, 'GET', '/', None),
+    ("search", customer_id, 'GET', '/search?q=hair&city=Hyderabad', None),
+    ("salon_details", customer_id, 'GET', f'/salon/{salon_id}', None),
+    ("start_booking", customer_id, 'GET', f'/booking/new/{service_id}', None),
+    ("availability", customer_id, 'GET', f'/availability/{service_id}?date=2030-01-07', None),
+    ("confirm_booking", customer_id, 'POST', '/cart/confirm', {'service_id': service_id, 'start': '2030-01-07T10:00'}),
+    ("confirmation", customer_id, 'GET', lambda: f'/confirmation/{booking_id()}', None),
+    ("owner_dashboard", owner_id, 'GET', '/owner/dashboard', None),
+    ("worker_dashboard", worker_user_id, 'GET', '/worker/dashboard', None),
+    ("worker_completed", worker_user_id, 'GET', '/worker/bookings/completed', None),
+    ("accept_booking", worker_user_id, 'GET', lambda: f'/worker/accept_booking/{booking_id()}', None),
+]
+
+# Requests run outside any outer app context so each gets a fresh `g` and session
+flagged = 0
+with engine.connect() as raw:
+    for name, user_id, method, url, data in journeys:
+        as_user(user_id)
+        url = url() if callable(url) else url
+        captured.clear()
+        response = client.open(url, method=method, data=data)
+        statements = list(dict.fromkeys((s, tuple(p) if isinstance(p, (list, tuple)) else p) for s, p in captured))
+        print(f"\n== {name} {method} {url} -> {response.status_code}, {len(captured)} statements")
+        for statement, params in statements:
+            if 'sqlite_master' in statement:
+                continue
+            plan = [row[-1] for row in raw.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params).all()]
+            problems = []
+            for detail in plan:
+                if detail.startswith('SCAN ') and 'INDEX' not in detail and 'VIRTUAL TABLE' not in detail:
+                    bounded = 'LIMIT' in statement.upper()
+                    problems.append(("bounded scan" if bounded else "FULL SCAN") + f": {detail}")
+                    flagged += 0 if bounded else 1
+                elif 'USE TEMP B-TREE' in detail:
+                    problems.append(f"temp sort: {detail}")
+            marker = "!!" if any(p.startswith("FULL") for p in problems) else "ok"
+            print(f"  [{marker}] {' '.join(statement.split())[:110]}")
+            for problem in problems:
+                print(f"        {problem}")
+
+print(f"\n{flagged} full table scan(s) flagged")
+sys.exit(1 if flagged and '--no-fail' not in sys.argv else 0)
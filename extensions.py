@@ -0,0 +1,95 @@
+"""Flask extensions and shared services, bound to an app by create_app().
+
+The extensions are created unbound and initialised by create_app(). The services
+below them are built from the app's config the first time a request or a job
+uses one, then kept per app for the life of the process. Nothing here opens a
+database connection, creates a table or starts a thread at import or boot.
+"""
+import threading
+
+from flask import current_app
+from flask_login import LoginManager
+from werkzeug.local import LocalProxy
+
+from assets import AssetManifest
+from fragments import FragmentCache, LruStore, SqlStore
+from http_cache import HttpCache
+from identity import IdentityCache
+from instrumentation import Instrumentation
+from jobs import JobQueue
+from models import db
+from notifications import make_notifier
+from otp import MemoryOtpStore, MemoryRateLimiter, SmsDispatcher, SqlOtpStore, SqlRateLimiter, make_sender
+from passwords import PasswordHasher
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+instrumentation = Instrumentation()
+http_cache = HttpCache()
+assets = AssetManifest()
+
+_building = threading.Lock()
+
+
+def service(build):
+    """Decorator: a proxy to what `build(app)` returns for the current app, built once on first use."""
+    name = build.__name__
+
+    def get():
+        app = current_app._get_current_object()
+        built = app.extensions.setdefault('services', {})
+        if name not in built:
+            with _building:
+                if name not in built:
+                    built[name] = build(app)
+        return built[name]
+    return LocalProxy(get)
+
+
+@service
+def otp_store(app):
+    if app.config['OTP_BACKEND'] == 'sql':
+        return SqlOtpStore(db.engine, app.config['SECRET_KEY'], app.config['OTP_TTL'], app.config['OTP_MAX_ATTEMPTS'])
+    return MemoryOtpStore(app.config['SECRET_KEY'], app.config['OTP_TTL'], app.config['OTP_MAX_ATTEMPTS'])
+
+
+@service
+def rate_limiter(app):
+    return SqlRateLimiter(db.engine) if app.config['OTP_BACKEND'] == 'sql' else MemoryRateLimiter()
+
+
+@service
+def sms(app):
+    return SmsDispatcher(make_sender(app.config['SMS_SENDER']))
+
+
+@service
+def notifier(app):
+    return make_notifier(app.config['NOTIFIER'])
+
+
+@service
+def hasher(app):
+    return PasswordHasher(method=app.config['PASSWORD_HASH_METHOD'], workers=app.config['PASSWORD_HASH_WORKERS'],
+                          max_pending=app.config['PASSWORD_HASH_QUEUE'])
+
+
+@service
+def identity_cache(app):
+    return IdentityCache(ttl=app.config['IDENTITY_CACHE_TTL'])
+
+
+@service
+def fragment_cache(app):
+    return FragmentCache(LruStore(app.config['FRAGMENT_CACHE_SIZE']),
+                         SqlStore(db.engine) if app.config['FRAGMENT_CACHE_SHARED'] else None)
+
+
+@service
+def job_queue(app):
+    from bookings import deliver_notification, run_assignment  # the handlers live with the code that enqueues
+
+    queue = JobQueue(db.engine)
+    queue.handler('notify')(deliver_notification)
+    queue.handler('assign')(run_assignment)
+    return queue
@@ -0,0 +1,202 @@
+"""Cache of rendered per-salon HTML fragments (salon cards, service and worker lists).
+
+Each salon has a version number in the `salon_version` table. Any flush that
+inserts, updates or deletes one of its Salon, Service or Worker rows bumps that
+number in the same transaction. Fragments are stored under (kind, salon_id) along
+with the version they were rendered from, and a lookup only hits when the stored
+version matches the current one. A stale fragment is therefore never served, and
+nothing has to be purged: the next render simply overwrites it.
+
+The version is read in the same transaction as the rows a miss renders from, so
+a fragment can never be stored under a newer version than its data.
+
+Two stores are available:
+- LruStore: bounded, one per process.
+- SqlStore: a table shared by every process on the database. When a FragmentCache
+  has both, SqlStore sits behind the LRU store.
+
+Both tables are created by migration 7 (python migrate.py).
+
+Writes that skip the ORM (raw SQL, bulk loaders) must call `bump_versions` themselves.
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, Text, event, inspect, select, tuple_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from storage import upsert
+
+log = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+salon_versions = Table(
+    'salon_version', metadata,
+    Column('salon_id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False, default=0),
+)
+
+fragment_cache = Table(
+    'fragment_cache', metadata,
+    Column('kind', String(40), primary_key=True),
+    Column('salon_id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False),
+    Column('html', Text, nullable=False),
+)
+
+TRACKED_TABLES = ('salon', 'service', 'worker')
+
+def bump_versions(conn, salon_ids):
+    """Invalidate every cached fragment of `salon_ids`, inside the caller's transaction."""
+    if not salon_ids:
+        return
+    stmt = upsert(conn)(salon_versions).values([{'salon_id': i, 'version': 1} for i in sorted(salon_ids)])
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=['salon_id'], set_={'version': salon_versions.c.version + 1}
+    ))
+
+
+def current_versions(conn, salon_ids):
+    """{salon_id: version} for `salon_ids`; salons never changed since the table existed are at 0."""
+    if not salon_ids:
+        return {}
+    rows = conn.execute(select(salon_versions.c.salon_id, salon_versions.c.version)
+                        .where(salon_versions.c.salon_id.in_(salon_ids)))
+    versions = dict.fromkeys(salon_ids, 0)
+    versions.update(rows.all())
+    return versions
+
+
+def _touched_salon_ids(session):
+    ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table == 'salon':
+            ids.add(obj.id)
+        elif table in ('service', 'worker'):
+            ids.add(obj.salon_id)
+            # Moving a row to another salon changes what both salons render
+            ids.update(inspect(obj).attrs.salon_id.history.deleted or ())
+    ids.discard(None)
+    return ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_touched_salons(session, flush_context):
+    bump_versions(session.connection(), _touched_salon_ids(session))
+
+
+class LruStore:
+    """In-process store holding at most `maxsize` fragments, least recently used evicted first."""
+
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """{key: (version, html)} for the keys present."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = entry
+        return found
+
+    def set_many(self, entries):
+        with self._lock:
+            for key, entry in entries.items():
+                current = self._entries.get(key)
+                if current is None or current[0] <= entry[0]:
+                    self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqlStore:
+    """Shared store in the `fragment_cache` table: one row per (kind, salon), overwritten on re-render."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        c = fragment_cache.c
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(c.kind, c.salon_id, c.version, c.html)
+                                .where(tuple_(c.kind, c.salon_id).in_(list(keys))))
+            return {(kind, salon_id): (version, html) for kind, salon_id, version, html in rows}
+
+    def set_many(self, entries):
+        if not entries:
+            return
+        rows = [{'kind': kind, 'salon_id': salon_id, 'version': version, 'html': html}
+                for (kind, salon_id), (version, html) in entries.items()]
+        stmt = upsert(self.engine)(fragment_cache).values(rows)
+        try:
+            with self.engine.begin() as conn:
+                # Never let a slow renderer overwrite a newer fragment with an older one
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=['kind', 'salon_id'],
+                    set_={'version': stmt.excluded.version, 'html': stmt.excluded.html},
+                    where=fragment_cache.c.version <= stmt.excluded.version,
+                ))
+        except OperationalError as e:
+            # Sharing is an optimisation: a locked database must not fail the page being rendered
+            log.warning("Could not store %d shared fragments: %s", len(rows), e.orig)
+
+    def clear(self):
+        with self.engine.begin() as conn:
+            conn.execute(fragment_cache.delete())
+
+
+class FragmentCache:
+    """Fragments looked up in `local`, then `shared` (if any), and rendered only on a miss."""
+
+    def __init__(self, local=None, shared=None):
+        self.local = local if local is not None else LruStore()
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, kind, versions, render):
+        """{salon_id: html} for every salon in `versions` ({salon_id: version}).
+
+        `render(salon_ids)` is called once with all the misses and returns {salon_id: html}.
+        """
+        wanted = {(kind, salon_id): version for salon_id, version in versions.items()}
+        found = {key: entry for key, entry in self.local.get_many(wanted).items() if entry[0] == wanted[key]}
+        if self.shared is not None and len(found) < len(wanted):
+            shared = {key: entry for key, entry in self.shared.get_many([k for k in wanted if k not in found]).items()
+                      if entry[0] == wanted[key]}
+            self.local.set_many(shared)
+            found.update(shared)
+        missing = [salon_id for (_, salon_id) in wanted if (kind, salon_id) not in found]
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            rendered = {(kind, salon_id): (versions[salon_id], html) for salon_id, html in render(missing).items()}
+            self.local.set_many(rendered)
+            if self.shared is not None:
+                self.shared.set_many(rendered)
+            found.update(rendered)
+        return {salon_id: found[(kind, salon_id)][1] for salon_id in versions if (kind, salon_id) in found}
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
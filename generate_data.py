@@ -0,0 +1,345 @@
+"""Generate a large, realistic dataset for load testing.
+
+Rows are built in Python from a seeded RNG and written with multi-row bulk
+inserts in large transactions. The same --seed and --anchor therefore always
+produce the same database. Booking indexes are dropped during the load and
+rebuilt afterwards, and the search index, rollups, salon ratings and worker
+skill tags are recomputed at the end.
+
+    python generate_data.py --scale small
+    python generate_data.py --salons 50000 --users 1000000 --bookings 20000000 --seed 7
+    DATABASE_URL=sqlite:////tmp/load.db python generate_data.py --scale tiny
+
+Preset scales (salons / users / bookings):
+    tiny 50 / 2k / 20k, small 1k / 50k / 500k, medium 10k / 250k / 5M, large 50k / 1M / 20M
+"""
+import argparse
+import bisect
+import functools
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+# Loading is re-runnable from scratch, so trade durability for speed
+os.environ.setdefault('SQLITE_SYNCHRONOUS', 'OFF')
+
+from sqlalchemy import DateTime, func, insert, select
+
+from app import create_app
+from models import (db, rebuild_ratings, rebuild_rollups, rebuild_worker_skills, Booking, Review, Salon, Service, User,
+                    Worker)
+from geo import cell_of
+from passwords import PasswordHasher
+from search import rebuild_index
+import migrations
+
+app = create_app(web=False)
+
+SCALES = {
+    'tiny': (50, 2_000, 20_000),
+    'small': (1_000, 50_000, 500_000),
+    'medium': (10_000, 250_000, 5_000_000),
+    'large': (50_000, 1_000_000, 20_000_000),
+}
+
+# City -> (share of salons, neighbourhoods)
+CITIES = {
+    'Bengaluru': (0.20, ['Koramangala', 'Indiranagar', 'Whitefield', 'HSR Layout', 'Jayanagar', 'Malleshwaram']),
+    'Mumbai': (0.18, ['Bandra', 'Andheri', 'Powai', 'Colaba', 'Juhu', 'Dadar']),
+    'Delhi': (0.17, ['Connaught Place', 'Hauz Khas', 'Saket', 'Lajpat Nagar', 'Dwarka', 'Rohini']),
+    'Hyderabad': (0.14, ['Banjara Hills', 'Jubilee Hills', 'Gachibowli', 'Madhapur', 'Kukatpally', 'Kondapur']),
+    'Chennai': (0.11, ['T Nagar', 'Adyar', 'Velachery', 'Anna Nagar', 'Mylapore']),
+    'Pune': (0.10, ['Kothrud', 'Baner', 'Viman Nagar', 'Koregaon Park', 'Hinjewadi']),
+    'Kolkata': (0.10, ['Salt Lake', 'Park Street', 'Ballygunge', 'New Town']),
+}
+
+# City centre (lat, lng); neighbourhoods sit in a ring ~5 km out and salons scatter ~1.5 km around them
+CITY_CENTRES = {
+    'Bengaluru': (12.9716, 77.5946), 'Mumbai': (19.0760, 72.8777), 'Delhi': (28.6139, 77.2090),
+    'Hyderabad': (17.3850, 78.4867), 'Chennai': (13.0827, 80.2707), 'Pune': (18.5204, 73.8567),
+    'Kolkata': (22.5726, 88.3639),
+}
+
+# Category -> (name, min price, max price, duration minutes)
+CATALOG = {
+    'Hair': [('Classic Haircut', 150, 600, 30), ('Layered Cut', 400, 1500, 45), ('Beard Trim', 100, 300, 20),
+             ('Hair Color', 900, 4500, 90), ('Keratin Treatment', 2500, 8000, 120), ('Hair Spa', 700, 2500, 60)],
+    'Spa': [('Swedish Massage', 1500, 4000, 60), ('Deep Tissue Massage', 1800, 4500, 60),
+            ('Head Massage', 300, 900, 30), ('Foot Reflexology', 600, 1500, 45), ('Body Scrub', 1200, 3500, 60)],
+    'Beauty Parlour': [('Facial', 600, 3000, 60), ('Threading', 50, 150, 15), ('Waxing', 300, 1500, 45),
+                       ('Cleanup', 400, 1200, 30), ('Bridal Makeup', 8000, 30000, 180)],
+    'Nails': [('Manicure', 400, 1200, 45), ('Pedicure', 500, 1500, 45), ('Gel Polish', 700, 2000, 60),
+              ('Nail Art', 800, 2500, 60)],
+}
+# Category -> specialities a worker may list next to it
+SPECIALITIES = {
+    'Hair': ['Balayage', 'Keratin', 'Hair Color', 'Bridal Hair', 'Beard Styling', 'Hair Extensions'],
+    'Spa': ['Deep Tissue', 'Aromatherapy', 'Reflexology', 'Hot Stone'],
+    'Beauty Parlour': ['Bridal Makeup', 'Threading', 'Waxing', 'HydraFacial'],
+    'Nails': ['Gel Polish', 'Nail Art', 'Acrylic Extensions'],
+}
+SALON_KINDS = [(['Hair'], 0.35), (['Hair', 'Beauty Parlour'], 0.25), (['Hair', 'Spa'], 0.12),
+               (['Beauty Parlour', 'Nails'], 0.12), (['Spa'], 0.08), (['Hair', 'Beauty Parlour', 'Spa', 'Nails'], 0.08)]
+NAME_PARTS = (['Glow', 'Urban', 'Royal', 'Mirror', 'Silk', 'Velvet', 'Studio', 'Luxe', 'Bliss', 'Aura', 'Zen',
+               'Trendz', 'Style', 'Crown', 'Lotus', 'Pearl'],
+              ['Salon', 'Studio', 'Spa', 'Lounge', 'Parlour', 'Hair Co.', 'Unisex Salon', 'Beauty Bar'])
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Reyansh', 'Kabir', 'Rohan', 'Ishaan', 'Vihaan',
+               'Ananya', 'Diya', 'Aadhya', 'Saanvi', 'Pari', 'Myra', 'Kiara', 'Riya', 'Meera', 'Priya',
+               'Rahul', 'Sneha', 'Karthik', 'Lakshmi', 'Farhan', 'Zoya', 'Neha', 'Vikram', 'Pooja', 'Imran']
+LAST_NAMES = ['Sharma', 'Verma', 'Reddy', 'Iyer', 'Nair', 'Khan', 'Patel', 'Gupta', 'Rao', 'Singh', 'Das',
+              'Mehta', 'Joshi', 'Menon', 'Chatterjee', 'Kulkarni', 'Bose', 'Pillai', 'Shetty', 'Agarwal']
+WORKER_TITLES = ['Junior Stylist', 'Stylist', 'Senior Stylist', 'Therapist', 'Beautician', 'Nail Artist',
+                 'Makeup Artist', 'Colour Expert']
+REVIEW_TEXT = {5: ['Loved it, will come back!', 'Best haircut in the area.', 'Super professional staff.'],
+               4: ['Good service, slight wait.', 'Nice ambience and friendly staff.', 'Worth the price.'],
+               3: ['Okay experience.', 'Decent but a bit pricey.', 'Had to wait quite long.'],
+               2: ['Not great, uneven cut.', 'Staff seemed rushed.'],
+               1: ['Very disappointed.', 'Booking was not honoured.']}
+# Relative demand per hour of day and per weekday (Mon=0); weekends and evenings are busiest
+HOUR_WEIGHTS = {9: 2, 10: 5, 11: 7, 12: 6, 13: 4, 14: 4, 15: 5, 16: 7, 17: 9, 18: 10, 19: 8, 20: 4}
+WEEKDAY_WEIGHTS = [6, 5, 5, 6, 8, 12, 11]
+
+
+class Loader:
+    """Batched multi-row inserts; SQLite gets raw executemany, which skips per-row parameter processing."""
+
+    def __init__(self, conn, batch):
+        self.conn = conn
+        self.batch = batch
+        self.sqlite = conn.dialect.name == 'sqlite'
+
+    def write(self, model, columns, rows):
+        table = model.__table__
+        dated = {i for i, col in enumerate(columns) if isinstance(table.c[col].type, DateTime)}
+        total = 0
+        started = time.perf_counter()
+        for chunk in _chunks(rows, self.batch):
+            if self.sqlite:
+                placeholders = ', '.join('?' * len(columns))
+                if dated:
+                    chunk = [tuple(_sqlite_datetime(v) if i in dated and v is not None else v
+                                   for i, v in enumerate(row)) for row in chunk]
+                self.conn.exec_driver_sql(
+                    f'INSERT INTO "{table.name}" ({", ".join(columns)}) VALUES ({placeholders})', chunk
+                )
+            else:
+                self.conn.execute(insert(table), [dict(zip(columns, row)) for row in chunk])
+            total += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"  {table.name:8} {total:>11,} rows in {elapsed:6.1f}s ({total / max(elapsed, 1e-9):,.0f}/s)")
+        return total
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+
+@functools.lru_cache(maxsize=1 << 18)
+def _sqlite_datetime(value):
+    # Same text layout SQLAlchemy's SQLite DateTime type writes and parses; slots repeat, so cache
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def zipf_cum_weights(n, s, rng):
+    """Cumulative Zipf weights over a shuffled order, so popularity is not tied to id."""
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(itertools.accumulate(1 / r ** s for r in ranks))
+
+
+def pick(cum_weights, rng):
+    return bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+
+
+def area_centre(city, area):
+    lat, lng = CITY_CENTRES[city]
+    areas = CITIES[city][1]
+    angle = 2 * math.pi * areas.index(area) / len(areas)
+    return lat + 0.045 * math.sin(angle), lng + 0.045 * math.cos(angle)
+
+
+def next_id(conn, model):
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def generate(conn, args):
+    rng = random.Random(args.seed)
+    place_rng = random.Random(args.seed + 1)  # separate stream, so adding coordinates left the other rows unchanged
+    skill_rng = random.Random(args.seed + 2)  # likewise for worker specialities
+    loader = Loader(conn, args.batch)
+    anchor = args.anchor
+    password = PasswordHasher(method=app.config['PASSWORD_HASH_METHOD'], workers=0).hash('password123')
+
+    user_base, salon_base = next_id(conn, User), next_id(conn, Salon)
+    worker_base, service_base = next_id(conn, Worker), next_id(conn, Service)
+    booking_base, review_base = next_id(conn, Booking), next_id(conn, Review)
+
+    # Salons: city mix, a business type, 2-12 workers and the services of its categories
+    cities = list(CITIES)
+    city_cum = list(itertools.accumulate(CITIES[c][0] for c in cities))
+    kind_cum = list(itertools.accumulate(w for _, w in SALON_KINDS))
+    owners = max(1, int(args.salons * 0.8))  # a fifth of owners run a second branch
+    salons, workers, services = [], [], []
+    salon_workers, salon_services = [], []  # per salon: (first id, count) / [(id, price, duration)]
+    worker_id, service_id = worker_base, service_base
+    for i in range(args.salons):
+        sid = salon_base + i
+        city = cities[pick(city_cum, rng)]
+        area = rng.choice(CITIES[city][1])
+        opening = rng.choice(['09:00 AM', '09:30 AM', '10:00 AM'])
+        closing = rng.choice(['08:00 PM', '08:30 PM', '09:00 PM'])
+        salons.append((sid, f"{rng.choice(NAME_PARTS[0])} {rng.choice(NAME_PARTS[1])} {i + 1}", f"{city}, {area}",
+                       round(rng.uniform(3.5, 5.0), 1), f"https://picsum.photos/seed/salon{sid}/480/320",
+                       f"9{rng.randrange(10 ** 9):09d}", opening, closing, rng.randint(1, 25),
+                       rng.random() > 0.05, user_base + (i % owners)))
+        centre_lat, centre_lng = area_centre(city, area)
+        lat, lng = round(place_rng.gauss(centre_lat, 0.014), 6), round(place_rng.gauss(centre_lng, 0.014), 6)
+        salons[-1] += (lat, lng, cell_of(lat, lng))
+
+        categories = SALON_KINDS[pick(kind_cum, rng)][0]
+        offered = []
+        for category in categories:
+            for name, low, high, duration in CATALOG[category]:
+                if rng.random() < 0.8:
+                    price = round(rng.uniform(low, high) / 10) * 10
+                    services.append((service_id, name, price, duration, category, sid))
+                    offered.append((service_id, price, duration))
+                    service_id += 1
+        salon_services.append(offered)
+
+        staff = rng.randint(2, 12)
+        salon_workers.append((worker_id, staff))
+        specialities = [s for category in categories for s in SPECIALITIES[category]]
+        for _ in range(staff):
+            skills = ', '.join(categories + skill_rng.sample(specialities, skill_rng.randint(0, 3)))
+            workers.append([worker_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", rng.choice(WORKER_TITLES),
+                            f"8{rng.randrange(10 ** 9):09d}", rng.randint(0, 20), skills,
+                            f"https://i.pravatar.cc/150?u=w{worker_id}", rng.random() < 0.4, sid, None])
+            worker_id += 1
+
+    # Users: owners first, then logins for ~60% of workers, the rest are customers
+    worker_logins = [w for w in workers if rng.random() < 0.6][:max(0, args.users - owners)]
+    customer_count = max(1, args.users - owners - len(worker_logins))
+    worker_user_base = user_base + owners
+    customer_base = worker_user_base + len(worker_logins)
+    for offset, w in enumerate(worker_logins):
+        w[9] = worker_user_base + offset
+
+    def users():
+        for n in range(owners + len(worker_logins) + customer_count):
+            uid = user_base + n
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            role = 'salon_owner' if n < owners else 'worker' if uid < customer_base else 'customer'
+            yield (uid, f"{first} {last}", f"{first.lower()}.{last.lower()}.{uid}@example.com",
+                   f"7{uid:09d}"[-10:], password, rng.choice(['Female', 'Male', 'Female', 'Other']), role)
+
+    print(f"Generating {args.salons:,} salons, {args.users:,} users, {args.bookings:,} bookings (seed {args.seed})")
+    loader.write(User, ['id', 'name', 'email', 'phone', 'password', 'gender', 'role'], users())
+    loader.write(Salon, ['id', 'name', 'location', 'rating', 'image_url', 'phone', 'opening_time', 'closing_time',
+                         'experience', 'is_open', 'owner_id', 'latitude', 'longitude', 'geo_cell'], salons)
+    loader.write(Service, ['id', 'name', 'price', 'duration', 'category', 'salon_id'], services)
+    loader.write(Worker, ['id', 'name', 'role', 'phone', 'experience', 'skills', 'image_url', 'is_online',
+                          'salon_id', 'user_id'], map(tuple, workers))
+    del salons, services, workers
+
+    # Bookings: Zipf-popular salons and customers, a year of history plus 30 days ahead
+    salon_cum = zipf_cum_weights(args.salons, 1.0, rng)
+    customer_cum = zipf_cum_weights(customer_count, 0.8, rng)
+    days = [anchor + timedelta(days=d) for d in range(-365, 31)]
+    day_cum = list(itertools.accumulate(
+        WEEKDAY_WEIGHTS[day.weekday()] * (1.0 if day <= anchor else 0.5) for day in days
+    ))
+    day_starts = [(datetime.combine(day, datetime.min.time()), day.strftime('%a, %b %d'), day < anchor)
+                  for day in days]
+    slots = [(timedelta(hours=h, minutes=m), f"{(h - 1) % 12 + 1:02d}:{m:02d} {'AM' if h < 12 else 'PM'}")
+             for h in HOUR_WEIGHTS for m in (0, 30)]
+    slot_cum = list(itertools.accumulate(w for w in HOUR_WEIGHTS.values() for _ in (0, 30)))
+    reviews = []
+
+    def bookings():
+        for n in range(args.bookings):
+            bid = booking_base + n
+            s = pick(salon_cum, rng)
+            offered = salon_services[s]
+            if not offered:
+                continue
+            svc, price, duration = rng.choice(offered)
+            first_worker, staff = salon_workers[s]
+            midnight, day_label, past = day_starts[pick(day_cum, rng)]
+            offset, time_label = slots[pick(slot_cum, rng)]
+            start = midnight + offset
+            user_id = customer_base + pick(customer_cum, rng)
+            worker = first_worker + rng.randrange(staff)
+            roll = rng.random()
+            if past:
+                status = 'Completed' if roll < 0.85 else 'Cancelled' if roll < 0.95 else 'Accepted'
+            else:
+                status = 'Pending' if roll < 0.55 else 'Accepted' if roll < 0.9 else 'Cancelled'
+            if status == 'Pending' and rng.random() < 0.7:
+                worker = None  # 'Any Expert'
+            if status == 'Completed' and rng.random() < args.review_rate:
+                rating = rng.choices((5, 4, 3, 2, 1), (45, 30, 13, 7, 5))[0]
+                reviews.append((rating, rng.choice(REVIEW_TEXT[rating]), midnight.date().isoformat(),
+                                user_id, salon_base + s))
+            yield (bid, user_id, salon_base + s, svc, worker, day_label, time_label,
+                   start, start + timedelta(minutes=duration), status)
+
+    booking_indexes = [ix for ix in Booking.__table__.indexes]
+    for ix in booking_indexes:
+        ix.drop(conn, checkfirst=True)
+    loader.write(Booking, ['id', 'user_id', 'salon_id', 'service_id', 'worker_id', 'date', 'time',
+                           'start_at', 'end_at', 'status'], bookings())
+    started = time.perf_counter()
+    for ix in booking_indexes:
+        ix.create(conn)
+    print(f"  rebuilt {len(booking_indexes)} booking indexes in {time.perf_counter() - started:.1f}s")
+
+    loader.write(Review, ['id', 'rating', 'comment', 'date', 'user_id', 'salon_id'],
+                 ((review_base + n, *row) for n, row in enumerate(reviews)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic load-testing dataset.")
+    parser.add_argument('--scale', choices=SCALES, default='tiny')
+    parser.add_argument('--salons', type=int)
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--bookings', type=int)
+    parser.add_argument('--review-rate', type=float, default=0.15, help="share of completed bookings reviewed")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor', type=date.fromisoformat, default=date(2026, 1, 1),
+                        help="'today' for the data: history before it, upcoming bookings after (YYYY-MM-DD)")
+    parser.add_argument('--batch', type=int, default=50_000, help="rows per insert batch")
+    parser.add_argument('--append', action='store_true', help="add to a database that already has salons")
+    args = parser.parse_args()
+    salons, users, bookings = SCALES[args.scale]
+    args.salons = args.salons or salons
+    args.users = args.users or users
+    args.bookings = args.bookings if args.bookings is not None else bookings
+
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        migrations.upgrade(db.engine, log=None)
+        if db.session.query(Salon.id).first() and not args.append:
+            sys.exit("Database already has salons; use an empty DATABASE_URL or pass --append.")
+        db.session.remove()
+
+        with db.engine.begin() as conn:
+            generate(conn, args)
+        print("Rebuilding search index, rollups, ratings and skill tags...")
+        with db.engine.begin() as conn:
+            rebuild_index(conn)
+        rebuild_rollups()
+        rebuild_ratings()
+        rebuild_worker_skills()
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
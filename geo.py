@@ -0,0 +1,82 @@
+"""Grid-cell spatial indexing for "salons near me".
+
+Every salon with coordinates is given the integer id of the 0.01° x 0.01° grid
+cell it falls in; at Indian latitudes a cell is about 1.1 km square. The column
+is an ordinary B-tree index, so the scheme works the same on SQLite and
+PostgreSQL.
+
+Cells are numbered row by row, so the cells of one grid row inside a bounding
+box form a contiguous id range. A radius search is therefore a handful of
+`geo_cell BETWEEN lo AND hi` ranges, one per row crossed. Exact great-circle
+distances are computed only for the few candidates those ranges return.
+"""
+import math
+import re
+
+CELL_DEGREES = 0.01
+COLUMNS = round(360 / CELL_DEGREES)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Google Maps embeds carry the centre as !2d<lng>!3d<lat>; share and search links use @lat,lng or q=lat,lng
+_EMBED = re.compile(r'!2d(-?\d+(?:\.\d+)?)!3d(-?\d+(?:\.\d+)?)')
+_AT = re.compile(r'@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)')
+_QUERY = re.compile(r'[?&](?:q|ll|center|query|destination)=(-?\d+(?:\.\d+)?)(?:,|%2C)(-?\d+(?:\.\d+)?)', re.I)
+
+
+def valid(lat, lng):
+    return lat is not None and lng is not None and -90 <= lat <= 90 and -180 <= lng <= 180
+
+
+def cell_of(lat, lng):
+    """Grid cell id for a point, or None without valid coordinates."""
+    if not valid(lat, lng):
+        return None
+    row = min(int((lat + 90) // CELL_DEGREES), round(180 / CELL_DEGREES) - 1)
+    col = int((lng + 180) // CELL_DEGREES) % COLUMNS
+    return row * COLUMNS + col
+
+
+def cell_ranges(lat, lng, radius_km):
+    """Inclusive (lo, hi) cell id ranges covering every point within `radius_km` of (lat, lng)."""
+    dlat = radius_km / KM_PER_DEGREE
+    # Longitude degrees shrink towards the poles; size the box for the widest row it spans
+    widest = max(abs(lat) + dlat, 0)
+    dlng = min(180.0, radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(widest, 89.9))), 1e-6)))
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    first_row, last_row = cell_of(south, 0) // COLUMNS, cell_of(north, 0) // COLUMNS
+    if dlng >= 180:
+        return [(first_row * COLUMNS, last_row * COLUMNS + COLUMNS - 1)]
+    west_col = int((lng - dlng + 180) // CELL_DEGREES) % COLUMNS
+    east_col = int((lng + dlng + 180) // CELL_DEGREES) % COLUMNS
+    ranges = []
+    for row in range(first_row, last_row + 1):
+        base = row * COLUMNS
+        if west_col <= east_col:
+            ranges.append((base + west_col, base + east_col))
+        else:  # the box crosses the antimeridian
+            ranges.extend([(base + west_col, base + COLUMNS - 1), (base, base + east_col)])
+    return ranges
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_map_url(url):
+    """(lat, lng) from a Google Maps embed or share link, or None if it carries no coordinates."""
+    if not url:
+        return None
+    match = _EMBED.search(url)
+    if match:
+        lng, lat = float(match.group(1)), float(match.group(2))
+    else:
+        match = _AT.search(url) or _QUERY.search(url)
+        if not match:
+            return None
+        lat, lng = float(match.group(1)), float(match.group(2))
+    return (lat, lng) if valid(lat, lng) else None
@@ -0,0 +1,145 @@
+"""Conditional GETs and response compression.
+
+Pages that know their own version (a salon page is fully described by the salon's
+fragment version) check `If-None-Match` before doing any work, using `etag` and
+`not_modified`. Every other HTML or JSON page gets an ETag hashed from its body
+after rendering. Such a page is still rendered, but an unchanged one costs the
+client a 304 and no bytes.
+
+Responses are compressed with whatever the client's `Accept-Encoding` prefers:
+brotli when the `brotli` package is installed, otherwise gzip. ETags include a
+release id (a hash of the templates and static files), so a deploy never
+revalidates against markup from an older release.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE = {'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+                'application/json', 'image/svg+xml'}
+
+
+def release_id(app):
+    """Hash of every template and static file, so ETags change with each deploy."""
+    digest = hashlib.sha256()
+    for folder in (app.template_folder and os.path.join(app.root_path, app.template_folder), app.static_folder):
+        if not folder or not os.path.isdir(folder):
+            continue
+        for root, dirs, names in os.walk(folder):
+            dirs.sort()
+            for name in sorted(names):
+                with open(os.path.join(root, name), 'rb') as f:
+                    digest.update(name.encode())
+                    digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class HttpCache:
+    def __init__(self, app=None):
+        self.encodings = ['br', 'gzip'] if brotli else ['gzip']
+        self._files = OrderedDict()  # (etag, encoding) -> compressed static file body
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_FILE_CACHE', 64)
+        self.app = app
+        self.release = release_id(app)
+        app.after_request(self._finish)
+        app.extensions['http_cache'] = self
+
+    def etag(self, *parts):
+        return '-'.join([self.release, *map(str, parts)])
+
+    def not_modified(self, etag, public=False):
+        """A 304 for `etag` if the client already has it, else None (render as usual and call `tag`)."""
+        if request.method in ('GET', 'HEAD') and request.if_none_match.contains_weak(etag):
+            return self.tag(Response(status=304), etag, public)
+        return None
+
+    def tag(self, response, etag, public=False):
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        if public:
+            response.cache_control.public = True
+        else:
+            response.cache_control.private = True
+        return response
+
+    def _finish(self, response):
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        if response.is_streamed and not response.direct_passthrough:
+            return response  # event streams and other generators go out as they are produced
+        if not response.direct_passthrough and response.mimetype in ('text/html', 'application/json'):
+            if response.get_etag()[0] is None:
+                response.set_etag(self.etag(hashlib.sha1(response.get_data()).hexdigest()[:16]))
+                if not response.cache_control.public:
+                    response.cache_control.private = True
+                    response.cache_control.no_cache = True
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+        return self._compress(response)
+
+    def _compress(self, response):
+        if response.mimetype not in COMPRESSIBLE or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        length = response.content_length
+        if encoding is None or (length is not None and length < self.app.config['COMPRESS_MIN_SIZE']):
+            return response
+        etag, _ = response.get_etag()
+        original = response.response
+        if response.direct_passthrough:
+            # A static file: compress it once per version and keep the bytes
+            body = self._cached_file(etag, encoding, response)
+        else:
+            data = response.get_data()
+            if len(data) < self.app.config['COMPRESS_MIN_SIZE']:
+                return response
+            body = compress(data, encoding, self.app.config['COMPRESS_LEVEL'])
+        response.direct_passthrough = False
+        response.set_data(body)
+        if hasattr(original, 'close'):
+            original.close()
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # Same content, different bytes: the tag still validates, but only weakly
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _cached_file(self, etag, encoding, response):
+        key = (etag, encoding)
+        with self._lock:
+            body = self._files.get(key)
+            if body is not None:
+                self._files.move_to_end(key)
+                return body
+        response.direct_passthrough = False
+        body = compress(response.get_data(), encoding, 9 if encoding == 'gzip' else 11)  # once, so spend more CPU
+        if etag:
+            with self._lock:
+                self._files[key] = body
+                while len(self._files) > self.app.config['COMPRESS_FILE_CACHE']:
+                    self._files.popitem(last=False)
+        return body
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+
+class IdentityCache:
+    """Per-process TTL cache of who a logged-in user is.
+
+    Values are plain column snapshots (see `snapshot`), never live ORM objects, so
+    they can be shared between threads and re-attached to any request's session
+    without a query. Each key carries a generation number: a value loaded before an
+    invalidation is dropped instead of cached, so a slow reader cannot resurrect
+    stale data. Other processes only notice changes when their entry expires.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def generation(self, key):
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def put(self, key, value, generation):
+        """Store `value` unless `key` was invalidated after `generation` was read."""
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.clear()
+
+
+def snapshot(obj):
+    """(model, {column: value}) for a loaded instance, or None."""
+    if obj is None:
+        return None
+    mapper = inspect(obj).mapper
+    return type(obj), {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
+
+
+def attach(session, snap):
+    """Turn a snapshot back into a persistent instance of `session` without querying.
+
+    If the session already holds that row, the existing instance wins.
+    """
+    if snap is None:
+        return None
+    model, values = snap
+    mapper = inspect(model)
+    key = mapper.identity_key_from_primary_key([values[col.key] for col in mapper.primary_key])
+    existing = session.identity_map.get(key)
+    if existing is not None:
+        return existing
+    obj = model(**values)
+    make_transient_to_detached(obj)
+    session.add(obj)
+    return obj
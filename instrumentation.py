@@ -0,0 +1,230 @@
+"""Per-request timings, SQL statistics and N+1 detection, exported on /metrics.
+
+For every request we record:
+- wall time
+- time spent executing SQL
+- the number of statements
+- time spent rendering templates
+- how often each statement *shape* repeats
+
+Shapes are fingerprints: the SQL with literals and IN-lists collapsed. A shape
+seen `N_PLUS_ONE_THRESHOLD` or more times in one request is the classic lazy
+load in a loop. It is counted in a metric and logged once per route and shape.
+
+Collection costs two event callbacks per statement plus a cached fingerprint
+lookup, so it can stay on in production. Metrics are per process, in Prometheus
+text format, and every series carries the process's pid as a label. Under
+serve.py a scrape returns only the counters of the worker that answered it, so
+one scrape is never the whole server; with the pid label, workers' counters stay
+separate series and never read as resets of each other. Requests slower than
+SLOW_REQUEST_MS log their full statement list.
+"""
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import Response, before_render_template, g, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+_local = threading.local()
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM_LIST = re.compile(r"\(\s*(\?|%\(\w+\)s|:\w+)(\s*,\s*(\?|%\(\w+\)s|:\w+))*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(statement):
+    """SQL shape: literals become ?, any parameter list becomes (?...), whitespace collapses."""
+    shape = _STRING.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _PARAM_LIST.sub("(?...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series = defaultdict(lambda: [[0] * len(self.buckets), 0, 0.0])  # counts, total, sum
+        self._lock = threading.Lock()
+
+    def observe(self, label, value):
+        with self._lock:
+            counts, _, _ = series = self._series[label]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += 1
+            series[2] += value
+
+    def render(self, pid):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label, (counts, total, value_sum) in sorted(self._series.items()):
+                labels = f'pid="{pid}",endpoint="{label}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {total}')
+                lines.append(f'{self.name}_sum{{{labels}}} {value_sum:.6f}')
+                lines.append(f'{self.name}_count{{{labels}}} {total}')
+        return lines
+
+
+class Counters:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *labels):
+        with self._lock:
+            self._values[labels] += 1
+
+    def render(self, pid):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                pairs = ','.join(f'{k}="{v}"' for k, v in zip(('pid', *self.label_names), (pid, *labels)))
+                lines.append(f"{self.name}{{{pairs}}} {value}")
+        return lines
+
+
+class RequestStats:
+    __slots__ = ('started', 'sql_time', 'statements', 'shapes', 'template_time', 'template_depth',
+                 'template_started', 'keep_statements')
+
+    def __init__(self, keep_statements):
+        self.started = time.perf_counter()
+        self.sql_time = 0.0
+        self.statements = [] if keep_statements else None
+        self.shapes = Counter()
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.template_started = 0.0
+        self.keep_statements = keep_statements
+
+
+class Instrumentation:
+    def __init__(self, app=None, prefix='salon'):
+        self.prefix = prefix
+        self.request_time = Histogram(f'{prefix}_request_duration_seconds', "Wall time per request", TIME_BUCKETS)
+        self.sql_time = Histogram(f'{prefix}_request_sql_seconds', "Time spent executing SQL per request",
+                                  TIME_BUCKETS)
+        self.sql_count = Histogram(f'{prefix}_request_sql_statements', "SQL statements per request", COUNT_BUCKETS)
+        self.template_time = Histogram(f'{prefix}_request_template_seconds', "Template render time per request",
+                                       TIME_BUCKETS)
+        self.requests = Counters(f'{prefix}_requests_total', "Requests by endpoint and status", ('endpoint', 'status'))
+        self.n_plus_one = Counters(f'{prefix}_n_plus_one_total', "Requests repeating one statement shape",
+                                   ('endpoint',))
+        self._reported = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_REQUEST_MS', None)
+        app.config.setdefault('N_PLUS_ONE_THRESHOLD', 5)
+        self.app = app
+        app.before_request(self._start)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish)
+        before_render_template.connect(self._template_start, app)
+        template_rendered.connect(self._template_end, app)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.extensions['instrumentation'] = self
+
+    def _start(self):
+        g._request_stats = _local.stats = RequestStats(keep_statements=bool(self.app.config['SLOW_REQUEST_MS']))
+
+    def _record_status(self, response):
+        g._response_status = response.status_code
+        return response
+
+    def _finish(self, exc):
+        stats = g.pop('_request_stats', None)
+        _local.stats = None
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or 'unmatched'
+        if endpoint == 'metrics':
+            return
+        statements = sum(stats.shapes.values())
+        self.request_time.observe(endpoint, elapsed)
+        self.sql_time.observe(endpoint, stats.sql_time)
+        self.sql_count.observe(endpoint, statements)
+        self.template_time.observe(endpoint, stats.template_time)
+        status = 500 if exc is not None else getattr(g, '_response_status', 0)
+        self.requests.inc(endpoint, status)
+
+        threshold = self.app.config['N_PLUS_ONE_THRESHOLD']
+        repeated = [(shape, n) for shape, n in stats.shapes.items() if n >= threshold]
+        if repeated:
+            self.n_plus_one.inc(endpoint)
+            for shape, n in repeated:
+                if (endpoint, shape) not in self._reported:
+                    self._reported.add((endpoint, shape))
+                    log.warning("Possible N+1 in %s: %d x %s", endpoint, n, shape)
+
+        slow_ms = self.app.config['SLOW_REQUEST_MS']
+        if slow_ms and elapsed * 1000 >= slow_ms:
+            log.warning("Slow request %s %s: %.0f ms (%d statements, %.0f ms SQL, %.0f ms templates)\n%s",
+                        request.method, request.full_path, elapsed * 1000, statements, stats.sql_time * 1000,
+                        stats.template_time * 1000, "\n".join(stats.statements or ()))
+
+    def _template_start(self, sender, template, context, **extra):
+        stats = getattr(_local, 'stats', None)
+        if stats is not None:
+            if stats.template_depth == 0:
+                stats.template_started = time.perf_counter()
+            stats.template_depth += 1
+
+    def _template_end(self, sender, template, context, **extra):
+        stats = getattr(_local, 'stats', None)
+        if stats is not None and stats.template_depth:
+            stats.template_depth -= 1
+            if stats.template_depth == 0:
+                stats.template_time += time.perf_counter() - stats.template_started
+
+    def metrics_view(self):
+        pid = os.getpid()  # here, not at init: serve.py workers fork after the app is built
+        lines = []
+        for metric in (self.requests, self.request_time, self.sql_time, self.sql_count, self.template_time,
+                       self.n_plus_one):
+            lines.extend(metric.render(pid))
+        return Response("\n".join(lines) + "\n", mimetype='text/plain; version=0.0.4')
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _sql_start(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, 'stats', None) is not None:
+        conn.info['_instrumentation_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _sql_end(conn, cursor, statement, parameters, context, executemany):
+    stats = getattr(_local, 'stats', None)
+    started = conn.info.pop('_instrumentation_started', None)
+    if stats is None or started is None:
+        return
+    stats.sql_time += time.perf_counter() - started
+    stats.shapes[fingerprint(statement)] += 1
+    if stats.keep_statements:
+        stats.statements.append(statement)
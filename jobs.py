@@ -0,0 +1,171 @@
+"""Database-backed job queue for side effects that should not hold up a request.
+
+Jobs are rows in the `job` table, so they are enqueued in the same transaction
+as the change that caused them: a rolled-back booking never notifies anyone.
+Runners claim a job with a conditional UPDATE, the same way workers claim
+bookings, so any number of threads or processes can poll the table. Failed jobs
+are retried with exponential backoff until `max_attempts`. A job whose runner
+died mid-run is picked up again once its lease expires. The table is created by
+migration 9 (python migrate.py).
+"""
+import json
+import logging
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, func, or_, select, update
+
+from storage import upsert
+
+log = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+jobs = Table(
+    'job', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('kind', String(50), nullable=False),
+    Column('payload', Text, nullable=False),
+    Column('idempotency_key', String(200), unique=True),  # NULL keys never collide
+    Column('status', String(20), nullable=False, default='queued'),  # queued, running, done, failed
+    Column('attempts', Integer, nullable=False, default=0),
+    Column('max_attempts', Integer, nullable=False, default=5),
+    Column('run_at', DateTime, nullable=False),
+    Column('locked_at', DateTime),
+    Column('claim_token', String(32)),
+    Column('last_error', Text),
+    Column('created_at', DateTime, nullable=False),
+    Index('ix_job_status_run_at', 'status', 'run_at'),
+    Index('ix_job_claim_token', 'claim_token'),
+)
+
+class JobQueue:
+    def __init__(self, engine, lease=300, backoff=5, max_backoff=3600):
+        self.engine = engine
+        self.lease = lease
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.handlers = {}
+
+    def handler(self, kind):
+        """Register `fn(payload)` to run jobs of `kind`."""
+        def register(fn):
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    def enqueue(self, conn, kind, payload, key=None, delay=0, max_attempts=5):
+        """Add a job on `conn` (pass the session's connection to join its transaction).
+
+        A job whose `key` was already enqueued is ignored, so retried requests and
+        double submits do not duplicate side effects. Returns True if a row was added.
+        """
+        now = datetime.now()
+        stmt = upsert(conn)(jobs).values(
+            kind=kind, payload=json.dumps(payload), idempotency_key=key, status='queued', attempts=0,
+            max_attempts=max_attempts, run_at=now + timedelta(seconds=delay), created_at=now,
+        )
+        if key is not None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=['idempotency_key'])
+        return conn.execute(stmt).rowcount == 1
+
+    def _claim(self, conn):
+        """Mark the next due job as ours in one UPDATE (no read-then-write lock upgrade) and load it."""
+        now = datetime.now()
+        expired = now - timedelta(seconds=self.lease)
+        runnable = or_(
+            (jobs.c.status == 'queued') & (jobs.c.run_at <= now),
+            (jobs.c.status == 'running') & (jobs.c.locked_at < expired),
+        )
+        next_id = select(jobs.c.id).where(runnable).order_by(jobs.c.run_at).limit(1).scalar_subquery()
+        token = uuid.uuid4().hex
+        claimed = conn.execute(
+            update(jobs).where(jobs.c.id == next_id, runnable)
+            .values(status='running', locked_at=now, claim_token=token, attempts=jobs.c.attempts + 1)
+        ).rowcount
+        if not claimed:
+            return None
+        return conn.execute(select(jobs).where(jobs.c.claim_token == token)).mappings().one()
+
+    def run_one(self):
+        """Claim and run the next due job. Returns False when nothing was due."""
+        with self.engine.begin() as conn:
+            job = self._claim(conn)
+        if job is None:
+            return False
+
+        handler = self.handlers.get(job['kind'])
+        try:
+            if handler is None:
+                raise LookupError(f"no handler for job kind {job['kind']!r}")
+            handler(json.loads(job['payload']))
+        except Exception as e:
+            final = job['attempts'] >= job['max_attempts']
+            delay = min(self.max_backoff, self.backoff * 2 ** (job['attempts'] - 1)) * random.uniform(0.8, 1.2)
+            log.warning("Job %s (%s) attempt %s failed: %r", job['id'], job['kind'], job['attempts'], e)
+            values = {'status': 'failed' if final else 'queued', 'locked_at': None, 'last_error': repr(e)}
+            if not final:
+                values['run_at'] = datetime.now() + timedelta(seconds=delay)
+        else:
+            values = {'status': 'done', 'locked_at': None, 'last_error': None}
+        with self.engine.begin() as conn:
+            # Only the current claimant records the outcome; a runner that outlived its lease is ignored
+            conn.execute(update(jobs).where(jobs.c.id == job['id'], jobs.c.claim_token == job['claim_token'])
+                         .values(**values))
+        return True
+
+    def run_until_empty(self, limit=None):
+        """Run due jobs on this thread until none are left (scripts and tests). Returns how many ran."""
+        ran = 0
+        while (limit is None or ran < limit) and self.run_one():
+            ran += 1
+        return ran
+
+    def counts(self):
+        with self.engine.connect() as conn:
+            return dict(conn.execute(select(jobs.c.status, func.count()).group_by(jobs.c.status)).all())
+
+
+class JobRunner:
+    """Polls a JobQueue from a small pool of daemon threads.
+
+    `context` is entered around every job (the Flask app context, so handlers can
+    use the session). Threads sleep `poll` seconds whenever the queue is empty.
+    """
+
+    def __init__(self, queue, threads=2, poll=1.0, context=None):
+        self.queue = queue
+        self.threads = threads
+        self.poll = poll
+        self.context = context
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.threads):
+            t = threading.Thread(target=self._loop, name=f'job-runner-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.context is not None:
+                    with self.context():
+                        ran = self.queue.run_one()
+                else:
+                    ran = self.queue.run_one()
+            except Exception:
+                log.exception("Job runner error")
+                ran = False
+            if not ran:
+                self._stop.wait(self.poll)
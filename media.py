@@ -0,0 +1,155 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+
+from flask import abort, current_app, flash, send_file, url_for
+
+# Stored in image_url columns in place of the image itself
+MEDIA_PREFIX = 'media:'
+
+# Variant name -> bounding box in pixels (None keeps the original bytes)
+SIZES = {
+    'thumb': 150,
+    'card': 480,
+    'full': None,
+}
+
+_DATA_URL = re.compile(r'^data:(image/[\w.+-]+)?(;[\w=-]+)*;base64,', re.I)
+_HASH = re.compile(r'^[0-9a-f]{64}$')
+
+_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+
+class InvalidMedia(ValueError):
+    pass
+
+
+def is_data_url(value):
+    return bool(value) and _DATA_URL.match(value) is not None
+
+
+def is_media_key(value):
+    return bool(value) and value.startswith(MEDIA_PREFIX)
+
+
+def sniff_type(data):
+    for signature, mimetype in _SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def media_dir(root, digest):
+    return os.path.join(root, digest[:2], digest)
+
+
+def variant_path(root, digest, size):
+    if size not in SIZES or not _HASH.match(digest):
+        return None
+    return os.path.join(media_dir(root, digest), size)
+
+
+def _resize(data, box):
+    try:
+        from PIL import Image  # on first upload rather than at startup
+    except ImportError:  # Thumbnails fall back to the original image without Pillow
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            # Pillow only refuses outright at twice this; a few KB of PNG can still decode to gigabytes
+            if img.width * img.height > Image.MAX_IMAGE_PIXELS:
+                raise InvalidMedia("Image upload has too many pixels.")
+            if max(img.size) <= box:
+                return data
+            fmt = img.format or 'PNG'
+            img.thumbnail((box, box))
+            out = io.BytesIO()
+            img.save(out, format=fmt)
+            return out.getvalue()
+    except Image.DecompressionBombError:
+        raise InvalidMedia("Image upload has too many pixels.") from None
+    except InvalidMedia:
+        raise
+    except (OSError, ValueError):
+        return data
+
+
+def _write_atomic(path, data):
+    # A temporary name of its own, so threads storing the same image never share one
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.',
+                                     suffix='.tmp', delete=False) as f:
+        f.write(data)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+def store_bytes(root, data):
+    """Store raw image bytes under their sha256 and return the media key.
+
+    Identical uploads share one directory, so re-saving is a no-op. Raises
+    InvalidMedia, before writing anything, for an image too large to decode.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    folder = media_dir(root, digest)
+    if not os.path.exists(variant_path(root, digest, 'full')):
+        variants = {size: data if box is None else _resize(data, box) for size, box in SIZES.items()}
+        os.makedirs(folder, exist_ok=True)
+        for size, variant in variants.items():
+            _write_atomic(os.path.join(folder, size), variant)
+    return MEDIA_PREFIX + digest
+
+
+def store_data_url(root, value):
+    """Decode a base64 data URL once and store it. Non-data values (plain URLs, keys) pass through."""
+    if not is_data_url(value):
+        return value
+    try:
+        data = base64.b64decode(value[value.index(',') + 1:], validate=False)
+    except (binascii.Error, ValueError):
+        raise InvalidMedia("Image upload is not valid base64.")
+    if not data:
+        raise InvalidMedia("Image upload is empty.")
+    return store_bytes(root, data)
+
+
+def save_upload(value):
+    """Move an uploaded base64 data URL into the media store and return the key to keep in the DB."""
+    try:
+        return store_data_url(current_app.config['MEDIA_ROOT'], value)
+    except InvalidMedia as e:
+        flash(str(e))
+        return None
+
+
+def media_url(value, size='card'):
+    """Template filter: the URL of a stored image's variant, or a plain image URL as is."""
+    if is_media_key(value):
+        return url_for('media', digest=value[len(MEDIA_PREFIX):], size=size)
+    return value or ''
+
+
+def media(digest, size):
+    path = variant_path(current_app.config['MEDIA_ROOT'], digest, size)
+    if not path or not os.path.exists(path):
+        abort(404)
+    with open(path, 'rb') as f:
+        mimetype = sniff_type(f.read(16))
+    # Content never changes for a given hash, so the ETag is strong and the cache lifetime is a year
+    response = send_file(path, mimetype=mimetype, etag=f"{digest}-{size}", max_age=31536000, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
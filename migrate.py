@@ -0,0 +1,25 @@
+"""Upgrade the database in place.
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --seed     # ...then add the demo salons if they are missing
+    python migrate.py --status   # show applied version and what is pending
+"""
+import sys
+
+from app import create_app
+from models import db
+from seed import seed_data
+import migrations
+
+with create_app(web=False).app_context():
+    if '--status' in sys.argv:  # read-only: creates nothing, not even the version table
+        print(f"Schema version: {migrations.current_version(db.engine)}")
+        for version, name in migrations.pending(db.engine):
+            print(f"  pending {version:03d}: {name}")
+    else:
+        db.create_all()  # new tables only; existing ones are left to the migrations
+        version = migrations.upgrade(db.engine)
+        print(f"Database is at schema version {version}.")
+        if '--seed' in sys.argv:
+            seed_data()
+            print("Demo data is in place.")
@@ -0,0 +1,38 @@
+from app import create_app
+from models import db, Salon, Worker, Service
+from media import InvalidMedia, store_data_url
+from sqlalchemy import text
+
+# One-shot move of base64 data URLs out of the database into the media store.
+# Safe to re-run: rows already holding a media key or a plain URL are skipped.
+BATCH_SIZE = 200
+
+COLUMNS = [
+    (Salon, 'image_url'),
+    (Salon, 'logo_url'),
+    (Worker, 'image_url'),
+    (Service, 'image_url'),
+]
+
+app = create_app(web=False)
+with app.app_context():
+    moved = 0
+    for model, column in COLUMNS:
+        field = getattr(model, column)
+        ids = [row[0] for row in db.session.query(model.id).filter(field.like('data:%')).all()]
+        for start in range(0, len(ids), BATCH_SIZE):
+            for row in model.query.filter(model.id.in_(ids[start:start + BATCH_SIZE])).all():
+                try:
+                    setattr(row, column, store_data_url(app.config['MEDIA_ROOT'], getattr(row, column)))
+                    moved += 1
+                except InvalidMedia as e:
+                    print(f"Skipped {model.__name__} {row.id}.{column}: {e}")
+            db.session.commit()
+            db.session.expunge_all()
+        print(f"{model.__name__}.{column}: {len(ids)} base64 rows processed")
+
+    # Reclaim the space the image text used
+    if db.engine.dialect.name == 'sqlite' and moved:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('VACUUM'))
+    print(f"Migration complete! Moved {moved} images to {app.config['MEDIA_ROOT']}")
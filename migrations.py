@@ -0,0 +1,415 @@
+"""Versioned, in-place schema migrations.
+
+Each migration is a function of a SQLAlchemy connection, registered in order
+with @migration. Applied versions are recorded in the schema_version table and
+every step runs in its own transaction. Steps are written to be idempotent so
+they also run cleanly after db.create_all() on a brand new database, and they
+use only reflected tables so later model changes cannot alter their meaning.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table,
+                        Text, UniqueConstraint, func, inspect, insert, select, text)
+
+from availability import parse_day, parse_start
+from geo import cell_of, parse_map_url
+from skills import city_of, parse_skills
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def _table(conn, name):
+    return Table(name, MetaData(), autoload_with=conn)
+
+
+def _has_column(conn, table, column):
+    return column in {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def _has_table(conn, table):
+    return inspect(conn).has_table(table)
+
+
+def _create_index(conn, name, table, *columns):
+    if name not in {ix['name'] for ix in inspect(conn).get_indexes(table)}:
+        reflected = _table(conn, table)
+        Index(name, *[reflected.c[col] for col in columns]).create(conn)
+
+
+@migration(1, "booking slot times")
+def add_booking_times(conn):
+    for name in ('start_at', 'end_at'):
+        if not _has_column(conn, 'booking', name):
+            conn.execute(text(f"ALTER TABLE booking ADD COLUMN {name} DATETIME"))
+
+    # Backfill rows whose date string names a real day; relative ones ('Tomorrow') have lost their anchor,
+    # and a year-less one whose weekday fits no nearby year stays NULL (see parse_day)
+    booking, service = _table(conn, 'booking'), _table(conn, 'service')
+    rows = conn.execute(
+        select(booking.c.id, booking.c.date, booking.c.time, service.c.duration)
+        .join(service, service.c.id == booking.c.service_id)
+        .where(booking.c.start_at.is_(None))
+    ).all()
+    for booking_id, day, clock, duration in rows:
+        if (day or '').lower() in ('today', 'tomorrow'):
+            continue
+        start = parse_start(day, clock)
+        if start:
+            conn.execute(booking.update().where(booking.c.id == booking_id).values(
+                start_at=start, end_at=start + timedelta(minutes=duration or 30)
+            ))
+
+
+@migration(2, "hot lookup indexes")
+def add_lookup_indexes(conn):
+    # Booking: claim queue, worker lists, customer history, availability sweeps
+    _create_index(conn, 'ix_booking_salon_status', 'booking', 'salon_id', 'status', 'id')
+    _create_index(conn, 'ix_booking_worker_status', 'booking', 'worker_id', 'status', 'id')
+    _create_index(conn, 'ix_booking_salon', 'booking', 'salon_id', 'id')
+    _create_index(conn, 'ix_booking_user', 'booking', 'user_id', 'id')
+    _create_index(conn, 'ix_booking_worker_start', 'booking', 'worker_id', 'start_at')
+    _create_index(conn, 'ix_booking_salon_start', 'booking', 'salon_id', 'start_at')
+    # Actor profile resolution on nearly every route
+    _create_index(conn, 'ix_worker_user_id', 'worker', 'user_id')
+    _create_index(conn, 'ix_worker_salon_id', 'worker', 'salon_id')
+    _create_index(conn, 'ix_salon_owner_id', 'salon', 'owner_id')
+    _create_index(conn, 'ix_service_salon_id', 'service', 'salon_id')
+    _create_index(conn, 'ix_service_category', 'service', 'category')
+    _create_index(conn, 'ix_user_phone', 'user', 'phone')
+    # signup_code.code is already unique-indexed; owners list their unused codes
+    _create_index(conn, 'ix_signup_code_salon_used', 'signup_code', 'salon_id', 'is_used')
+
+
+@migration(3, "daily revenue rollups")
+def add_daily_rollup(conn):
+    if not _has_table(conn, 'daily_rollup'):
+        metadata = MetaData()
+        Table('salon', metadata, autoload_with=conn)  # target of the foreign key
+        Table(
+            'daily_rollup', metadata,
+            Column('id', Integer, primary_key=True),
+            Column('salon_id', Integer, ForeignKey('salon.id'), nullable=False),
+            Column('worker_id', Integer, nullable=False, default=0),
+            Column('day', Date, nullable=False),
+            Column('bookings', Integer, nullable=False, default=0),
+            Column('revenue', Float, nullable=False, default=0),
+            Column('completions', Integer, nullable=False, default=0),
+            UniqueConstraint('salon_id', 'worker_id', 'day', name='uq_rollup_salon_worker_day'),
+        ).create(conn)
+
+    rollup = _table(conn, 'daily_rollup')
+    if conn.execute(select(rollup.c.id).limit(1)).first():
+        return
+    booking, service = _table(conn, 'booking'), _table(conn, 'service')
+    rows = _rollup_rows(conn, booking, service)
+    if rows:
+        conn.execute(insert(rollup), rows)
+
+
+def _rollup_rows(conn, booking, service):
+    """Daily counters per salon (worker 0) and per worker, bucketed by slot day or today."""
+    totals = {}
+    today = date.today()
+    result = conn.execute(
+        select(booking.c.salon_id, booking.c.worker_id, booking.c.start_at, booking.c.status, service.c.price)
+        .join(service, service.c.id == booking.c.service_id)
+    )
+    for salon_id, worker_id, start_at, status, price in result:
+        if isinstance(start_at, str):
+            start_at = datetime.fromisoformat(start_at)
+        day = start_at.date() if start_at else today
+        for scope in {0, worker_id or 0}:
+            row = totals.setdefault((salon_id, scope, day), {
+                'salon_id': salon_id, 'worker_id': scope, 'day': day,
+                'bookings': 0, 'revenue': 0.0, 'completions': 0,
+            })
+            row['bookings'] += 1
+            if status in ('Accepted', 'Completed'):
+                row['revenue'] += price or 0
+            if status == 'Completed':
+                row['completions'] += 1
+    return list(totals.values())
+
+
+@migration(4, "salon coordinates")
+def add_salon_coordinates(conn):
+    for name, kind in (('latitude', 'FLOAT'), ('longitude', 'FLOAT'), ('geo_cell', 'INTEGER')):
+        if not _has_column(conn, 'salon', name):
+            conn.execute(text(f"ALTER TABLE salon ADD COLUMN {name} {kind}"))
+    _create_index(conn, 'ix_salon_geo_cell', 'salon', 'geo_cell', 'latitude', 'longitude')
+
+    # Most salons were listed with a Google Maps embed that already names the spot
+    salon = _table(conn, 'salon')
+    rows = conn.execute(
+        select(salon.c.id, salon.c.map_url, salon.c.latitude, salon.c.longitude).where(salon.c.geo_cell.is_(None))
+    ).all()
+    for salon_id, map_url, lat, lng in rows:
+        if lat is None or lng is None:
+            lat, lng = parse_map_url(map_url) or (None, None)
+        cell = cell_of(lat, lng)
+        if cell is not None:
+            conn.execute(salon.update().where(salon.c.id == salon_id).values(
+                latitude=lat, longitude=lng, geo_cell=cell
+            ))
+
+
+@migration(5, "salon review totals")
+def add_salon_ratings(conn):
+    _create_index(conn, 'ix_review_salon', 'review', 'salon_id', 'id')
+    if not _has_table(conn, 'salon_rating'):
+        metadata = MetaData()
+        Table('salon', metadata, autoload_with=conn)  # target of the foreign key
+        Table(
+            'salon_rating', metadata,
+            Column('salon_id', Integer, ForeignKey('salon.id'), primary_key=True),
+            Column('count', Integer, nullable=False, default=0),
+            Column('total', Integer, nullable=False, default=0),
+            *[Column(f'stars_{n}', Integer, nullable=False, default=0) for n in range(1, 6)],
+        ).create(conn)
+
+    ratings = _table(conn, 'salon_rating')
+    if conn.execute(select(ratings.c.salon_id).limit(1)).first():
+        return
+    review, salon = _table(conn, 'review'), _table(conn, 'salon')
+    totals = {}
+    rows = conn.execute(
+        select(review.c.salon_id, review.c.rating, func.count()).where(review.c.rating.between(1, 5))
+        .group_by(review.c.salon_id, review.c.rating)
+    )
+    for salon_id, stars, n in rows:
+        row = totals.setdefault(salon_id, {'salon_id': salon_id, 'count': 0, 'total': 0,
+                                           **{f'stars_{k}': 0 for k in range(1, 6)}})
+        row['count'] += n
+        row['total'] += stars * n
+        row[f'stars_{stars}'] += n
+    if totals:
+        conn.execute(insert(ratings), list(totals.values()))
+        # Listing ratings become the review average wherever there are reviews
+        for row in totals.values():
+            conn.execute(salon.update().where(salon.c.id == row['salon_id']).values(
+                rating=round(row['total'] / row['count'], 1)
+            ))
+
+
+@migration(6, "worker skill tags")
+def add_worker_skills(conn):
+    metadata = MetaData()
+    for name in ('salon', 'worker'):
+        Table(name, metadata, autoload_with=conn)  # targets of the foreign keys
+    if not _has_table(conn, 'skill_tag'):
+        Table(
+            'skill_tag', metadata,
+            Column('id', Integer, primary_key=True),
+            Column('slug', String(100), unique=True, nullable=False),
+            Column('name', String(100), nullable=False),
+        ).create(conn)
+    else:
+        Table('skill_tag', metadata, autoload_with=conn)
+    if not _has_table(conn, 'worker_skill'):
+        Table(
+            'worker_skill', metadata,
+            Column('tag_id', Integer, ForeignKey('skill_tag.id'), primary_key=True),
+            Column('worker_id', Integer, ForeignKey('worker.id'), primary_key=True),
+            Column('city', String(100)),
+            Column('is_online', Boolean, nullable=False, default=False),
+            Index('ix_worker_skill_lookup', 'tag_id', 'city', 'worker_id', 'is_online'),
+            Index('ix_worker_skill_worker', 'worker_id'),
+        ).create(conn)
+
+    index = _table(conn, 'worker_skill')
+    if conn.execute(select(index.c.worker_id).limit(1)).first():
+        return
+    # Parse every profile's comma separated skills; the first spelling of a tag names it
+    worker, salon, tag = _table(conn, 'worker'), _table(conn, 'salon'), _table(conn, 'skill_tag')
+    profiles = [(worker_id, parse_skills(skills), bool(online), city_of(location))
+                for worker_id, skills, online, location in conn.execute(
+                    select(worker.c.id, worker.c.skills, worker.c.is_online, salon.c.location)
+                    .select_from(worker.outerjoin(salon, salon.c.id == worker.c.salon_id)))]
+    tag_ids = dict(conn.execute(select(tag.c.slug, tag.c.id)).all())
+    names = {}
+    for _, tags, _, _ in profiles:
+        for slug, name in tags.items():
+            if slug not in tag_ids:
+                names.setdefault(slug, name)
+    if names:
+        conn.execute(insert(tag), [{'slug': slug, 'name': name} for slug, name in names.items()])
+        tag_ids = dict(conn.execute(select(tag.c.slug, tag.c.id)).all())
+    rows = [{'tag_id': tag_ids[slug], 'worker_id': worker_id, 'city': city, 'is_online': online}
+            for worker_id, tags, online, city in profiles for slug in tags]
+    for start in range(0, len(rows), 10000):
+        conn.execute(insert(index), rows[start:start + 10000])
+
+
+@migration(7, "salon fragment versions")
+def add_fragment_tables(conn):
+    # Until now created on first use, which SQLite refuses while that first use holds a write transaction
+    metadata = MetaData()
+    if not _has_table(conn, 'salon_version'):
+        Table(
+            'salon_version', metadata,
+            Column('salon_id', Integer, primary_key=True),
+            Column('version', Integer, nullable=False, default=0),
+        ).create(conn)
+    if not _has_table(conn, 'fragment_cache'):
+        Table(
+            'fragment_cache', metadata,
+            Column('kind', String(40), primary_key=True),
+            Column('salon_id', Integer, primary_key=True),
+            Column('version', Integer, nullable=False),
+            Column('html', Text, nullable=False),
+        ).create(conn)
+
+
+@migration(8, "salon search index")
+def add_salon_search(conn):
+    # SQLite only: elsewhere search_salon_ids falls back to LIKE over the salon table
+    if conn.dialect.name != 'sqlite':
+        return
+    conn.execute(text("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS salon_search USING fts5(
+            name, location, services,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """))
+    # Rebuilt in full: databases where the index was first created by a rolled-back request hold no rows
+    conn.execute(text("DELETE FROM salon_search"))
+    conn.execute(text("""
+        INSERT INTO salon_search (rowid, name, location, services)
+        SELECT s.id, s.name, s.location,
+               COALESCE((SELECT group_concat(COALESCE(sv.name, '') || ' ' || COALESCE(sv.category, ''), ' ')
+                         FROM service sv WHERE sv.salon_id = s.id), '')
+        FROM salon s
+    """))
+
+
+@migration(9, "job queue")
+def add_job_table(conn):
+    # Until now created on first enqueue, which SQLite refuses while that request holds a write transaction
+    if not _has_table(conn, 'job'):
+        Table(
+            'job', MetaData(),
+            Column('id', Integer, primary_key=True),
+            Column('kind', String(50), nullable=False),
+            Column('payload', Text, nullable=False),
+            Column('idempotency_key', String(200), unique=True),
+            Column('status', String(20), nullable=False, default='queued'),
+            Column('attempts', Integer, nullable=False, default=0),
+            Column('max_attempts', Integer, nullable=False, default=5),
+            Column('run_at', DateTime, nullable=False),
+            Column('locked_at', DateTime),
+            Column('claim_token', String(32)),
+            Column('last_error', Text),
+            Column('created_at', DateTime, nullable=False),
+            Index('ix_job_status_run_at', 'status', 'run_at'),
+            Index('ix_job_claim_token', 'claim_token'),
+        ).create(conn)
+
+
+@migration(10, "one-time codes and rate limits")
+def add_otp_tables(conn):
+    # Used by the 'sql' OTP backend; until now created on the first code sent
+    metadata = MetaData()
+    if not _has_table(conn, 'otp_code'):
+        Table(
+            'otp_code', metadata,
+            Column('phone', String(20), primary_key=True),
+            Column('digest', String(64), nullable=False),
+            Column('expires_at', Float, nullable=False),
+            Column('attempts', Integer, nullable=False, default=0),
+        ).create(conn)
+    if not _has_table(conn, 'rate_bucket'):
+        Table(
+            'rate_bucket', metadata,
+            Column('key', String(120), primary_key=True),
+            Column('tokens', Float, nullable=False),
+            Column('updated_at', Float, nullable=False),
+        ).create(conn)
+
+
+@migration(11, "correct backfilled booking years")
+def fix_booking_years(conn):
+    # Migration 1 used to put a year-less date that had passed in the next year, on the wrong weekday.
+    # Re-place every row whose start no longer matches its date string, anchored where that backfill was.
+    booking, versions = _table(conn, 'booking'), _table(conn, 'schema_version')
+    anchor = conn.execute(select(versions.c.applied_at).where(versions.c.version == 1)).scalar()
+    if isinstance(anchor, str):
+        anchor = datetime.fromisoformat(anchor)
+    anchor = anchor.date() if anchor else date.today()
+    rows = conn.execute(
+        select(booking.c.id, booking.c.date, booking.c.start_at, booking.c.end_at)
+        .where(booking.c.start_at.isnot(None))
+    ).all()
+    changed = 0
+    for booking_id, day_text, start_at, end_at in rows:
+        if isinstance(start_at, str):
+            start_at, end_at = datetime.fromisoformat(start_at), end_at and datetime.fromisoformat(end_at)
+        if (day_text or '').strip().lower() in ('today', 'tomorrow'):
+            continue
+        if parse_day(day_text, start_at.date()) == start_at.date():
+            continue  # consistent: written with the right year, or from a dated string
+        day = parse_day(day_text, anchor)
+        if day is None:
+            values = {'start_at': None, 'end_at': None}
+        else:
+            shift = day - start_at.date()
+            values = {'start_at': start_at + shift, 'end_at': end_at and end_at + shift}
+        conn.execute(booking.update().where(booking.c.id == booking_id).values(**values))
+        changed += 1
+
+    # Rollups are bucketed by slot day, so the moved bookings counted on the wrong days
+    if changed:
+        rollup, service = _table(conn, 'daily_rollup'), _table(conn, 'service')
+        conn.execute(rollup.delete())
+        totals = _rollup_rows(conn, booking, service)
+        if totals:
+            conn.execute(insert(rollup), totals)
+
+
+def _ensure_version_table(conn):
+    if not _has_table(conn, 'schema_version'):
+        Table(
+            'schema_version', MetaData(),
+            Column('version', Integer, primary_key=True),
+            Column('name', String(100), nullable=False),
+            Column('applied_at', DateTime, nullable=False),
+        ).create(conn)
+
+
+def current_version(engine):
+    """The last applied migration, or 0 on a database that has never been upgraded. Writes nothing."""
+    with engine.connect() as conn:
+        if not _has_table(conn, 'schema_version'):
+            return 0
+        versions = _table(conn, 'schema_version')
+        return conn.execute(select(func.coalesce(func.max(versions.c.version), 0))).scalar()
+
+
+def pending(engine):
+    applied = current_version(engine)
+    return [(v, name) for v, name, _ in MIGRATIONS if v > applied]
+
+
+def upgrade(engine, target=None, log=print):
+    """Apply every migration newer than the recorded version, each in its own transaction."""
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+    applied = current_version(engine)
+    for version, name, step in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= applied or (target is not None and version > target):
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(insert(_table(conn, 'schema_version')).values(
+                version=version, name=name, applied_at=datetime.now()
+            ))
+        if log:
+            log(f"Applied migration {version:03d}: {name}")
+    return current_version(engine)
@@ -0,0 +1,549 @@
+"""Database models, and the derived data kept in step with them.
+
+Importing this module needs no app: scripts that only read or write rows use
+`create_app(web=False)` and these models, without the routes or any of the web
+services. Session listeners here maintain the rating totals, the worker skill
+index and the salon search index on every flush, whoever does the writing.
+"""
+from datetime import date, timedelta
+
+from flask_login import UserMixin
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Date, case, cast, event, func, inspect, insert, literal, update
+from sqlalchemy.orm import aliased, joinedload
+
+from fragments import bump_versions
+from geo import cell_of, parse_map_url
+from search import reindex_salons, touched_salon_ids
+from skills import city_of, parse_skills
+from storage import RoutingSession, upsert
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Database Models
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    phone = db.Column(db.String(20), nullable=False, index=True)
+    password = db.Column(db.String(200), nullable=False)
+    gender = db.Column(db.String(20)) # Male, Female, Other
+    role = db.Column(db.String(20), default='customer') # customer, salon_owner, worker
+    bookings = db.relationship('Booking', backref='customer', lazy=True)
+
+class Salon(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    location = db.Column(db.String(200), nullable=False)
+    rating = db.Column(db.Float, default=4.5)
+    image_url = db.Column(db.String(300))
+    logo_url = db.Column(db.String(300))
+    map_url = db.Column(db.String(500))
+    phone = db.Column(db.String(20))
+    opening_time = db.Column(db.String(20))
+    closing_time = db.Column(db.String(20))
+    experience = db.Column(db.Integer)
+    is_open = db.Column(db.Boolean, default=True)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geo_cell = db.Column(db.Integer) # geo.cell_of(latitude, longitude), kept in sync on flush
+    services = db.relationship('Service', backref='salon', lazy=True)
+    workers = db.relationship('Worker', backref='salon', lazy=True)
+    reviews = db.relationship('Review', backref='salon', lazy=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    # Covers the nearby candidate scan, so coordinates come straight from the index
+    __table_args__ = (db.Index('ix_salon_geo_cell', 'geo_cell', 'latitude', 'longitude'),)
+
+@event.listens_for(Salon, 'before_insert')
+@event.listens_for(Salon, 'before_update')
+def _locate_salon(mapper, connection, salon):
+    """Take coordinates from a new map embed unless they were set explicitly, then file the salon in its grid cell."""
+    state = inspect(salon)
+    if state.attrs.map_url.history.has_changes() and not (
+            state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes()):
+        salon.latitude, salon.longitude = parse_map_url(salon.map_url) or (salon.latitude, salon.longitude)
+    salon.geo_cell = cell_of(salon.latitude, salon.longitude)
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    """Keep a salon's search row in step with its name, location and services, whoever writes them."""
+    ids = touched_salon_ids(session)
+    if ids:
+        reindex_salons(session.connection(), sorted(ids))
+
+class Worker(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    role = db.Column(db.String(100)) # e.g., Senior Stylist
+    phone = db.Column(db.String(20))
+    aadhaar_number = db.Column(db.String(12), nullable=True)
+    experience = db.Column(db.Integer, default=0)
+    skills = db.Column(db.String(500)) # Comma separated skills
+    image_url = db.Column(db.String(300))
+    is_online = db.Column(db.Boolean, default=False)
+    salon_id = db.Column(db.Integer, db.ForeignKey('salon.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
+
+    @property
+    def skill_names(self):
+        """Skills as listed on the profile: trimmed, without blanks or repeats."""
+        return list(parse_skills(self.skills).values())
+
+class SkillTag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(100), unique=True, nullable=False) # skills.parse_skills() key
+    name = db.Column(db.String(100), nullable=False) # first spelling seen, for display
+
+class WorkerSkill(db.Model):
+    """Inverted index from skill tag to workers, derived from Worker.skills on flush.
+
+    city and is_online are copies of the worker's salon city and status, kept in
+    step with them, so lookups never touch the worker or salon tables.
+    """
+    tag_id = db.Column(db.Integer, db.ForeignKey('skill_tag.id'), primary_key=True)
+    worker_id = db.Column(db.Integer, db.ForeignKey('worker.id'), primary_key=True)
+    city = db.Column(db.String(100)) # skills.city_of(salon.location)
+    is_online = db.Column(db.Boolean, nullable=False, default=False)
+
+    # The primary key serves skill-only lookups in worker order; this one adds the city
+    __table_args__ = (
+        db.Index('ix_worker_skill_lookup', 'tag_id', 'city', 'worker_id', 'is_online'),
+        db.Index('ix_worker_skill_worker', 'worker_id'),
+    )
+
+class Service(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    duration = db.Column(db.Integer, default=30) # in minutes
+    category = db.Column(db.String(50), index=True) # Hair, Makeup, Nails, etc.
+    image_url = db.Column(db.String(500)) # Media key or URL
+    salon_id = db.Column(db.Integer, db.ForeignKey('salon.id'), nullable=False, index=True)
+
+class Booking(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    salon_id = db.Column(db.Integer, db.ForeignKey('salon.id'), nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id'), nullable=False)
+    worker_id = db.Column(db.Integer, db.ForeignKey('worker.id'), nullable=True)
+    date = db.Column(db.String(50), nullable=False)
+    time = db.Column(db.String(20), nullable=False)
+    start_at = db.Column(db.DateTime) # Typed slot, derived from date/time and Service.duration
+    end_at = db.Column(db.DateTime)
+    status = db.Column(db.String(20), default='Pending') # Pending, Confirmed, Accepted, Completed, Cancelled
+    
+    __table_args__ = (
+        db.Index('ix_booking_worker_start', 'worker_id', 'start_at'),
+        db.Index('ix_booking_salon_start', 'salon_id', 'start_at'),
+        db.Index('ix_booking_salon_status', 'salon_id', 'status', 'id'),
+        db.Index('ix_booking_worker_status', 'worker_id', 'status', 'id'),
+        db.Index('ix_booking_salon', 'salon_id', 'id'),
+        db.Index('ix_booking_user', 'user_id', 'id'),
+    )
+    
+    # Back-references for easy access
+    salon = db.relationship('Salon', backref='salon_bookings')
+    service = db.relationship('Service', backref='service_bookings')
+    worker = db.relationship('Worker', backref='worker_bookings')
+
+class DailyRollup(db.Model):
+    """Per-day booking counters, kept current as bookings change state.
+
+    worker_id 0 holds the whole-salon totals; other rows are per worker. A booking
+    counts on its slot day (rollup_day), whenever it is made, accepted or
+    completed, so rebuild_rollups() reproduces the live figures.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    salon_id = db.Column(db.Integer, db.ForeignKey('salon.id'), nullable=False)
+    worker_id = db.Column(db.Integer, nullable=False, default=0)
+    day = db.Column(db.Date, nullable=False)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0) # service price, counted once accepted
+    completions = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('salon_id', 'worker_id', 'day', name='uq_rollup_salon_worker_day'),)
+
+class SignupCode(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(10), unique=True, nullable=False)
+    is_used = db.Column(db.Boolean, default=False)
+    salon_id = db.Column(db.Integer, db.ForeignKey('salon.id'), nullable=False)
+    salon = db.relationship('Salon', backref='signup_codes')
+
+    __table_args__ = (db.Index('ix_signup_code_salon_used', 'salon_id', 'is_used'),)
+
+class Review(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # Old values must be known when these change, to take them off the salon's totals
+    rating = db.column_property(db.Column(db.Integer, nullable=False), active_history=True) # 1-5 stars
+    comment = db.Column(db.Text)
+    date = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    salon_id = db.column_property(db.Column(db.Integer, db.ForeignKey('salon.id'), nullable=False),
+                                  active_history=True)
+    
+    # Relationships
+    customer = db.relationship('User', backref='user_reviews')
+
+    __table_args__ = (db.Index('ix_review_salon', 'salon_id', 'id'),)
+
+STARS = range(1, 6)
+
+class SalonRating(db.Model):
+    """Running review totals per salon, kept current as reviews are added, edited and removed.
+
+    Salon.rating holds total / count once a salon has reviews.
+    """
+    salon_id = db.Column(db.Integer, db.ForeignKey('salon.id'), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0) # sum of stars
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def histogram(self):
+        """[(stars, count, share of reviews)] from 5 stars down."""
+        return [(n, getattr(self, f'stars_{n}'), getattr(self, f'stars_{n}') / self.count if self.count else 0)
+                for n in reversed(STARS)]
+
+ACTIVE_BOOKING_STATUSES = ('Pending', 'Confirmed', 'Accepted')
+EARNING_BOOKING_STATUSES = ('Accepted', 'Completed')
+
+ROLLUP_MEASURES = ('bookings', 'revenue', 'completions')
+
+def rollup_day(start_at):
+    """The day a booking's counters go to: its slot day, or today for one without a start time."""
+    return start_at.date() if start_at else date.today()
+
+def bump_rollup(salon_id, worker_id=None, start_at=None, bookings=0, revenue=0, completions=0):
+    """Add to the salon (and worker) counters of the booking's slot day in the caller's transaction."""
+    bump_rollups([(salon_id, worker_id, start_at, bookings, revenue, completions)])
+
+def bump_rollups(deltas):
+    """Add [(salon_id, worker_id, start_at, bookings, revenue, completions)] to the counters in one statement.
+
+    Each delta also counts towards its salon total (worker 0). Rows are merged per
+    key first: PostgreSQL refuses to update the same row twice in one upsert.
+    """
+    rows = {}
+    for salon_id, worker_id, start_at, *measures in deltas:
+        day = rollup_day(start_at)
+        for scope in {0, worker_id or 0}:
+            row = rows.setdefault((salon_id, scope, day), dict(salon_id=salon_id, worker_id=scope, day=day,
+                                                               **dict.fromkeys(ROLLUP_MEASURES, 0)))
+            for name, value in zip(ROLLUP_MEASURES, measures):
+                row[name] += value
+    if not rows:
+        return
+    stmt = upsert(db.engine)(DailyRollup).values(list(rows.values()))
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['salon_id', 'worker_id', 'day'],
+        set_={name: getattr(DailyRollup, name) + stmt.excluded[name] for name in ROLLUP_MEASURES}
+    ))
+
+def revenue_summary(salon_id, worker_id=0, today=None):
+    """Today/week/month/lifetime figures from the rollup table: O(days), not O(bookings)."""
+    today = today or date.today()
+    since = lambda start: func.coalesce(func.sum(case((DailyRollup.day >= start, DailyRollup.revenue), else_=0)), 0)
+    row = db.session.query(
+        since(today),
+        since(today - timedelta(days=today.weekday())),
+        since(today.replace(day=1)),
+        func.coalesce(func.sum(DailyRollup.revenue), 0),
+        func.coalesce(func.sum(DailyRollup.bookings), 0),
+        func.coalesce(func.sum(DailyRollup.completions), 0)
+    ).filter(DailyRollup.salon_id == salon_id, DailyRollup.worker_id == worker_id).one()
+    return dict(zip(('today', 'week', 'month', 'lifetime', 'bookings', 'completions'), row))
+
+def rebuild_rollups():
+    """Recompute every rollup row from the booking table, bucketed by rollup_day like the live counters."""
+    if db.engine.dialect.name == 'sqlite':
+        day = func.coalesce(func.date(Booking.start_at), date.today().isoformat())
+    else:
+        day = func.coalesce(cast(Booking.start_at, Date), date.today())
+    earning = Booking.status.in_(EARNING_BOOKING_STATUSES)
+    measures = (
+        func.count(Booking.id),
+        func.coalesce(func.sum(case((earning, Service.price), else_=0)), 0),
+        func.sum(case((Booking.status == 'Completed', 1), else_=0))
+    )
+    salon_rows = db.session.query(Booking.salon_id, literal(0), day, *measures).join(
+        Service, Booking.service_id == Service.id
+    ).group_by(Booking.salon_id, day)
+    worker_rows = db.session.query(Booking.salon_id, Booking.worker_id, day, *measures).join(
+        Service, Booking.service_id == Service.id
+    ).filter(Booking.worker_id.isnot(None)).group_by(Booking.salon_id, Booking.worker_id, day)
+    rows = salon_rows.all() + worker_rows.all()
+
+    db.session.query(DailyRollup).delete()
+    if rows:
+        db.session.execute(insert(DailyRollup), [{
+            'salon_id': salon_id, 'worker_id': worker_id,
+            'day': d if isinstance(d, date) else date.fromisoformat(d),
+            'bookings': bookings, 'revenue': revenue, 'completions': completions
+        } for salon_id, worker_id, d, bookings, revenue, completions in rows])
+    db.session.commit()
+
+RATING_COLUMNS = ('count', 'total', *(f'stars_{n}' for n in STARS))
+
+def bump_ratings(conn, deltas):
+    """Apply {salon_id: {stars: +/-reviews}} to the running totals and averages, in the caller's transaction."""
+    table = SalonRating.__table__
+    for salon_id, by_stars in sorted(deltas.items()):
+        values = {f'stars_{n}': by_stars.get(n, 0) for n in STARS}
+        values.update(count=sum(by_stars.values()), total=sum(n * k for n, k in by_stars.items()))
+        stmt = upsert(conn)(table).values(salon_id=salon_id, **values)
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=['salon_id'], set_={name: table.c[name] + stmt.excluded[name] for name in values}
+        ))
+    rows = conn.execute(db.select(table.c.salon_id, table.c.count, table.c.total).where(
+        table.c.salon_id.in_(deltas), table.c.count > 0
+    )).all()
+    for salon_id, count, total in rows:
+        conn.execute(update(Salon.__table__).where(Salon.__table__.c.id == salon_id).values(
+            rating=round(total / count, 1)
+        ))
+    bump_versions(conn, deltas)  # cards and pages show the rating
+
+def _committed_review(obj):
+    """(salon_id, stars) a review had before this flush."""
+    state = inspect(obj)
+    return tuple(h.deleted[0] if h.deleted else getattr(obj, name)
+                 for name, h in (('salon_id', state.attrs.salon_id.history), ('rating', state.attrs.rating.history)))
+
+@event.listens_for(db.session, 'before_flush')
+def _load_removed_reviews(session, flush_context, instances):
+    # Their stars come off the totals after the flush, when the rows can no longer be loaded
+    for obj in session.deleted:
+        if isinstance(obj, Review):
+            _committed_review(obj)
+
+@event.listens_for(db.session, 'after_flush')
+def _count_review_changes(session, flush_context):
+    deltas, touched = {}, set()
+
+    def add(salon_id, stars, n):
+        if salon_id is not None and stars in STARS:
+            by_stars = deltas.setdefault(salon_id, {})
+            by_stars[stars] = by_stars.get(stars, 0) + n
+
+    for obj in session.new:
+        if isinstance(obj, Review):
+            add(obj.salon_id, obj.rating, 1)
+            touched.add(obj.salon_id)
+    for obj in session.deleted:
+        if isinstance(obj, Review):
+            add(*_committed_review(obj), -1)
+            touched.add(_committed_review(obj)[0])
+    for obj in session.dirty:
+        if isinstance(obj, Review) and session.is_modified(obj):
+            before = _committed_review(obj)
+            touched.update((before[0], obj.salon_id))
+            if before != (obj.salon_id, obj.rating):
+                add(*before, -1)
+                add(obj.salon_id, obj.rating, 1)
+    deltas = {salon_id: by_stars for salon_id, by_stars in deltas.items() if any(by_stars.values())}
+    # Any review edit changes the salon page, even one that leaves the stars alone
+    unrated = touched.difference(deltas, {None})
+    if unrated:
+        bump_versions(session.connection(), unrated)
+    if not deltas:
+        return
+    bump_ratings(session.connection(), deltas)
+    mapper = inspect(Salon)
+    for salon_id in deltas:
+        salon = session.identity_map.get(mapper.identity_key_from_primary_key((salon_id,)))
+        if salon is not None:
+            session.expire(salon, ['rating'])
+
+def review_totals():
+    """{salon_id: {column: value}} for SalonRating, computed from the review table in one grouped query."""
+    totals = {}
+    rows = db.session.query(Review.salon_id, Review.rating, func.count(Review.id)).filter(
+        Review.rating.between(1, 5)
+    ).group_by(Review.salon_id, Review.rating)
+    for salon_id, stars, n in rows:
+        row = totals.setdefault(salon_id, dict.fromkeys(RATING_COLUMNS, 0))
+        row['count'] += n
+        row['total'] += stars * n
+        row[f'stars_{stars}'] += n
+    return totals
+
+def rebuild_ratings(check=False):
+    """Recompute every salon's review totals and average from the review table.
+
+    Returns the ids of salons whose stored totals or rating had drifted; with
+    `check` nothing is written.
+    """
+    expected = review_totals()
+    averages = {salon_id: round(row['total'] / row['count'], 1) for salon_id, row in expected.items()}
+    stored = {row.salon_id: {name: getattr(row, name) for name in RATING_COLUMNS} for row in SalonRating.query}
+    ratings = dict(db.session.query(Salon.id, Salon.rating))
+    empty = dict.fromkeys(RATING_COLUMNS, 0)
+    drifted = sorted(
+        salon_id for salon_id in expected.keys() | stored.keys()
+        if expected.get(salon_id, empty) != stored.get(salon_id, empty)
+        or (salon_id in averages and ratings.get(salon_id) != averages[salon_id])
+    )
+    if check or not drifted:
+        return drifted
+
+    db.session.query(SalonRating).delete()
+    if expected:
+        db.session.execute(insert(SalonRating), [{'salon_id': salon_id, **row} for salon_id, row in expected.items()])
+    changed = [{'id': salon_id, 'rating': averages[salon_id]} for salon_id in drifted if salon_id in averages]
+    if changed:
+        db.session.execute(update(Salon), changed)
+    for start in range(0, len(drifted), 5000):
+        bump_versions(db.session.connection(), drifted[start:start + 5000])
+    db.session.commit()
+    return drifted
+
+def review_page(salon_id, before=None, limit=10):
+    """Newest reviews first, keyset-paged on ix_review_salon; returns (reviews, id to pass as `before` or None)."""
+    query = Review.query.options(joinedload(Review.customer)).filter(Review.salon_id == salon_id)
+    if before:
+        query = query.filter(Review.id < before)
+    reviews = query.order_by(Review.id.desc()).limit(limit + 1).all()
+    return reviews[:limit], (reviews[limit - 1].id if len(reviews) > limit else None)
+
+def can_review(user, salon_id):
+    """Customers review salons where they have had a completed booking."""
+    return db.session.query(Booking.id).filter(
+        Booking.user_id == user.id, Booking.salon_id == salon_id, Booking.status == 'Completed'
+    ).first() is not None
+
+def save_review(user, salon_id, stars, comment):
+    """Add the user's review of a salon, or replace the one they already wrote; the totals follow on flush."""
+    review = Review.query.filter_by(user_id=user.id, salon_id=salon_id).first()
+    if review is None:
+        review = Review(user_id=user.id, salon_id=salon_id)
+        db.session.add(review)
+    review.rating = stars
+    review.comment = (comment or '').strip()[:1000] or None
+    review.date = date.today().isoformat()
+    db.session.commit()
+    return review
+
+def parse_stars(value):
+    try:
+        stars = int(value)
+    except (TypeError, ValueError):
+        return None
+    return stars if stars in STARS else None
+
+def skill_tag_ids(conn, tags):
+    """{slug: tag id} for {slug: name}, creating the tags that do not exist yet."""
+    if not tags:
+        return {}
+    table = SkillTag.__table__
+    lookup = lambda slugs: conn.execute(db.select(table.c.slug, table.c.id).where(table.c.slug.in_(slugs))).all()
+    ids = dict(lookup(list(tags)))
+    missing = [{'slug': slug, 'name': name} for slug, name in tags.items() if slug not in ids]
+    if missing:
+        conn.execute(upsert(conn)(table).values(missing).on_conflict_do_nothing(index_elements=['slug']))
+        ids.update(lookup([row['slug'] for row in missing]))
+    return ids
+
+def _worker_skill_rows(conn, workers):
+    """worker_skill rows for [(worker_id, skills, is_online, salon location)]."""
+    parsed = [(worker_id, parse_skills(skills), bool(online), city_of(location))
+              for worker_id, skills, online, location in workers]
+    tag_ids = skill_tag_ids(conn, {slug: name for _, tags, _, _ in parsed for slug, name in tags.items()})
+    return [{'tag_id': tag_ids[slug], 'worker_id': worker_id, 'city': city, 'is_online': online}
+            for worker_id, tags, online, city in parsed for slug in tags]
+
+def _worker_profiles():
+    worker, salon = Worker.__table__, Salon.__table__
+    return db.select(worker.c.id, worker.c.skills, worker.c.is_online, salon.c.location).select_from(
+        worker.outerjoin(salon, salon.c.id == worker.c.salon_id)
+    )
+
+def index_worker_skills(conn, worker_ids):
+    """Rewrite the worker_skill rows of these workers from their skills, salon and status."""
+    table = WorkerSkill.__table__
+    rows = _worker_skill_rows(conn, conn.execute(_worker_profiles().where(Worker.__table__.c.id.in_(worker_ids))))
+    conn.execute(table.delete().where(table.c.worker_id.in_(worker_ids)))
+    if rows:
+        conn.execute(insert(table), rows)
+
+@event.listens_for(db.session, 'before_flush')
+def _unindex_removed_workers(session, flush_context, instances):
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Worker) and obj.id is not None]
+    if removed:
+        table = WorkerSkill.__table__
+        session.connection().execute(table.delete().where(table.c.worker_id.in_(removed)))
+
+@event.listens_for(db.session, 'after_flush')
+def _index_worker_changes(session, flush_context):
+    table = WorkerSkill.__table__
+    changed, status, moved = set(), {}, []
+    for obj in session.new:
+        if isinstance(obj, Worker):
+            changed.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Worker):
+            attrs = inspect(obj).attrs
+            if attrs.skills.history.has_changes() or attrs.salon_id.history.has_changes():
+                changed.add(obj.id)
+            elif attrs.is_online.history.has_changes():
+                status.setdefault(bool(obj.is_online), []).append(obj.id)
+        elif isinstance(obj, Salon) and inspect(obj).attrs.location.history.has_changes():
+            moved.append(obj)
+    conn = session.connection() if changed or status or moved else None
+    for salon in moved:
+        staff = db.select(Worker.__table__.c.id).where(Worker.__table__.c.salon_id == salon.id)
+        conn.execute(table.update().where(table.c.worker_id.in_(staff)).values(city=city_of(salon.location)))
+    for online, worker_ids in status.items():
+        conn.execute(table.update().where(table.c.worker_id.in_(worker_ids)).values(is_online=online))
+    if changed:
+        index_worker_skills(conn, sorted(changed))
+
+def rebuild_worker_skills(batch=5000):
+    """Recreate worker_skill from every worker profile and drop tags no worker has; returns the row count."""
+    conn = db.session.connection()
+    table = WorkerSkill.__table__
+    conn.execute(table.delete())
+    total, after = 0, 0
+    while True:
+        workers = conn.execute(_worker_profiles().where(Worker.__table__.c.id > after)
+                               .order_by(Worker.__table__.c.id).limit(batch)).all()
+        if not workers:
+            break
+        rows = _worker_skill_rows(conn, workers)
+        if rows:
+            conn.execute(insert(table), rows)
+        total, after = total + len(rows), workers[-1][0]
+    tags = SkillTag.__table__
+    conn.execute(tags.delete().where(~tags.c.id.in_(db.select(table.c.tag_id).distinct())))
+    db.session.commit()
+    return total
+
+def find_workers(skills, city=None, online=None, after=None, limit=20):
+    """Ids of workers who have every one of `skills`, optionally in `city` and by status, in id order.
+
+    Keyset paged: pass the last id returned as `after`. The first skill's rows are
+    read in worker order (from ix_worker_skill_lookup with a city, else the primary
+    key) and each further skill is one primary key probe per candidate.
+    """
+    slugs = list(parse_skills(','.join(skills)))
+    tags = dict(db.session.query(SkillTag.slug, SkillTag.id).filter(SkillTag.slug.in_(slugs))) if slugs else {}
+    if not slugs or len(tags) < len(slugs):
+        return []
+    first, *others = (tags[slug] for slug in slugs)
+    query = db.session.query(WorkerSkill.worker_id).filter(WorkerSkill.tag_id == first)
+    if city:
+        query = query.filter(WorkerSkill.city == city_of(city))
+    if online is not None:
+        query = query.filter(WorkerSkill.is_online.is_(online))
+    for tag_id in others:
+        also = aliased(WorkerSkill)
+        query = query.filter(db.session.query(also.worker_id).filter(
+            also.tag_id == tag_id, also.worker_id == WorkerSkill.worker_id
+        ).exists())
+    if after:
+        query = query.filter(WorkerSkill.worker_id > after)
+    return [worker_id for (worker_id,) in query.order_by(WorkerSkill.worker_id).limit(limit)]
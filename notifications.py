@@ -0,0 +1,44 @@
+"""Where booking notifications end up.
+
+A notifier is any object with `send(user_id, title, body, data)`. Delivery runs
+inside a job, so a slow or failing notifier only delays the job and is retried;
+it never adds latency to the request that caused it. The NOTIFIER setting picks
+one (see make_notifier); extensions.notifier is the current app's.
+"""
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class LogNotifier:
+    """Stand-in for a push provider: writes each notification to the log."""
+
+    def send(self, user_id, title, body, data=None):
+        log.info("Notify user %s: %s - %s %s", user_id, title, body, data or {})
+
+
+class FakeNotifier:
+    """Records notifications in memory (NOTIFIER=fake, for tests); can be told to fail the next N sends."""
+
+    def __init__(self, fail_times=0):
+        self.sent = []
+        self.fail_times = fail_times
+        self._lock = threading.Lock()
+
+    def send(self, user_id, title, body, data=None):
+        with self._lock:
+            if self.fail_times:
+                self.fail_times -= 1
+                raise ConnectionError("fake notifier failure")
+            self.sent.append({'user_id': user_id, 'title': title, 'body': body, 'data': data or {}})
+
+    def to(self, user_id):
+        return [n for n in self.sent if n['user_id'] == user_id]
+
+
+def make_notifier(spec):
+    """'log' or 'fake'."""
+    if spec == 'fake':
+        return FakeNotifier()
+    return LogNotifier()
@@ -0,0 +1,231 @@
+"""One-time login codes: expiring storage, send rate limits and background SMS dispatch.
+
+Two interchangeable backends hold codes and token buckets:
+MemoryOtpStore/MemoryRateLimiter for a single process, and
+SqlOtpStore/SqlRateLimiter for processes sharing a database. Their tables are
+created by migration 10 (python migrate.py). Only an HMAC of each code is
+stored, so a database read does not reveal live codes.
+"""
+import hashlib
+import hmac
+import logging
+import queue
+import secrets
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, case, delete, select, update
+
+from storage import upsert
+
+log = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+otp_codes = Table(
+    'otp_code', metadata,
+    Column('phone', String(20), primary_key=True),
+    Column('digest', String(64), nullable=False),
+    Column('expires_at', Float, nullable=False),
+    Column('attempts', Integer, nullable=False, default=0),
+)
+
+rate_buckets = Table(
+    'rate_bucket', metadata,
+    Column('key', String(120), primary_key=True),
+    Column('tokens', Float, nullable=False),
+    Column('updated_at', Float, nullable=False),
+)
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Too many requests; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _digest(secret, phone, code):
+    return hmac.new(secret.encode(), f"{phone}:{code}".encode(), hashlib.sha256).hexdigest()
+
+
+def new_code(digits=6):
+    return f"{secrets.randbelow(10 ** digits):0{digits}d}"
+
+
+class MemoryOtpStore:
+    def __init__(self, secret, ttl=300, max_attempts=5):
+        self.secret = secret
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def issue(self, phone):
+        """Create a fresh code for `phone`, replacing any earlier one."""
+        code = new_code()
+        with self._lock:
+            self._codes[phone] = [_digest(self.secret, phone, code), time.time() + self.ttl, 0]
+        return code
+
+    def verify(self, phone, code):
+        """True once per issued code; wrong guesses count towards max_attempts."""
+        with self._lock:
+            entry = self._codes.get(phone)
+            if not entry or entry[1] < time.time():
+                self._codes.pop(phone, None)
+                return False
+            if hmac.compare_digest(entry[0], _digest(self.secret, phone, code)):
+                del self._codes[phone]
+                return True
+            entry[2] += 1
+            if entry[2] >= self.max_attempts:
+                del self._codes[phone]
+            return False
+
+
+class SqlOtpStore:
+    def __init__(self, engine, secret, ttl=300, max_attempts=5):
+        self.engine = engine
+        self.secret = secret
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+
+    def issue(self, phone):
+        code = new_code()
+        values = {'digest': _digest(self.secret, phone, code), 'expires_at': time.time() + self.ttl, 'attempts': 0}
+        stmt = upsert(self.engine)(otp_codes).values(phone=phone, **values)
+        with self.engine.begin() as conn:
+            conn.execute(stmt.on_conflict_do_update(index_elements=['phone'], set_=values))
+            # Opportunistic cleanup keeps the table at roughly the live codes
+            conn.execute(delete(otp_codes).where(otp_codes.c.expires_at < time.time()))
+        return code
+
+    def verify(self, phone, code):
+        with self.engine.begin() as conn:
+            # Deleting the matching live row is the claim: two concurrent verifies cannot both succeed
+            used = conn.execute(delete(otp_codes).where(
+                otp_codes.c.phone == phone,
+                otp_codes.c.digest == _digest(self.secret, phone, code),
+                otp_codes.c.expires_at >= time.time(),
+            )).rowcount
+            if used:
+                return True
+            conn.execute(update(otp_codes).where(otp_codes.c.phone == phone).values(
+                attempts=otp_codes.c.attempts + 1
+            ))
+            conn.execute(delete(otp_codes).where(
+                otp_codes.c.phone == phone,
+                (otp_codes.c.attempts >= self.max_attempts) | (otp_codes.c.expires_at < time.time()),
+            ))
+            return False
+
+
+class MemoryRateLimiter:
+    """Token buckets: `capacity` requests at once, refilled at `per_second`."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, capacity, per_second):
+        """Take one token for `key` or raise RateLimited."""
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * per_second)
+            if tokens < 1:
+                raise RateLimited((1 - tokens) / per_second)
+            self._buckets[key] = (tokens - 1, now)
+
+
+class SqlRateLimiter:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def hit(self, key, capacity, per_second):
+        now = time.time()
+        b = rate_buckets.c
+        refilled = b.tokens + (now - b.updated_at) * per_second
+        available = case((refilled > capacity, capacity), else_=refilled)
+        with self.engine.begin() as conn:
+            # Conditional decrement: refill and spend in one statement, so processes cannot double-spend
+            taken = conn.execute(
+                update(rate_buckets).where(b.key == key, available >= 1)
+                .values(tokens=available - 1, updated_at=now)
+            ).rowcount
+            if taken:
+                return
+            created = conn.execute(
+                upsert(self.engine)(rate_buckets).values(key=key, tokens=capacity - 1, updated_at=now)
+                .on_conflict_do_nothing(index_elements=['key'])
+            ).rowcount
+            if created:
+                return
+            tokens = conn.execute(select(available).where(b.key == key)).scalar() or 0
+        raise RateLimited((1 - tokens) / per_second)
+
+
+def log_sender(phone, message):
+    log.info("SMS to %s: %s", phone, message)
+
+
+class FileSender:
+    """Appends each message to a local file; stands in for an SMS gateway."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, phone, message):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(f"{datetime.now().isoformat(timespec='seconds')}\t{phone}\t{message}\n")
+
+
+class SmsDispatcher:
+    """Hands messages to `sender` on a background thread so requests never wait on delivery.
+
+    `sender` is any callable(phone, message). The queue is bounded; when it is full
+    `send` returns False rather than blocking the request.
+    """
+
+    def __init__(self, sender, maxsize=1000):
+        self.sender = sender
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def send(self, phone, message):
+        self._start()
+        try:
+            self._queue.put_nowait((phone, message))
+            return True
+        except queue.Full:
+            log.warning("SMS queue full; dropped message to %s", phone)
+            return False
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sms-dispatch', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            phone, message = self._queue.get()
+            try:
+                self.sender(phone, message)
+            except Exception:
+                log.exception("SMS to %s failed", phone)
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """Block until everything queued so far has been handed to the sender."""
+        self._queue.join()
+
+
+def make_sender(spec):
+    """'log' or 'file:<path>'."""
+    if spec.startswith('file:'):
+        return FileSender(spec[len('file:'):])
+    return log_sender
@@ -0,0 +1,222 @@
+"""Salon owner pages: onboarding, the dashboard and managing services, workers and codes."""
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy.orm import joinedload
+
+from auth import current_salon
+from media import save_upload
+from models import Booking, Salon, SalonRating, Service, SignupCode, Worker, db, revenue_summary
+from storage import replica_reads
+
+bp = Blueprint('owner', __name__)
+
+@bp.route("/onboarding")
+@login_required
+def owner_onboarding():
+    if current_user.role != 'salon_owner':
+        flash("Access restricted to Salon Owners.")
+        return redirect(url_for('customer.home'))
+    return render_template("owner_onboarding.html")
+
+@bp.route("/onboarding", methods=["POST"])
+@login_required
+def owner_onboarding_post():
+    if current_user.role != 'salon_owner':
+        return redirect(url_for('customer.home'))
+
+    name = request.form.get("name")
+    address = request.form.get("address")
+    phone = request.form.get("phone")
+    experience = request.form.get("experience")
+    map_url = request.form.get("map_url")
+    opening_time = request.form.get("opening_time")
+    closing_time = request.form.get("closing_time")
+    
+    # JSON Data
+    import json
+    services_json = request.form.get("services_json")
+    photos_json = request.form.get("photos_data")
+    
+    # Create Salon
+    salon = Salon(
+        name=name,
+        location=address,
+        phone=phone,
+        experience=int(experience) if experience else 0,
+        map_url=map_url,
+        opening_time=opening_time,
+        closing_time=closing_time,
+        owner_id=current_user.id
+    )
+    
+    # Handle Photos (Pick the first as representative image_url)
+    if photos_json:
+        photos = json.loads(photos_json)
+        if photos:
+            salon.image_url = save_upload(photos[0]) # Store first as main thumbnail
+            
+    db.session.add(salon)
+    db.session.flush() # Get salon.id
+    
+    # Create Services
+    if services_json:
+        services = json.loads(services_json)
+        for s in services:
+            service = Service(
+                name=s['name'],
+                price=float(s['price']),
+                salon_id=salon.id
+            )
+            db.session.add(service)
+            
+    db.session.commit()
+    flash("Salon registered successfully! Welcome to your dashboard.")
+    return redirect(url_for('owner.owner_dashboard'))
+
+@bp.route("/add_service", methods=["POST"])
+@login_required
+def add_service():
+    if current_user.role != 'salon_owner':
+        flash("Access denied.")
+        return redirect(url_for('customer.home'))
+        
+    salon = current_salon()
+    if not salon:
+        flash("Salon not found.")
+        return redirect(url_for('owner.owner_dashboard'))
+
+    name = request.form.get("name")
+    category = request.form.get("category")
+    duration = int(request.form.get("duration", 30))
+    price = float(request.form.get("price", 0))
+    image_url = request.form.get("service_photo_data")
+
+    new_service = Service(
+        name=name,
+        category=category,
+        duration=duration,
+        price=price,
+        image_url=save_upload(image_url) if image_url else None,
+        salon_id=salon.id
+    )
+    
+    db.session.add(new_service)
+    db.session.commit()
+    
+    flash(f"Service '{name}' added successfully!")
+    return redirect(url_for('owner.owner_dashboard', section='services'))
+
+@bp.route("/dashboard")
+@login_required
+@replica_reads
+def owner_dashboard():
+    if current_user.role != 'salon_owner':
+        flash("Access denied. Owner role required.")
+        return redirect(url_for('customer.home'))
+    
+    salon = current_salon()
+    if not salon:
+        return redirect(url_for('owner.owner_onboarding'))
+    
+    active_section = request.args.get('section', 'overview')
+    bookings = Booking.query.options(joinedload(Booking.service), joinedload(Booking.customer)).filter_by(
+        salon_id=salon.id
+    ).order_by(Booking.id.desc()).limit(100).all()
+    revenue = revenue_summary(salon.id)
+    signup_codes = SignupCode.query.filter_by(salon_id=salon.id, is_used=False).all()
+    workers = Worker.query.filter_by(salon_id=salon.id).all()
+    ratings = db.session.get(SalonRating, salon.id)
+    
+    return render_template("owner_dashboard.html", 
+                           salon=salon, 
+                           bookings=bookings, 
+                           total_earnings=revenue['lifetime'], 
+                           revenue=revenue,
+                           signup_codes=signup_codes,
+                           workers=workers,
+                           review_count=ratings.count if ratings else 0,
+                           active_section=active_section)
+
+@bp.route("/generate_code", methods=["POST"])
+@login_required
+def generate_code():
+    if current_user.role != 'salon_owner':
+        flash("Access denied. Owner role required.")
+        return redirect(url_for('customer.home'))
+    
+    salon = current_salon()
+    if not salon:
+        flash("You do not own any salons yet.")
+        return redirect(url_for('owner.owner_dashboard'))
+
+    # Generate a unique 6-character code
+    import string
+    import random
+    while True:
+        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        if not SignupCode.query.filter_by(code=code).first():
+            break
+
+    new_code = SignupCode(code=code, salon_id=salon.id)
+    db.session.add(new_code)
+    db.session.commit()
+    
+    flash(f"New signup code generated: {code}")
+    return redirect(url_for('owner.owner_dashboard'))
+
+@bp.route("/add_worker", methods=["POST"])
+@login_required
+def add_worker():
+    if current_user.role != 'salon_owner':
+        flash("Access denied.")
+        return redirect(url_for('customer.home'))
+        
+    salon = current_salon()
+    if not salon:
+        flash("Salon not found.")
+        return redirect(url_for('owner.owner_dashboard'))
+
+    name = request.form.get("name")
+    phone = request.form.get("phone")
+    role = request.form.get("role")
+    experience = request.form.get("experience")
+    skills = request.form.get("skills") # Comma separated
+    image_data = request.form.get("worker_photo_data") # Base64, moved to the media store
+
+    new_worker = Worker(
+        name=name,
+        phone=phone,
+        role=role,
+        experience=int(experience) if experience else 0,
+        skills=skills,
+        image_url=save_upload(image_data) if image_data else None,
+        salon_id=salon.id
+    )
+    
+    db.session.add(new_worker)
+    db.session.commit()
+    
+    flash(f"Expert {name} has been added to your team!")
+    return redirect(url_for('owner.owner_dashboard'))
+    
+@bp.route("/update_salon", methods=["POST"])
+@login_required
+def update_salon():
+    if current_user.role != 'salon_owner':
+        flash("Access denied.")
+        return redirect(url_for('customer.home'))
+        
+    salon = current_salon()
+    if not salon:
+        flash("Salon not found.")
+        return redirect(url_for('owner.owner_dashboard'))
+        
+    logo_url = request.form.get("logo_url")
+    map_url = request.form.get("map_url")
+    
+    salon.logo_url = logo_url
+    salon.map_url = map_url
+    db.session.commit()
+    
+    flash("Salon details updated successfully!")
+    return redirect(url_for('owner.owner_dashboard'))
@@ -0,0 +1,105 @@
+"""Password hashing off the request threads.
+
+Hashes are deliberately slow, so a burst of logins would otherwise pin every
+server thread on CPU. PasswordHasher runs them in a bounded process pool:
+requests wait for their own hash, but once `max_pending` hashes are queued new
+work is refused with HashingBusy, which the routes turn into a 503, instead of
+piling up behind the backlog. A hash not done within `timeout` seconds raises
+HashingBusy too.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Werkzeug's own default; stored hashes with other parameters are upgraded on login
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+# Stored for accounts that sign in by OTP only; never matches any password
+UNUSABLE_PASSWORD = '!'
+
+
+class HashingBusy(RuntimeError):
+    pass
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _check(stored, password):
+    return check_password_hash(stored, password)
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, workers=None, max_pending=None, timeout=30):
+        """`workers=0` hashes inline on the calling thread (single-process dev, scripts)."""
+        self.method = method
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(self.workers, 1) * 4
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stored_method = None
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        try:
+            return self._wait(self._submit(fn, *args))
+        except BrokenProcessPool:
+            # A crashed child poisons the executor; start a fresh one and retry once
+            with self._pool_lock:
+                self._pool = None
+            return self._wait(self._submit(fn, *args))
+
+    def _submit(self, fn, *args):
+        """Queue `fn`; it holds one of the `max_pending` slots until it finishes, even if nobody waits for it."""
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("Password hashing queue is full")
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _wait(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()  # dropped if still queued; one already running keeps its slot until done
+            raise HashingBusy(f"Password hashing took over {self.timeout}s") from None
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, stored, password):
+        if not stored or '$' not in stored or not password:
+            return False
+        return self._run(_check, stored, password)
+
+    def needs_rehash(self, stored):
+        """True when `stored` was made with different parameters than the configured method."""
+        if not stored or '$' not in stored:
+            return False
+        if self._stored_method is None:
+            # Werkzeug fills in defaults ('pbkdf2:sha256' -> 'pbkdf2:sha256:600000'); learn the full form once
+            self._stored_method = _hash('', self.method).split('$', 1)[0]
+        return stored.split('$', 1)[0] != self._stored_method
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
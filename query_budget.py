@@ -0,0 +1,60 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counters = getattr(_local, 'counters', None)
+    if counters:
+        for counter in counters:
+            counter.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """Collect every SQL statement run on this thread inside the block."""
+    statements = []
+    counters = getattr(_local, 'counters', None)
+    if counters is None:
+        counters = _local.counters = []
+    counters.append(statements)
+    try:
+        yield statements
+    finally:
+        counters.remove(statements)
+
+
+@contextmanager
+def query_budget(limit, label="block"):
+    """Raise QueryBudgetExceeded if the block runs more than `limit` statements."""
+    with count_queries() as statements:
+        yield statements
+    if len(statements) > limit:
+        raise QueryBudgetExceeded(
+            f"{label} ran {len(statements)} queries (budget {limit}):\n" + "\n".join(statements)
+        )
+
+
+def budgeted(limit):
+    """Route decorator enforcing a query budget when ENFORCE_QUERY_BUDGETS is on (tests/debug)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('ENFORCE_QUERY_BUDGETS'):
+                return view(*args, **kwargs)
+            with query_budget(limit, label=view.__name__):
+                return view(*args, **kwargs)
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
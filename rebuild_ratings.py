@@ -0,0 +1,27 @@
+"""Rebuild every salon's review totals (count, sum, 1-5 star histogram) from the review table.
+
+The totals are normally kept current as reviews change; this recomputes them
+from scratch and reports any salon whose stored figures had drifted.
+
+    python rebuild_ratings.py           # repair drift
+    python rebuild_ratings.py --check   # only report it (exit status 1 if any)
+"""
+import argparse
+import sys
+
+from app import create_app
+from models import rebuild_ratings
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--check', action='store_true', help="report drift without writing")
+args = parser.parse_args()
+
+with create_app(web=False).app_context():
+    drifted = rebuild_ratings(check=args.check)
+if not drifted:
+    print("Review totals match the review table.")
+else:
+    shown = ', '.join(map(str, drifted[:20])) + (' ...' if len(drifted) > 20 else '')
+    print(f"{len(drifted)} salon(s) {'have drifted' if args.check else 'rebuilt'}: {shown}")
+    if args.check:
+        sys.exit(1)
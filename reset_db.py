@@ -1,8 +1,11 @@
-from app import app, db, Salon, Worker, Service, User
+from app import create_app
+from models import db, Salon, Worker, Service, User
 from werkzeug.security import generate_password_hash
 import os
 import random
+import migrations
 
+app = create_app(web=False)
 with app.app_context():
     # Force close all connections and delete file
     db.session.remove()
@@ -14,6 +17,7 @@ with app.app_context():
         print(f"Deleted {db_path}")
 
     db.create_all()
+    migrations.upgrade(db.engine, log=None)
     print("Tables created.")
 
     # Create Owner
@@ -1,5 +1,6 @@
 @echo off
 echo Starting Salon Booking Web App...
 call venv\Scripts\activate
+python migrate.py --seed
 python app.py
 pause
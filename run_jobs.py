@@ -0,0 +1,36 @@
+"""Run background jobs (notifications) in a separate process.
+
+Start one or more of these next to the web server and set JOB_RUNNER_THREADS=0
+there, or let the development server run jobs on its own threads.
+
+    python run_jobs.py [--threads N] [--drain]
+"""
+import argparse
+import signal
+import threading
+
+from app import create_app
+from extensions import job_queue
+from jobs import JobRunner
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--threads', type=int, default=4)
+parser.add_argument('--poll', type=float, default=1.0, help="seconds to sleep when the queue is empty")
+parser.add_argument('--drain', action='store_true', help="run every due job once and exit")
+args = parser.parse_args()
+
+app = create_app(web=False)
+
+if args.drain:
+    with app.app_context():
+        print(f"Ran {job_queue.run_until_empty()} job(s); queue: {job_queue.counts()}")
+else:
+    runner = JobRunner(job_queue, threads=args.threads, poll=args.poll, context=app.app_context).start()
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    print(f"Running jobs on {args.threads} thread(s); Ctrl+C to stop")
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    runner.stop()
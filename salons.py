@@ -0,0 +1,82 @@
+"""Salon lookups and the cached HTML fragments shared by the customer pages and the API."""
+from flask import current_app, render_template
+from markupsafe import Markup
+from sqlalchemy import distinct, func, or_
+
+from extensions import fragment_cache
+from fragments import current_versions
+from geo import cell_ranges, distance_km
+from models import Salon, Service, db
+
+def salon_summaries(salon_ids):
+    """Min price and lowercased category list per salon, in a single grouped query."""
+    if not salon_ids:
+        return {}
+    rows = db.session.query(
+        Service.salon_id,
+        func.min(Service.price),
+        func.group_concat(distinct(func.lower(Service.category)))
+    ).filter(Service.salon_id.in_(salon_ids)).group_by(Service.salon_id).all()
+    return {salon_id: {'min_price': min_price, 'cats': cats or ''} for salon_id, min_price, cats in rows}
+
+def salons_by_ids(salon_ids):
+    """Load salons keeping the order of `salon_ids` (search rank order)."""
+    if not salon_ids:
+        return []
+    found = {s.id: s for s in Salon.query.filter(Salon.id.in_(salon_ids)).all()}
+    return [found[i] for i in salon_ids if i in found]
+
+def nearby_salons(lat, lng, radius_km=None, limit=20, open_only=False, category=None, min_rating=None):
+    """[(distance_km, salon_id)] nearest first, within `radius_km` (default NEARBY_MAX_RADIUS_KM).
+
+    Candidates come from grid-cell ranges on ix_salon_geo_cell. The search starts at
+    1 km and widens until `limit` salons are found or `radius_km` is reached. Every
+    salon within the searched radius has been seen, so the nearest ones are exact.
+    Once the cells hold `limit` candidates, the next radius is the distance of the
+    `limit`-th of them, which needs exactly one more query.
+    """
+    max_radius = min(radius_km or current_app.config['NEARBY_MAX_RADIUS_KM'], current_app.config['NEARBY_MAX_RADIUS_KM'])
+    filters = []
+    if open_only:
+        filters.append(Salon.is_open.is_(True))
+    if min_rating is not None:
+        filters.append(Salon.rating >= min_rating)
+    if category:
+        filters.append(db.session.query(Service.id).filter(
+            Service.salon_id == Salon.id, func.lower(Service.category) == category.lower()
+        ).exists())
+    radius = min(1.0, max_radius)
+    while True:
+        cells = or_(*[Salon.geo_cell.between(lo, hi) for lo, hi in cell_ranges(lat, lng, radius)])
+        rows = db.session.query(Salon.id, Salon.latitude, Salon.longitude).filter(cells, *filters).all()
+        found = sorted((distance_km(lat, lng, s_lat, s_lng), salon_id) for salon_id, s_lat, s_lng in rows)
+        within = [hit for hit in found if hit[0] <= radius]
+        if len(within) >= limit or radius >= max_radius:
+            return within[:limit]
+        radius = min(found[limit - 1][0] if len(found) >= limit else radius * 2, max_radius)
+
+SALON_FRAGMENTS = {'card': '_salon_card.html', 'result': '_salon_result.html'}
+
+def salon_fragments(salon_ids, kinds, salons=(), summaries=None):
+    """Joined HTML of each fragment kind for `salon_ids`, in order.
+
+    Only salons whose rows changed since their fragments were cached are loaded and
+    rendered; `salons` and `summaries` already fetched by the caller are reused.
+    """
+    versions = current_versions(db.session.connection(), salon_ids)
+    loaded = {s.id: s for s in salons}
+    summaries = dict(summaries or {})
+
+    def renderer(template):
+        def render(missing):
+            loaded.update((s.id, s) for s in salons_by_ids([i for i in missing if i not in loaded]))
+            summaries.update(salon_summaries([i for i in missing if i not in summaries]))
+            return {i: render_template(template, salon=loaded[i], summary=summaries.get(i))
+                    for i in missing if i in loaded}
+        return render
+
+    joined = []
+    for kind in kinds:
+        html = fragment_cache.get_many(kind, versions, renderer(SALON_FRAGMENTS[kind]))
+        joined.append(Markup('\n'.join(html[i] for i in salon_ids if i in html)))
+    return joined
@@ -0,0 +1,119 @@
+import base64
+import json
+import re
+
+from sqlalchemy import inspect, text
+
+# FTS5 index over salons: one row per salon, rowid == salon.id.
+# `services` holds the concatenated names and categories of the salon's services.
+# The table is created and filled by migration 8; models.py keeps it in step on every flush.
+SEARCH_TABLE = 'salon_search'
+
+_REINDEX_SQL = f"""
+INSERT INTO {SEARCH_TABLE} (rowid, name, location, services)
+SELECT s.id, s.name, s.location,
+       COALESCE((SELECT group_concat(COALESCE(sv.name, '') || ' ' || COALESCE(sv.category, ''), ' ')
+                 FROM service sv WHERE sv.salon_id = s.id), '')
+FROM salon s
+"""
+
+
+def _is_sqlite(conn):
+    return conn.dialect.name == 'sqlite'
+
+
+def rebuild_index(conn):
+    if not _is_sqlite(conn):
+        return
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    conn.execute(text(_REINDEX_SQL))
+
+
+def reindex_salons(conn, salon_ids):
+    if not salon_ids or not _is_sqlite(conn):
+        return
+    params = {f'id{i}': sid for i, sid in enumerate(salon_ids)}
+    in_clause = ', '.join(f':{k}' for k in params)
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({in_clause})"), params)
+    conn.execute(text(f"{_REINDEX_SQL} WHERE s.id IN ({in_clause})"), params)
+
+
+def touched_salon_ids(session):
+    """Salons whose search row a flush made stale."""
+    ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table == 'salon':
+            ids.add(obj.id)
+        elif table == 'service':
+            ids.add(obj.salon_id)
+            # A service moved between salons must also leave the old salon's row
+            ids.update(inspect(obj).attrs.salon_id.history.deleted or ())
+    ids.discard(None)
+    return ids
+
+
+def _fts_query(q, city=None, category=None):
+    """Turn free text into a safe FTS5 expression: every term is a quoted prefix match."""
+    parts = [f'"{t}"*' for t in re.findall(r'\w+', (q or '').lower())]
+    if city:
+        parts += [f'location : "{t}"*' for t in re.findall(r'\w+', city.lower())]
+    if category:
+        parts += [f'services : "{t}"' for t in re.findall(r'\w+', category.lower())]
+    return ' AND '.join(parts)
+
+
+def encode_cursor(rank, salon_id):
+    raw = json.dumps([rank, salon_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, salon_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(rank), int(salon_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def search_salon_ids(conn, q='', city=None, category=None, cursor=None, limit=20):
+    """Ranked salon ids for a query, keyset-paginated on (bm25 rank, salon id).
+
+    Returns (ids, next_cursor). With no search terms, salons are listed by id.
+    """
+    match = _fts_query(q, city, category)
+    after = decode_cursor(cursor)
+    params = {'limit': limit + 1}
+
+    if match and _is_sqlite(conn):
+        params['match'] = match
+        where = f"{SEARCH_TABLE} MATCH :match"
+        if after:
+            where += " AND (rank > :rank OR (rank = :rank AND rowid > :after_id))"
+            params.update(rank=after[0], after_id=after[1])
+        rows = conn.execute(text(
+            f"SELECT rowid, rank FROM {SEARCH_TABLE} WHERE {where} ORDER BY rank, rowid LIMIT :limit"
+        ), params).all()
+    else:
+        where = "1 = 1"
+        for i, term in enumerate(re.findall(r'\w+', ' '.join(filter(None, [q, city])).lower())):
+            params[f't{i}'] = f'%{term}%'
+            where += f" AND (lower(name) LIKE :t{i} OR lower(location) LIKE :t{i})"
+        if category:
+            params['cat'] = category.lower()
+            where += " AND id IN (SELECT salon_id FROM service WHERE lower(category) = :cat)"
+        if after:
+            where += " AND id > :after_id"
+            params['after_id'] = after[1]
+        rows = [(r[0], 0.0) for r in conn.execute(text(
+            f"SELECT id FROM salon WHERE {where} ORDER BY id LIMIT :limit"
+        ), params).all()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return [r[0] for r in rows], next_cursor
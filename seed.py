@@ -0,0 +1,103 @@
+"""Demo data for a fresh database: one owner, their salons, services and workers."""
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+from models import Salon, Service, User, Worker, db
+
+
+def seed_data():
+    if User.query.filter_by(email="owner@example.com").first():
+        return
+        
+    # Create an Owner
+    owner = User(
+        name="John Owner",
+        email="owner@example.com",
+        phone="9876543210",
+        password=generate_password_hash("password123", method=current_app.config['PASSWORD_HASH_METHOD']),
+        role="salon_owner"
+    )
+    db.session.add(owner)
+    db.session.commit()
+
+    # Salons in Hyderabad
+    s1 = Salon(name="GlowUp Unisex Salon", location="Hyderabad, Banjara Hills", rating=4.7, owner_id=owner.id, 
+               map_url="https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3806.827222661234!2d78.4482878!3d17.4122998!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x3bcb973a98555555%3A0x5555555555555555!2sBanjara%20Hills%2C%20Hyderabad!5e0!3m2!1sen!2sin!4v1700000000000!5m2!1sen!2sin")
+    s2 = Salon(name="Urban Style Studio", location="Hyderabad, Jubilee Hills", rating=4.5)
+    s3 = Salon(name="Royal Spa & Salon", location="Hyderabad, Gachibowli", rating=4.8)
+    s4 = Salon(name="Mirror Mirror Salon", location="Hyderabad, Kukatpally", rating=4.6)
+    s5 = Salon(name="The Barber Shop", location="Hyderabad, Madhapur", rating=4.4)
+    s6 = Salon(name="Style & Smile", location="Hyderabad, Secunderabad", rating=4.3)
+    s7 = Salon(name="Luxury Locks", location="Hyderabad, Kondapur", rating=4.9)
+    s8 = Salon(name="Budget Cuts", location="Hyderabad, Ameerpet", rating=4.1)
+    
+    # Salons in Bengaluru
+    s9 = Salon(name="Silicon Cuts", location="Bengaluru, Koramangala", rating=4.7)
+    s10 = Salon(name="Garden City Spa", location="Bengaluru, Indiranagar", rating=4.5)
+    s11 = Salon(name="Techie Trims", location="Bengaluru, Whitefield", rating=4.4)
+    s12 = Salon(name="Velvet Touch", location="Bengaluru, HSR Layout", rating=4.6)
+    
+    # Salons in Mumbai
+    s13 = Salon(name="Bollywood Blush", location="Mumbai, Bandra", rating=4.8)
+    s14 = Salon(name="Marine Drive Makeup", location="Mumbai, Colaba", rating=4.7)
+    s15 = Salon(name="Gateway Grooming", location="Mumbai, Andheri", rating=4.5)
+    s16 = Salon(name="Elite Cuts", location="Mumbai, Juhu", rating=4.9)
+    
+    # Salons in Delhi
+    s17 = Salon(name="Capital Coiffure", location="Delhi, Connaught Place", rating=4.6)
+    s18 = Salon(name="Red Fort Refinement", location="Delhi, Saket", rating=4.5)
+    s19 = Salon(name="Chandni Chowk Charms", location="Delhi, Hauz Khas", rating=4.4)
+    s20 = Salon(name="Lutyens Luxe", location="Delhi, Rohini", rating=4.8)
+    
+    # Salons in Pune
+    s21 = Salon(name="Oxford Styles", location="Pune, Koregaon Park", rating=4.7)
+    s22 = Salon(name="Maratha Makeovers", location="Pune, Kothrud", rating=4.6)
+    s23 = Salon(name="IT Hub Cuts", location="Pune, Hinjewadi", rating=4.5)
+    s24 = Salon(name="Deccan Dazzle", location="Pune, Viman Nagar", rating=4.4)
+    
+    all_salons = [s1, s2, s3, s4, s5, s6, s7, s8, s9, s10, s11, s12, s13, s14, s15, s16, s17, s18, s19, s20, s21, s22, s23, s24]
+    db.session.add_all(all_salons)
+    db.session.commit()
+    
+    # Add Workers for all salons
+    worker_names = [
+        ("Rahul Sharma", "Senior Stylist", "9876500111"),
+        ("Priya Singh", "Makeup Artist", "9876500222"),
+        ("Amit Patel", "Hair Specialist", ""),
+        ("Suresh Kumar", "Master Barber", "9876500444"),
+        ("Anjali Devi", "Skin Specialist", "9876500555"),
+        ("Vikram Singh", "Massage Therapist", "9876500666")
+    ]
+    
+    # Add Services and Workers for all (Detailed)
+    for s in all_salons:
+        # Add Workers
+        import random
+        num_workers = random.randint(3, 5)
+        selected_workers = random.sample(worker_names, num_workers)
+        for name, role, phone in selected_workers:
+            # Generate a random phone if empty
+            worker_phone = phone if phone else f"98765{random.randint(10000, 99999)}"
+            db.session.add(Worker(
+                name=name, 
+                role=role, 
+                phone=worker_phone, 
+                image_url=f"https://i.pravatar.cc/150?u={name.replace(' ', '')}",
+                salon_id=s.id
+            ))
+
+        # Hair Styles
+        db.session.add(Service(name="Classic Fade Cut", price=350, category="Hair", salon_id=s.id))
+        db.session.add(Service(name="Crew Cut", price=250, category="Hair", salon_id=s.id))
+        db.session.add(Service(name="Bob Cut", price=450, category="Hair", salon_id=s.id))
+        db.session.add(Service(name="Long Layers", price=600, category="Hair", salon_id=s.id))
+        db.session.add(Service(name="Undercut", price=400, category="Hair", salon_id=s.id))
+        
+        # Spa Categories
+        db.session.add(Service(name="Aromatherapy Massage", price=1800, category="Spa", salon_id=s.id))
+        db.session.add(Service(name="Deep Tissue Massage", price=2200, category="Spa", salon_id=s.id))
+        db.session.add(Service(name="Swedish Massage", price=1500, category="Spa", salon_id=s.id))
+        db.session.add(Service(name="Foot Reflexology", price=600, category="Spa", salon_id=s.id))
+        db.session.add(Service(name="Hot Stone Therapy", price=3000, category="Spa", salon_id=s.id))
+        db.session.add(Service(name="Head & Shoulder Massage", price=800, category="Spa", salon_id=s.id))
+    db.session.commit()
@@ -0,0 +1,80 @@
+"""Compact JSON views of models for the API: sparse fields and opaque keyset cursors.
+
+A `Resource` lists the fields a client may ask for with `?fields=a,b` and the
+default set returned without it. Defaults leave out image columns, which can
+still hold inline base64 data URLs from before the media store. A client that
+asks for an image field gets a URL for media-store keys and the stored value
+otherwise. Fields that are None are left out of the output.
+
+Cursors are url-safe base64 of the sort key of the last row returned. Clients
+treat them as opaque and send them back unchanged.
+"""
+import base64
+import json
+
+
+class InvalidRequest(ValueError):
+    """A query parameter the API cannot honour; reported as a 400."""
+
+
+class Resource:
+    def __init__(self, name, fields, default):
+        self.name = name
+        self.fields = fields  # field name -> getter(obj, context)
+        self.default = tuple(default)
+
+    def select(self, spec):
+        """Field names for a `?fields=` value (None or empty means the default set)."""
+        if not spec:
+            return self.default
+        names = tuple(dict.fromkeys(f.strip() for f in spec.split(',') if f.strip()))
+        unknown = [n for n in names if n not in self.fields]
+        if unknown:
+            raise InvalidRequest(f"Unknown {self.name} field(s): {', '.join(unknown)}")
+        return names
+
+    def dump(self, obj, names, context=None):
+        """Dict of the `names` fields of `obj`. `context` carries data loaded in bulk for the whole page."""
+        out = {}
+        for name in names:
+            value = self.fields[name](obj, context)
+            if value is not None:
+                out[name] = value
+        return out
+
+    def dump_all(self, objs, names, context=None):
+        return [self.dump(obj, names, context) for obj in objs]
+
+
+def attr(name):
+    return lambda obj, context: getattr(obj, name)
+
+
+def encode_cursor(*values):
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """The values packed by `encode_cursor`, converted with `types`; None when absent."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if len(values) != len(types):
+            raise ValueError
+        return tuple(t(v) for t, v in zip(types, values))
+    except (ValueError, TypeError):
+        raise InvalidRequest("Invalid cursor") from None
+
+
+def page_limit(value, default=20, maximum=100):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidRequest("limit must be an integer") from None
+    if limit < 1:
+        raise InvalidRequest("limit must be positive")
+    return min(limit, maximum)
@@ -0,0 +1,319 @@
+"""Production server: a pre-forking master in front of threaded worker processes.
+
+The master imports the app once and checks the schema is current. It then warms
+what every worker would otherwise build on its first requests: compiled
+templates, the URL map and the fragment cache for the salons listed first. Only
+then does it bind the port and fork. Workers inherit all of that copy-on-write,
+so a new worker serves its first request at full speed. Background jobs run in
+one more child, unless --jobs 0 (then run run_jobs.py separately).
+
+The schema is never created or seeded here. Run `python migrate.py` (add --seed
+for the demo data) before the first start and after every upgrade.
+
+Every open /worker/stream holds a request thread until the browser closes it.
+A worker serves at most --streams of them and answers 503 with Retry-After past
+that, so the rest of its threads stay free for ordinary requests.
+
+SIGTERM or Ctrl+C shuts down gracefully. Workers stop accepting connections,
+answer 503 on /readyz, end open event streams and finish the requests in
+flight. Anything still running after --graceful-timeout is killed. A worker
+that exits, or has served --max-requests, is replaced.
+
+Each worker keeps its own in-memory state:
+- /metrics returns only the counters of the worker that answered the scrape,
+  each series labelled with its pid. No single scrape covers the whole server;
+  run --workers 1 when one scrape has to.
+- Server-sent events reach every worker through SiblingRelay.
+- Identity cache entries are dropped in every worker through SiblingRelay
+  after the commit that changes them. A lost relay message is covered by
+  IDENTITY_CACHE_TTL.
+- Fragment cache entries need no relay. A hit has to match the salon's
+  version in the database, which every write bumps.
+
+Fork is POSIX only. Elsewhere this serves from a single threaded process.
+
+    python serve.py --port 8000 --workers 4 --threads 16 --streams 4
+"""
+import argparse
+import gc
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--host', default='0.0.0.0')
+parser.add_argument('--port', type=int, default=8000)
+parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="web processes (default: one per CPU)")
+parser.add_argument('--threads', type=int, default=16,
+                    help="request threads per worker; every open event stream holds one")
+parser.add_argument('--streams', type=int,
+                    help="open event streams per worker, past which /worker/stream answers 503 (default: threads/4, rounded down)")
+parser.add_argument('--jobs', type=int, help="job runner threads in their own process (default: JOB_RUNNER_THREADS)")
+parser.add_argument('--backlog', type=int, default=1024, help="connections the kernel queues while workers are busy")
+parser.add_argument('--keep-alive', type=float, default=2, help="seconds an idle connection is kept; 0 closes each")
+parser.add_argument('--max-requests', type=int, default=0, help="replace a worker after this many requests (0: never)")
+parser.add_argument('--graceful-timeout', type=float, default=30, help="seconds to finish requests on shutdown")
+parser.add_argument('--warm-salons', type=int, default=200, help="salon cards rendered before forking")
+parser.add_argument('--access-log', action='store_true', help="log every request to stderr")
+args = parser.parse_args()
+if args.streams is None:
+    args.streams = args.threads // 4
+if args.streams >= args.threads:
+    parser.error("--streams must leave request threads free: keep it below --threads")
+
+# Workers share the CPUs for password hashing instead of each starting a pool as large as the machine
+os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, (os.cpu_count() or 1) // max(args.workers, 1))))
+
+from flask import url_for
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from app import create_app, draining
+from auth import follow_identity_changes
+from events import SiblingRelay, broker
+from extensions import job_queue
+from jobs import JobRunner
+from models import db
+from salons import salon_fragments
+from search import search_salon_ids
+import migrations
+
+app = create_app({'EVENT_STREAM_LIMIT': args.streams})
+
+
+class RequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1' if args.keep_alive > 0 else 'HTTP/1.0'
+    timeout = args.keep_alive or None  # idle keep-alive connections give their thread back
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if draining.is_set():
+            self.close_connection = True
+
+    def log_request(self, code='-', size='-'):
+        if args.access_log:
+            super().log_request(code, size)
+
+
+class PooledServer(BaseWSGIServer):
+    """Werkzeug's WSGI server on an inherited listening socket, with a fixed pool of request threads.
+
+    A connection is accepted only while one of the threads is free for it. A busy
+    worker leaves new connections in the listen backlog for an idle sibling
+    instead of queueing them behind its own requests.
+    """
+
+    multithread = True
+
+    def __init__(self, listener, threads, max_requests=0):
+        super().__init__(args.host, args.port, app, handler=RequestHandler, fd=listener.fileno())
+        self.socket.setblocking(False)  # siblings accept from the same socket; losing the race must not block
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix='request')
+        self.slots = threading.BoundedSemaphore(threads)  # released when a connection's thread is done with it
+        # Spread recycling out so the workers are not all replaced at once
+        self.max_requests = max_requests + random.randint(0, max_requests // 10) if max_requests else 0
+        self.served = 0
+        self.stop_requested = False
+
+    def _handle_request_noblock(self):
+        if not self.slots.acquire(timeout=0.05):
+            return  # every thread is busy; serve_forever comes back once the socket is still readable
+        try:
+            request, client_address = self.get_request()
+        except OSError:  # a sibling accepted it first
+            self.slots.release()
+            return
+        self.process_request(request, client_address)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+        self.served += 1
+        if self.served == self.max_requests:
+            self.stop()
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def stop(self):
+        """Stop accepting; serve_forever returns once its loop notices (call from any thread)."""
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def request_drain(self):
+        """For the SIGTERM handler: only sets a flag, which the serving loop acts on.
+
+        A handler that took locks itself could interrupt code holding the same ones,
+        such as an earlier run of the handler when the signal arrives twice.
+        """
+        self.stop_requested = True
+
+    def service_actions(self):
+        super().service_actions()
+        if self.stop_requested and not draining.is_set():
+            draining.set()
+            broker.close()
+            self.stop()
+
+
+def warm():
+    """Everything workers would otherwise each do on first use, done once before forking."""
+    started = time.perf_counter()
+    with app.app_context():
+        behind = migrations.pending(db.engine)
+        if behind:
+            sys.exit(f"Database schema is {len(behind)} migration(s) behind; run python migrate.py first.")
+        templates = app.jinja_env.list_templates()
+        for name in templates:
+            app.jinja_env.get_template(name)
+        with app.test_request_context('/'):
+            url_for('customer.home')  # matching and building compile the URL map
+            salon_ids = []
+            if args.warm_salons > 0:
+                salon_ids, _ = search_salon_ids(db.session.connection(), limit=args.warm_salons)
+                salon_fragments(salon_ids, ('card', 'result'))
+        db.session.remove()
+        # Children must open their own connections
+        for engine in db.engines.values():
+            engine.dispose()
+    # Objects alive now are shared with every worker; keep the collector from touching (and copying) them
+    gc.collect()
+    gc.freeze()
+    print(f"Warmed {len(templates)} templates and {len(salon_ids)} salon cards in "
+          f"{time.perf_counter() - started:.2f}s", flush=True)
+
+
+def serve_worker(listener, relay_dir):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C reaches the master, which sends SIGTERM
+    relay = SiblingRelay(broker, relay_dir).start()
+    follow_identity_changes(app)
+    server = PooledServer(listener, args.threads, args.max_requests)
+    signal.signal(signal.SIGTERM, lambda *_: server.request_drain())
+    server.serve_forever(poll_interval=0.2)
+    server.pool.shutdown(wait=True)  # in-flight requests, and keep-alive connections until they idle out
+    relay.close()
+    # The hashing pool's processes were forked from this one and hold the listening socket; they must not outlive it
+    built = app.extensions.get('services', {})
+    if 'hasher' in built:
+        built['hasher'].shutdown()
+
+
+def serve_jobs(threads):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    runner = JobRunner(job_queue, threads=threads, context=app.app_context).start()
+    stopped.wait()
+    runner.stop(timeout=args.graceful_timeout)
+
+
+class Master:
+    def __init__(self, listener, relay_dir, jobs):
+        self.listener = listener
+        self.relay_dir = relay_dir
+        self.jobs = jobs
+        self.children = {}  # pid -> (kind, started)
+        self.stopping = threading.Event()
+
+    def spawn(self, kind):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                if kind == 'web':
+                    serve_worker(self.listener, self.relay_dir)
+                else:
+                    serve_jobs(self.jobs)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = (kind, time.monotonic())
+
+    def run(self):
+        signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: self.stopping.set())
+        for _ in range(args.workers):
+            self.spawn('web')
+        if self.jobs:
+            self.spawn('jobs')
+        print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s) x {args.threads} "
+              f"thread(s) (at most {args.streams} on event streams){f' and {self.jobs} job thread(s)' if self.jobs else ''} (master pid {os.getpid()})",
+              flush=True)
+        while not self.stopping.is_set():
+            for pid, kind, started in self.reap():
+                if time.monotonic() - started < 1:
+                    self.stopping.wait(1)  # crashing on start; do not spin
+                if not self.stopping.is_set():
+                    self.spawn(kind)
+            self.stopping.wait(0.2)
+        self.shutdown()
+
+    def reap(self):
+        exited = []
+        while self.children:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                break
+            if pid in self.children:
+                exited.append((pid, *self.children.pop(pid)))
+            try:
+                os.unlink(os.path.join(self.relay_dir, f"{pid}.sock"))  # left behind by a worker that crashed
+            except FileNotFoundError:
+                pass
+        return exited
+
+    def shutdown(self):
+        print("Shutting down: finishing requests in flight...", flush=True)
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + args.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in self.children:
+            os.kill(pid, signal.SIGKILL)
+        while self.children:
+            self.children.pop(os.waitpid(-1, 0)[0], None)
+        self.listener.close()
+        print("Stopped.", flush=True)
+
+
+def main():
+    warm()
+    jobs = app.config['JOB_RUNNER_THREADS'] if args.jobs is None else args.jobs
+    if not hasattr(os, 'fork'):
+        from werkzeug.serving import make_server
+        if jobs:
+            JobRunner(job_queue, threads=jobs, context=app.app_context).start()
+        server = make_server(args.host, args.port, app, threaded=True)
+        print(f"Serving on http://{args.host}:{args.port} from one process (no fork here)", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    listener = socket.create_server((args.host, args.port), backlog=args.backlog)
+    listener.set_inheritable(True)
+    relay_dir = tempfile.mkdtemp(prefix='salon-events-')
+    try:
+        Master(listener, relay_dir, jobs).run()
+    finally:
+        shutil.rmtree(relay_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
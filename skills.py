@@ -0,0 +1,28 @@
+"""Skill tags: the normalized form of the free-text skills on worker profiles.
+
+Worker.skills keeps what was typed ("Hair Color, balayage ,Keratin"). Each
+distinct term becomes one skill tag, identified by its slug (lower case, single
+spaces), and worker_skill holds one row per (tag, worker): an inverted index
+from skill to workers. Rows also carry the worker's city and online flag, so
+"online Balayage experts in Pune" is a single range of ix_worker_skill_lookup
+read in worker id order, however many workers there are.
+"""
+from assignment import normalize
+
+MAX_TAG_LENGTH = 100
+
+
+def parse_skills(text):
+    """{slug: display name} for a comma separated skills string; the first spelling of a tag wins."""
+    tags = {}
+    for term in (text or '').split(','):
+        name = ' '.join(term.split())[:MAX_TAG_LENGTH]
+        slug = normalize(name)
+        if slug:
+            tags.setdefault(slug, name)
+    return tags
+
+
+def city_of(location):
+    """Normalized city of a salon location, which the app writes as 'City, Area'."""
+    return normalize((location or '').split(',')[0]) or None
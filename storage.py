@@ -0,0 +1,139 @@
+"""Database engine configuration, selected by environment.
+
+    DATABASE_URL          sqlite:///salon.db (default) or postgresql://...
+    DATABASE_REPLICA_URL  optional read replica; routes marked @replica_reads use it
+    DB_POOL_SIZE          connections kept open per process
+    DB_MAX_OVERFLOW       extra connections allowed under bursts
+    DB_POOL_TIMEOUT       seconds to wait for a free connection
+    SQLITE_JOURNAL_MODE   WAL (default); DELETE restores SQLite's rollback journal
+    SQLITE_BUSY_TIMEOUT   milliseconds a writer waits on a locked database
+    SQLITE_SYNCHRONOUS    NORMAL (default with WAL) or FULL
+    SQLITE_MMAP_SIZE      bytes of the database file to memory-map
+
+SQLite runs in WAL mode so readers never block the single writer and commits do
+not wait on readers. PostgreSQL gets a checked, recycled pool.
+"""
+import importlib
+import os
+import sqlite3
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event
+from sqlalchemy.engine import Engine
+
+DEFAULT_URL = 'sqlite:///salon.db'
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def database_url():
+    url = os.environ.get('DATABASE_URL', DEFAULT_URL)
+    # Hosted Postgres providers still hand out the pre-1.4 scheme
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def backend(url):
+    return url.split(':', 1)[0].split('+', 1)[0]
+
+
+def engine_options(url):
+    """Pool settings for the given URL, passed to create_engine by Flask-SQLAlchemy."""
+    kind = backend(url)
+    if kind == 'sqlite':
+        if ':memory:' in url or url.rstrip('/') == 'sqlite:':
+            return {}  # Flask-SQLAlchemy pins these to a StaticPool
+        # One writer at a time regardless of pool size; readers scale with threads
+        return {
+            'pool_size': _env_int('DB_POOL_SIZE', 10),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        }
+    if kind == 'postgresql':
+        return {
+            'pool_size': _env_int('DB_POOL_SIZE', 10),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+        }
+    return {}
+
+
+def upsert(bind):
+    """The dialect's INSERT with ON CONFLICT support for an engine or connection.
+
+    Imported on first use, so a SQLite process never loads the PostgreSQL dialect.
+    """
+    return importlib.import_module(f'sqlalchemy.dialects.{bind.dialect.name}').insert
+
+
+def configure_storage(app):
+    """Fill in SQLALCHEMY_* config before the SQLAlchemy extension is initialised."""
+    url = database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    replica = os.environ.get('DATABASE_REPLICA_URL')
+    if replica:
+        app.config['SQLALCHEMY_BINDS'] = {'replica': {'url': replica, **engine_options(replica)}}
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    journal_mode = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper()
+    if journal_mode in ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST'):
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+    cursor.execute(f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT', 5000)}")
+    synchronous = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+    if synchronous in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+    cursor.execute(f"PRAGMA mmap_size={_env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)}")
+    cursor.close()
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the replica inside @replica_reads views.
+
+    Anything that writes, locks rows, or runs after this session has flushed stays on
+    the primary, so a request always sees its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and 'replica' in self._db.engines
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and not self._flushing
+            and not self.info.get('wrote')
+            and has_app_context()
+            and g.get('replica_reads')
+        ):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+def replica_reads(view):
+    """Route decorator: read-only queries in this view may be served by the replica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.replica_reads = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.replica_reads = False
+    return wrapper
@@ -0,0 +1,66 @@
+"""Shared fixtures: one app on a throwaway SQLite database, migrated and seeded once per run.
+
+Tests share that database, so each one makes the bookings and users it needs
+instead of relying on what another test left behind.
+"""
+import os
+import shutil
+import tempfile
+from itertools import count
+
+import pytest
+
+# Before the app is imported: configure_storage reads the URL from the environment
+_tmp = tempfile.mkdtemp(prefix='salon-tests-')
+DATABASE_URL = f"sqlite:///{os.path.join(_tmp, 'salon.db')}"
+os.environ['DATABASE_URL'] = DATABASE_URL
+os.environ['JOB_RUNNER_THREADS'] = '0'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'  # fast; nothing here is about hashing cost
+
+from app import create_app
+from models import Salon, User, Worker, db
+from seed import seed_data
+import migrations
+
+_users = count(1)
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app({'TESTING': True, 'MEDIA_ROOT': os.path.join(_tmp, 'media'), 'AUTO_ASSIGN': False,
+                      'NOTIFIER': 'fake', 'ENFORCE_QUERY_BUDGETS': True})
+    with app.app_context():
+        db.create_all()
+        migrations.upgrade(db.engine, log=lambda *_: None)
+        seed_data()
+    yield app
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """make_user(role='customer', worker_of=None) -> user id; worker_of gives the user a Worker profile there."""
+    def make(role='customer', worker_of=None):
+        n = next(_users)
+        with app.app_context():
+            user = User(name=f"Test {role} {n}", email=f"{role}{n}@tests.example", phone=f"90000{n:05d}",
+                        password='!', role=role)
+            db.session.add(user)
+            db.session.flush()
+            if worker_of is not None:
+                db.session.add(Worker(name=user.name, phone=user.phone, salon_id=worker_of, user_id=user.id))
+            db.session.commit()
+            return user.id
+    return make
+
+
+@pytest.fixture
+def salon_id(app):
+    with app.app_context():
+        return db.session.query(Salon.id).order_by(Salon.id).limit(1).scalar()
+
@@ -0,0 +1,80 @@
+"""Claiming and completing bookings under concurrency: one winner, and completion counts once."""
+import threading
+
+from bookings import claim_booking, finish_booking
+from models import Booking, DailyRollup, Service, Worker, db, rollup_day
+
+CLAIMANTS = 8
+BOOKINGS = 20
+
+
+def test_each_booking_is_claimed_by_exactly_one_of_many_racing_workers(app, make_user, salon_id):
+    customer_id = make_user()
+    with app.app_context():
+        service = Service.query.filter_by(salon_id=salon_id).first()
+        workers = [Worker(name=f"Claimant {i}", salon_id=salon_id) for i in range(CLAIMANTS)]
+        bookings = [Booking(user_id=customer_id, salon_id=salon_id, service_id=service.id, date="Tomorrow",
+                            time="11:00 AM") for _ in range(BOOKINGS)]
+        db.session.add_all(workers + bookings)
+        db.session.commit()
+        booking_ids = [b.id for b in bookings]
+        for worker in workers:
+            db.session.refresh(worker)
+        db.session.expunge_all()  # detached copies: claimants only need id, salon_id and name
+
+    wins, errors = {}, []
+    lock = threading.Lock()
+    start = threading.Barrier(CLAIMANTS)
+
+    def claimant(worker):
+        with app.app_context():
+            start.wait()
+            for booking_id in booking_ids:
+                try:
+                    if claim_booking(booking_id, worker):
+                        with lock:
+                            wins.setdefault(booking_id, []).append(worker.id)
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(repr(e))
+
+    threads = [threading.Thread(target=claimant, args=(worker,)) for worker in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert sorted(wins) == sorted(booking_ids)
+    assert all(len(winners) == 1 for winners in wins.values())
+    with app.app_context():
+        claimed = dict(db.session.query(Booking.id, Booking.worker_id).filter(
+            Booking.id.in_(booking_ids), Booking.status == 'Accepted').all())
+        assert claimed == {booking_id: winners[0] for booking_id, winners in wins.items()}
+
+
+def test_a_second_finish_is_a_no_op(app, make_user, salon_id):
+    customer_id = make_user()
+    with app.app_context():
+        service = Service.query.filter_by(salon_id=salon_id).first()
+        worker, other = Worker(name="Finisher", salon_id=salon_id), Worker(name="Bystander", salon_id=salon_id)
+        booking = Booking(user_id=customer_id, salon_id=salon_id, service_id=service.id, date="Tomorrow",
+                          time="11:00 AM")
+        db.session.add_all([worker, other, booking])
+        db.session.commit()
+
+        assert not finish_booking(booking, worker)  # still pending
+        assert claim_booking(booking.id, worker)
+        assert not finish_booking(booking, other)  # not theirs
+
+        def completions():
+            return db.session.query(DailyRollup.completions).filter_by(
+                salon_id=salon_id, worker_id=worker.id, day=rollup_day(booking.start_at)).scalar() or 0
+
+        before = completions()
+        assert finish_booking(booking, worker)
+        assert not finish_booking(booking, worker)
+        db.session.refresh(booking)
+        assert booking.status == 'Completed'
+        assert completions() == before + 1
@@ -0,0 +1,66 @@
+"""Booking notifications: one job per event however often it is submitted, delivered once despite failures."""
+import json
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import select, update
+
+from availability import format_clock
+from check_query_budgets import sign_in
+from extensions import job_queue, notifier
+from jobs import jobs
+from models import Booking, Service, Worker, db
+
+
+def notification_jobs(booking_id):
+    with db.engine.connect() as conn:
+        return conn.execute(select(jobs).where(jobs.c.kind == 'notify',
+                                               jobs.c.idempotency_key.like(f"booking:{booking_id}:%"))).mappings().all()
+
+
+def test_each_booking_event_notifies_once_and_a_failed_send_is_retried(app, client, make_user, salon_id):
+    customer_id = make_user()
+    worker_user_id = make_user('worker', worker_of=salon_id)
+    with app.app_context():
+        job_queue.run_until_empty()  # what other tests queued, so the failure below hits one of ours
+        service = Service.query.filter_by(salon_id=salon_id).first()
+        worker_id = Worker.query.filter_by(user_id=worker_user_id).one().id
+        service_id = service.id
+    start = datetime.combine(datetime.now().date() + timedelta(days=1), time(10))
+
+    sign_in(client, customer_id)
+    client.post('/cart/confirm', data={'service_id': service_id, 'worker_id': worker_id,
+                                       'start': start.isoformat(timespec='minutes'),
+                                       'date': f"{start:%a, %b %d}", 'time': format_clock(start)})
+    with app.app_context():
+        booking_id = db.session.query(Booking.id).filter_by(user_id=customer_id).scalar()
+    assert booking_id is not None
+
+    sign_in(client, worker_user_id)
+    for _ in range(2):  # double submits
+        client.get(f'/worker/accept_booking/{booking_id}')
+    for _ in range(2):
+        client.get(f'/worker/complete_booking/{booking_id}')
+
+    with app.app_context():
+        assert db.session.get(Booking, booking_id).status == 'Completed'
+        queued = notification_jobs(booking_id)
+        assert sorted(job['idempotency_key'] for job in queued) == sorted([
+            f"booking:{booking_id}:created:{customer_id}",
+            f"booking:{booking_id}:created:{worker_user_id}",
+            f"booking:{booking_id}:accepted:{customer_id}",
+            f"booking:{booking_id}:completed:{customer_id}",
+        ])
+
+        notifier.fail_times = 1
+        job_queue.run_until_empty()
+        # The failed job waits out its backoff; make it due now
+        with db.engine.begin() as conn:
+            conn.execute(update(jobs).where(jobs.c.status == 'queued').values(run_at=datetime.now()))
+        job_queue.run_until_empty()
+
+        queued = notification_jobs(booking_id)
+        assert {job['status'] for job in queued} == {'done'}
+        assert sum(job['attempts'] for job in queued) == len(queued) + 1
+        sent = [n for n in notifier.sent if n['data'] == {'booking_id': booking_id}]
+        assert sorted((n['user_id'], n['title']) for n in sent) == sorted(
+            (json.loads(job['payload'])['user_id'], json.loads(job['payload'])['title']) for job in queued)
@@ -0,0 +1,23 @@
+"""Every @budgeted route stays within its query budget, for each kind of visitor."""
+from datetime import datetime, timedelta
+
+from check_query_budgets import check, samples
+from models import Booking, Service, db
+
+
+def test_budgeted_routes_stay_within_budget(app, make_user, salon_id):
+    customer_id = make_user()
+    with app.app_context():
+        # A booking history, so the customer's pages load it too
+        service = Service.query.filter_by(salon_id=salon_id).first()
+        start = datetime.now().replace(microsecond=0) + timedelta(days=2)
+        db.session.add(Booking(user_id=customer_id, salon_id=salon_id, service_id=service.id, date=f"{start:%a, %b %d}",
+                               time=f"{start:%H:%M}", start_at=start, end_at=start + timedelta(minutes=30)))
+        db.session.commit()
+        s = samples()
+    s['users']['customer'] = customer_id
+    s['users']['worker'] = make_user('worker', worker_of=salon_id)
+
+    lines = []
+    failures = check(app, s, log=lines.append)
+    assert not failures, "\n".join(failures + lines)
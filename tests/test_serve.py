@@ -0,0 +1,85 @@
+"""serve.py keeps answering ordinary requests while event streams hold its threads."""
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import DATABASE_URL
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="serve.py only pre-forks on POSIX")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def get(port, path, cookie=None, timeout=5):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    conn.request('GET', path, headers={'Cookie': cookie} if cookie else {})
+    return conn, conn.getresponse()
+
+
+@pytest.fixture
+def server(app):
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port), '--workers', '1',
+         '--threads', '4', '--streams', '3', '--jobs', '0', '--warm-salons', '0', '--graceful-timeout', '1'],
+        cwd=ROOT, env={**os.environ, 'DATABASE_URL': DATABASE_URL},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            conn, response = get(port, '/healthz', timeout=1)
+            conn.close()
+            break
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                pytest.fail("serve.py did not start")
+            time.sleep(0.2)
+    yield port
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def test_streams_past_the_limit_are_refused_and_healthz_still_answers(app, server, make_user, salon_id):
+    user_id = make_user('worker', worker_of=salon_id)
+    cookie = 'session=' + app.session_interface.get_signing_serializer(app).dumps(
+        {'_user_id': str(user_id), '_fresh': True})
+    streams = []
+    try:
+        for _ in range(3):
+            conn, response = get(server, '/worker/stream', cookie)
+            assert response.status == 200
+            assert response.readline() == b'retry: 3000\n'
+            streams.append((conn, response))
+
+        conn, response = get(server, '/worker/stream', cookie)
+        assert response.status == 503
+        assert response.getheader('Retry-After')
+        response.read()
+        conn.close()
+
+        started = time.monotonic()
+        conn, response = get(server, '/healthz', timeout=2)
+        assert response.status == 200
+        assert time.monotonic() - started < 2
+        conn.close()
+    finally:
+        for conn, response in streams:
+            response.close()
+            conn.close()
+
@@ -1,11 +1,14 @@
-from app import app, db, Salon, Worker, Service, User
+from app import create_app
+from models import db, Salon, Worker, Service, User
 from werkzeug.security import generate_password_hash
 import random
+import migrations
 
-with app.app_context():
+with create_app(web=False).app_context():
     # Clear all data
     db.drop_all()
     db.create_all()
+    migrations.upgrade(db.engine, log=None)
     print("Database cleared and tables recreated.")
     
     # Create Owner
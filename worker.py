@@ -0,0 +1,188 @@
+"""Worker pages: onboarding, the dashboard and its live feed, and claiming and completing bookings."""
+from flask import Blueprint, Response, abort, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+from flask_login import current_user, login_required
+
+from auth import current_worker
+from bookings import claim_booking, finish_booking, next_pending_bookings, worker_bookings_page, worker_counts
+from events import TooManyStreams, broker
+from media import save_upload
+from models import Booking, Salon, Worker, db
+from storage import replica_reads
+
+bp = Blueprint('worker', __name__)
+
+@bp.route("/onboarding", methods=["GET", "POST"])
+@login_required
+def worker_onboarding():
+    if current_user.role != 'worker':
+        return redirect(url_for('customer.home'))
+
+    # Get service from query param or session
+    service = request.args.get('service') or session.get('initial_specialization', 'Haircut')
+
+    salons = Salon.query.all()
+
+    if request.method == "POST":
+        experience = request.form.get("experience")
+        skills_list = request.form.getlist("skills")
+        skills = ", ".join(skills_list) if skills_list else ""
+        location = request.form.get("location")
+        salon_id = request.form.get("salon_id")
+
+        # Create or Update Worker Profile
+        worker = current_worker()
+        if not worker:
+            worker = Worker(
+                name=current_user.name,
+                role=session.pop('initial_specialization', "Expert Stylist"),
+                phone=current_user.phone,
+                experience=int(experience or 0),
+                skills=skills,
+                image_url=f"https://i.pravatar.cc/150?u={current_user.id}",
+                salon_id=int(salon_id) if salon_id else 1,
+                user_id=current_user.id
+            )
+            db.session.add(worker)
+        else:
+            worker.experience = int(experience or 0)
+            worker.skills = skills
+            if salon_id:
+                worker.salon_id = int(salon_id)
+        
+        db.session.commit()
+        flash("Onboarding complete! Welcome to the team.")
+        return redirect(url_for('worker.worker_dashboard'))
+
+    return render_template("worker_onboarding.html", 
+                           phone=current_user.phone, 
+                           name=current_user.name, 
+                           email=current_user.email,
+                           salons=salons,
+                           service=service)
+
+@bp.route("/dashboard")
+@login_required
+@replica_reads
+def worker_dashboard():
+    if current_user.role != 'worker':
+        flash("Worker access required.")
+        return redirect(url_for('customer.home'))
+    
+    worker = current_worker()
+    if not worker:
+        flash("Worker profile not found.")
+        return redirect(url_for('customer.home'))
+
+    page_size = current_app.config['WORKER_PAGE_SIZE']
+    pending_bookings = next_pending_bookings(worker, limit=page_size)
+    active_bookings, _ = worker_bookings_page(worker, 'Accepted', limit=page_size)
+
+    # Completed history is fetched lazily from worker_completed_bookings
+    return render_template("worker_dashboard.html", 
+                           worker=worker, 
+                           pending_bookings=pending_bookings,
+                           active_bookings=active_bookings,
+                           counts=worker_counts(worker))
+
+@bp.route("/bookings/completed")
+@login_required
+@replica_reads
+def worker_completed_bookings():
+    worker = current_worker()
+    if current_user.role != 'worker' or not worker:
+        abort(403)
+    completed_bookings, next_cursor = worker_bookings_page(
+        worker, 'Completed', before=request.args.get('before', type=int), limit=current_app.config['WORKER_PAGE_SIZE']
+    )
+    return jsonify(html=render_template('_worker_completed_cards.html', completed_bookings=completed_bookings),
+                   next_cursor=next_cursor)
+
+@bp.route("/stream")
+@login_required
+def worker_stream():
+    """Server-Sent Events feed of new pending bookings for the worker's salon."""
+    worker = current_worker()
+    if current_user.role != 'worker' or not worker:
+        abort(403)
+    channel = f"salon:{worker.salon_id}"
+    try:
+        events = broker.stream(channel, limit=current_app.config['EVENT_STREAM_LIMIT'])
+    except TooManyStreams:
+        # Each stream holds a request thread until it closes; past the limit they would starve other requests
+        return Response("Too many open event streams; retry shortly\n", status=503, mimetype='text/plain',
+                        headers={'Retry-After': '30'})
+    # The stream outlives the request; give the DB connection back before it starts
+    db.session.remove()
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route("/toggle_status")
+@login_required
+def toggle_worker_status():
+    if current_user.role != 'worker':
+        return redirect(url_for('customer.home'))
+        
+    worker = current_worker()
+    if worker:
+        worker.is_online = not worker.is_online
+        db.session.commit()
+        flash(f"You are now {'Online' if worker.is_online else 'Offline'}")
+    
+    return redirect(url_for('customer.home', screen='profile'))
+
+@bp.route("/accept_booking/<int:booking_id>")
+@login_required
+def accept_booking(booking_id):
+    if current_user.role != 'worker':
+        return redirect(url_for('customer.home'))
+        
+    worker = current_worker()
+    if not worker:
+        flash("Worker profile not found.")
+        return redirect(url_for('customer.home'))
+    
+    if claim_booking(booking_id, worker):
+        flash("Booking accepted! Start your job.")
+    else:
+        flash("This booking is no longer available.")
+        
+    return redirect(url_for('worker.worker_dashboard'))
+
+@bp.route("/complete_booking/<int:booking_id>")
+@login_required
+def complete_booking(booking_id):
+    if current_user.role != 'worker':
+        return redirect(url_for('customer.home'))
+        
+    booking = Booking.query.get_or_404(booking_id)
+    if finish_booking(booking, current_worker()):
+        flash("Job completed! Well done.")
+    
+    return redirect(url_for('worker.worker_dashboard'))
+
+@bp.route("/update_profile", methods=["POST"])
+@login_required
+def update_worker_profile():
+    if current_user.role != 'worker':
+        return redirect(url_for('customer.home'))
+        
+    worker = current_worker()
+    if worker:
+        # Legal Name Update
+        new_name = request.form.get("name")
+        if new_name:
+            current_user.name = new_name
+            worker.name = new_name
+            
+        worker.role = request.form.get("specialization")
+        worker.phone = request.form.get("phone")
+        
+        # Profile Photo Update (Base64)
+        profile_image_data = request.form.get("profile_image_data")
+        if profile_image_data:
+            worker.image_url = save_upload(profile_image_data) or worker.image_url
+            
+        db.session.commit()
+        flash("Settings updated successfully!")
+    
+    return redirect(url_for('worker.worker_dashboard'))